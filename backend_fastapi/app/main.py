@@ -3,19 +3,15 @@ Main FastAPI application entry point
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 import os
-from .database import engine, Base
 from .routes import issues, users, admin, analytics
+from .services.logs import configure_logging
+from .services.registry import registry
 
-# Create database tables (only if database is available)
-try:
-    Base.metadata.create_all(bind=engine)
-    print("[OK] Database tables created/verified successfully")
-except Exception as e:
-    print(f"[WARNING] Could not connect to database: {e}")
-    print("[WARNING] Server will start but database features will not work until connection is established")
-    print("[WARNING] Please check your DATABASE_URL in .env file")
+# Log records are written by a background thread, never by the request thread
+configure_logging()
 
 app = FastAPI(
     title="Predictive Urban Issue Management System API",
@@ -45,6 +41,12 @@ app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
 
 
+@app.on_event("startup")
+def start_service_warm_up():
+    """Create tables and load ML engines in the background so the worker starts serving immediately"""
+    registry.warm_up()
+
+
 @app.get("/")
 async def root():
     return {
@@ -56,5 +58,19 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    """Liveness probe: the process is up, whatever the model load state"""
+    return {"status": "healthy", "services": registry.status()}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the database and all required models are loaded"""
+    if registry.is_ready():
+        return {"status": "ready", "services": registry.status()}
+    # Load whatever is missing or failed (e.g. database not reachable at startup)
+    registry.warm_up(registry.pending_required())
+    return JSONResponse(
+        status_code=503,
+        content={"status": "loading", "services": registry.status()}
+    )
 
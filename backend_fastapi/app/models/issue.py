@@ -1,7 +1,7 @@
 """
 Issue model for storing citizen-reported urban issues
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Text, Boolean, ForeignKey, Enum
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -51,6 +51,12 @@ class Issue(Base):
     # Media
     image_path = Column(String)  # Path to uploaded image
     image_hash = Column(String)  # Perceptual hash for duplicate detection
+    image_dhash = Column(String)  # 64-bit difference hash, cheap duplicate prefilter
+    # image_hash as four signed 64-bit words (most significant first) for popcount scoring
+    image_phash_0 = Column(BigInteger)
+    image_phash_1 = Column(BigInteger)
+    image_phash_2 = Column(BigInteger)
+    image_phash_3 = Column(BigInteger)
     
     # Classification results
     ml_category_confidence = Column(Float)  # Confidence from image classifier
@@ -69,6 +75,14 @@ class Issue(Base):
     assigned_at = Column(DateTime(timezone=True), nullable=True)
     resolved_at = Column(DateTime(timezone=True), nullable=True)
     
+    @property
+    def image_phash_words(self):
+        return [self.image_phash_0, self.image_phash_1, self.image_phash_2, self.image_phash_3]
+
+    @image_phash_words.setter
+    def image_phash_words(self, words):
+        self.image_phash_0, self.image_phash_1, self.image_phash_2, self.image_phash_3 = words or (None,) * 4
+
     # Relationships
     user = relationship("User", backref="issues")
     assignments = relationship("Assignment", back_populates="issue")
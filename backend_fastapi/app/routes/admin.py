@@ -1,19 +1,24 @@
 """
 Admin dashboard routes
 """
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 
 from ..database import get_db
 from ..models.issue import Issue, IssueStatus
-from ..models.crew import Crew, Assignment
+from ..models.crew import Crew, Assignment, CrewStatus
 from ..models.user import User
 from ..routes.users import get_current_user
-from ..services.optimizer import optimizer
-from ..services.forecasting_service import forecasting_service
+from ..services.logs import logging_setup
+from ..services.registry import registry
+from ..services.priority_index import priority_index
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -80,12 +85,17 @@ def get_priority_list(
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    issues = db.query(Issue).filter(
-        Issue.is_duplicate == False,
-        Issue.status != IssueStatus.RESOLVED
-    ).order_by(
-        Issue.priority_score.desc()
-    ).limit(limit).all()
+    # Ranked in memory; the database query is the fallback while the index warms up
+    issues = priority_index.ranked_issues(
+        db, limit, statuses=[status for status in IssueStatus if status != IssueStatus.RESOLVED]
+    )
+    if issues is None:
+        issues = db.query(Issue).filter(
+            Issue.is_duplicate == False,
+            Issue.status != IssueStatus.RESOLVED
+        ).order_by(
+            Issue.priority_score.desc()
+        ).limit(limit).all()
     
     return [
         {
@@ -103,6 +113,40 @@ def get_priority_list(
     ]
 
 
+@router.post("/issues/rescore-priorities")
+def rescore_priorities(
+    current_user: User = Depends(get_current_user)
+):
+    """Recompute the priority score of every open issue now"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    from ..database import engine
+    
+    priority_rescorer = registry.get("priority_rescorer")
+    return {
+        "result": priority_rescorer.rescore(engine),
+        "schedule": priority_rescorer.stats()
+    }
+
+
+@router.get("/issues/priority-index")
+def check_priority_index(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Compare the in-memory priority ranking with the database (rebuilds it on mismatch)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if not priority_index.is_warm:
+        priority_index.warm(db)
+    return {
+        "check": priority_index.check(db),
+        "stats": priority_index.stats()
+    }
+
+
 @router.post("/assignments/optimize")
 def optimize_assignments(
     db: Session = Depends(get_db),
@@ -112,12 +156,12 @@ def optimize_assignments(
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    # Get unassigned high-priority issues
+    # The whole backlog of unassigned high-priority issues (split by department and region when large)
     issues = db.query(Issue).filter(
         Issue.is_duplicate == False,
         Issue.status == IssueStatus.VERIFIED,
         Issue.priority_score >= 50
-    ).limit(20).all()
+    ).all()
     
     # Get available crews
     crews = db.query(Crew).filter(
@@ -128,10 +172,14 @@ def optimize_assignments(
         return {"message": "No issues or crews available for assignment"}
     
     # Optimize assignments
+    optimizer = registry.get("optimizer")
     assignments = optimizer.optimize_assignments(db, issues, crews)
     
     # Create assignment records
     optimizer.create_assignments(db, assignments)
+    dispatcher = registry.peek("dispatcher")
+    if dispatcher is not None:
+        dispatcher.invalidate()
     
     return {
         "message": f"Optimized {len(assignments)} assignments",
@@ -142,6 +190,24 @@ def optimize_assignments(
     }
 
 
+@router.post("/assignments/resolve")
+def resolve_dispatch(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Re-solve the incremental dispatch now (movable assignments and the verified backlog)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    dispatcher = registry.get("dispatcher")
+    if not dispatcher.enabled:
+        raise HTTPException(status_code=400, detail="Incremental dispatch is disabled (DISPATCH_MODE=batch)")
+    return {
+        "result": dispatcher.resolve(db),
+        "stats": dispatcher.stats()
+    }
+
+
 @router.get("/crews")
 def get_crews(
     db: Session = Depends(get_db),
@@ -164,3 +230,74 @@ def get_crews(
         for crew in crews
     ]
 
+
+@router.put("/crews/{crew_id}/status")
+def update_crew_status(
+    crew_id: int,
+    status: CrewStatus,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Update a crew's status and position; in incremental mode its pending work is re-dispatched"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    crew = db.query(Crew).filter(Crew.id == crew_id).first()
+    if not crew:
+        raise HTTPException(status_code=404, detail="Crew not found")
+    
+    crew.status = status
+    if latitude is not None and longitude is not None:
+        crew.current_latitude = latitude
+        crew.current_longitude = longitude
+    db.commit()
+    
+    # The status is saved: a dispatch failure must not fail the request
+    changes = []
+    try:
+        changes = registry.get("dispatcher").crew_changed(db, crew)
+    except Exception as e:
+        logger.warning("Incremental dispatch for crew %s failed: %s", crew.id, e)
+    db.refresh(crew)
+    return {
+        "message": "Crew status updated successfully",
+        "crew": {
+            "id": crew.id,
+            "name": crew.name,
+            "department": crew.department,
+            "status": crew.status.value,
+            "current_load": crew.current_load,
+            "max_capacity": crew.max_capacity
+        },
+        "reassignments": len(changes)
+    }
+
+
+
+@router.get("/ml/inference-stats")
+def get_inference_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get image batcher histograms and inference cache counters"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    # Report without forcing a model load
+    image_classifier = registry.peek("image_classifier")
+    text_classifier = registry.peek("text_classifier")
+    duplicate_checker = registry.peek("duplicate_checker")
+    return {
+        "image_classifier": image_classifier.inference_stats() if image_classifier else None,
+        "text_classifier": {
+            "cache": text_classifier.cache_stats(),
+            "preprocessing": text_classifier.preprocessing_stats()
+        } if text_classifier else None,
+        "duplicate_checker": {
+            "spatial_index": duplicate_checker.index_stats(),
+            "text_index": duplicate_checker.text_index_stats()
+        } if duplicate_checker else None,
+        "logging": logging_setup.stats(),
+        "services": registry.status()
+    }
@@ -8,7 +8,7 @@ from typing import Optional
 from ..database import get_db
 from ..models.user import User
 from ..routes.users import get_current_user
-from ..services.forecasting_service import forecasting_service
+from ..services.registry import registry
 
 router = APIRouter()
 
@@ -24,6 +24,7 @@ def get_forecasted_hotspots(
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     
+    forecasting_service = registry.get("forecasting_service")
     predictions = forecasting_service.predict_hotspots(
         db, category=category, forecast_days=forecast_days
     )
@@ -46,6 +47,7 @@ def get_current_hotspots(
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     
+    forecasting_service = registry.get("forecasting_service")
     hotspots = forecasting_service.get_location_hotspots(
         db, category=category, days_back=days_back
     )
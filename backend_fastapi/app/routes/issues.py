@@ -1,20 +1,25 @@
 """
 Issue reporting and management routes
 """
+import asyncio
+import logging
+import os
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
-from ..database import get_db
+from ..database import SessionLocal, get_db
 from ..models.issue import Issue, IssueCategory, IssueStatus, IssueSeverity
 from ..models.user import User
 from ..models.priority import PriorityScore
-from ..services.image_classifier import image_classifier
-from ..services.text_classifier import text_classifier
-from ..services.duplicate_checker import duplicate_checker
 from ..services.priority_engine import priority_engine
+from ..services.priority_index import priority_index
+from ..services.ml_executor import run_in_ml_executor
+from ..services.registry import registry
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -51,6 +56,71 @@ class IssueResponse(BaseModel):
         from_attributes = True
 
 
+def _write_file(path: str, data: bytes):
+    """Write uploaded bytes to disk (runs on the ML executor)"""
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _upvote_text_duplicate(duplicate_checker, title, description, latitude, longitude, category) -> Optional[int]:
+    """
+    Upvote a near copy of a recent nearby report and return its id, or None
+    (runs on the ML executor, with its own session)
+    """
+    db = SessionLocal()
+    try:
+        duplicate_issue = duplicate_checker.find_text_duplicate(db, title, description, latitude, longitude, category)
+        if duplicate_issue is None:
+            return None
+        duplicate_checker.increment_upvotes(db, duplicate_issue)
+        return duplicate_issue.id
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _upvote_image_duplicate(duplicate_checker, image_hash, image_dhash, latitude, longitude, category) -> Optional[int]:
+    """
+    Upvote an earlier nearby report of the same photo and return its id, or None
+    (runs on the ML executor, with its own session)
+    """
+    db = SessionLocal()
+    try:
+        duplicate_issue = duplicate_checker.find_duplicates(
+            db, image_hash, latitude, longitude, category, image_dhash=image_dhash
+        )
+        if duplicate_issue is None:
+            return None
+        duplicate_checker.increment_upvotes(db, duplicate_issue)
+        return duplicate_issue.id
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _classify_with_note(text_classifier, processed_text, appended_note: str, category: str):
+    """Preprocess a system note appended to the description, join it and classify (runs on the ML executor)"""
+    if appended_note:
+        processed_text = text_classifier.join_processed(processed_text, text_classifier.preprocess_text(appended_note))
+    return text_classifier.classify_processed_batch([processed_text], [category])[0]
+
+
+async def _run_image_stages(image_bytes: bytes, duplicate_checker, image_classifier):
+    """Decode the upload once, then hash and classify the shared buffer in parallel"""
+    from ..services.image_ingest import ingest_image
+
+    ingested = await run_in_ml_executor(ingest_image, image_bytes)
+    return await asyncio.gather(
+        run_in_ml_executor(duplicate_checker.compute_hashes, ingested),
+        run_in_ml_executor(image_classifier.classify_image, ingested),
+        return_exceptions=True
+    )
+
+
 @router.post("/", response_model=IssueResponse)
 async def create_issue(
     user_id: int = Form(...),
@@ -64,6 +134,9 @@ async def create_issue(
 ):
     """Create a new issue report with optional image classification"""
     try:
+        # ML engines load lazily (usually already warmed up in the background)
+        text_classifier = await registry.get_async("text_classifier")
+
         # Normalize category from user input
         input_category = (category or "road_damage").lower()
         if "road" in input_category:
@@ -80,6 +153,7 @@ async def create_issue(
         department = "public_works"
         ml_confidence = 0.0
         image_hash = None
+        image_dhash = None
         image_path = None
 
         if image and image.filename:
@@ -87,12 +161,34 @@ async def create_issue(
             image_bytes = await image.read()
 
             if image_bytes:
+                image_classifier, duplicate_checker = await asyncio.gather(
+                    registry.get_async("image_classifier"),
+                    registry.get_async("duplicate_checker")
+                )
+
+                # Independent CPU-bound stages run in parallel off the event loop:
+                # decode once -> (perceptual hash | CNN classification), and text preprocessing
+                original_description = description
+                image_stages, processed_text = await asyncio.gather(
+                    _run_image_stages(image_bytes, duplicate_checker, image_classifier),
+                    run_in_ml_executor(text_classifier.preprocess_text, f"{title} {description or ''}"),
+                    return_exceptions=True
+                )
+                if isinstance(image_stages, Exception):
+                    hash_result = ml_result = image_stages
+                else:
+                    hash_result, ml_result = image_stages
+
                 # Classify image
                 try:
-                    # Compute hash for duplicate detection
-                    image_hash = duplicate_checker.compute_image_hash(image_bytes)
+                    if isinstance(hash_result, Exception):
+                        raise hash_result
+                    # Hashes for duplicate detection
+                    image_hash, image_dhash = hash_result
                     
-                    detected_category_ml, ml_confidence = image_classifier.classify(image_bytes)
+                    if isinstance(ml_result, Exception):
+                        raise ml_result
+                    detected_category_ml, ml_confidence = ml_result
                     
                     # Hybrid Logic & Conflict Detection
                     if detected_category != detected_category_ml:
@@ -112,29 +208,46 @@ async def create_issue(
                         detected_category = detected_category_ml
                         
                 except Exception as e:
-                    print(f"Error in hybrid resolution: {e}")
-                    pass
+                    logger.warning("Error in hybrid resolution: %s", e)
 
                 # Classify text (now using the resolved category)
                 try:
-                    text_input = f"{title} {description or ''}"
-                    severity, severity_confidence = text_classifier.classify_severity(text_input)
-                    department = text_classifier.classify_department(text_input, detected_category)
+                    if isinstance(processed_text, Exception):
+                        raise processed_text
+                    # Only the system note (if any) still needs preprocessing
+                    appended_note = (description or "")[len(original_description or ""):]
+                    text_result = await run_in_ml_executor(
+                        _classify_with_note, text_classifier, processed_text, appended_note, detected_category
+                    )
+                    severity, severity_confidence = text_result.severity, text_result.severity_confidence
+                    department = text_result.department
                 except Exception:
                     pass
 
                 # Save image
-                import os
                 os.makedirs("uploads", exist_ok=True)
                 image_path = f"uploads/{datetime.utcnow().timestamp()}_{user_id}.jpg"
-                with open(image_path, "wb") as f:
-                    f.write(image_bytes)
+                await run_in_ml_executor(_write_file, image_path, image_bytes)
         else:
+            # A near copy of a recent nearby report only upvotes it (no classification or scoring)
+            try:
+                duplicate_checker = await registry.get_async("duplicate_checker")
+                duplicate_id = await run_in_ml_executor(
+                    _upvote_text_duplicate, duplicate_checker, title, description, latitude, longitude, detected_category
+                )
+                if duplicate_id is not None:
+                    return IssueResponse.from_orm(db.query(Issue).filter(Issue.id == duplicate_id).first())
+            except Exception:
+                logger.exception("Error in text duplicate detection")
+
             # Still classify text even without image
             try:
                 text_input = f"{title} {description or ''}"
-                severity, severity_confidence = text_classifier.classify_severity(text_input)
-                department = text_classifier.classify_department(text_input, detected_category)
+                text_result = (await run_in_ml_executor(
+                    text_classifier.classify_batch, [text_input], [detected_category]
+                ))[0]
+                severity, severity_confidence = text_result.severity, text_result.severity_confidence
+                department = text_result.department
             except Exception:
                 pass
 
@@ -147,18 +260,18 @@ async def create_issue(
         # Duplicate detection (Now after category normalization)
         if image and image_hash:
             try:
-                duplicate_issue = duplicate_checker.find_duplicates(
-                    db, image_hash, latitude, longitude, issue_category.value
+                duplicate_id = await run_in_ml_executor(
+                    _upvote_image_duplicate, duplicate_checker, image_hash, image_dhash,
+                    latitude, longitude, issue_category.value
                 )
-                if duplicate_issue:
-                    duplicate_checker.increment_upvotes(db, duplicate_issue)
-                    return IssueResponse.from_orm(duplicate_issue)
-            except Exception as e:
-                db.rollback()
-                print(f"Error in duplicate detection: {e}")
-                # Log error but continue with creation if detection fails safely
+                if duplicate_id is not None:
+                    return IssueResponse.from_orm(db.query(Issue).filter(Issue.id == duplicate_id).first())
+            except Exception:
+                logger.exception("Error in duplicate detection")
+                # Continue with creation if detection fails safely
 
         # Create issue
+        from ..services.hash_index import hash_to_words
         issue = Issue(
             user_id=user_id,
             latitude=latitude,
@@ -169,6 +282,8 @@ async def create_issue(
             severity=IssueSeverity(severity),
             image_path=image_path,
             image_hash=image_hash,
+            image_dhash=image_dhash or None,
+            image_phash_words=hash_to_words(image_hash) if image_hash else None,
             ml_category_confidence=float(ml_confidence),
             ml_severity_confidence=float(severity_confidence),
             department=department
@@ -195,6 +310,12 @@ async def create_issue(
             db.refresh(issue)
         except Exception:
             pass
+        # The issue is saved: an index/NOTIFY failure must not fail the request
+        try:
+            priority_index.issues_changed(db, [issue])
+        except Exception as e:
+            db.rollback()
+            logger.warning("Priority index update for issue %s failed: %s", issue.id, e)
 
         return IssueResponse.from_orm(issue)
 
@@ -212,6 +333,14 @@ def get_issues(
     db: Session = Depends(get_db)
 ):
     """Get list of issues with optional filters"""
+    issues = priority_index.ranked_issues(
+        db, limit, offset,
+        categories=[IssueCategory(category)] if category else None,
+        statuses=[IssueStatus(status)] if status else None
+    )
+    if issues is not None:
+        return [IssueResponse.from_orm(issue) for issue in issues]
+    
     query = db.query(Issue).filter(Issue.is_duplicate == False)
     
     if category:
@@ -248,5 +377,15 @@ def update_issue_status(
         issue.resolved_at = datetime.utcnow()
     
     db.commit()
+    priority_index.issues_changed(db, [issue])
+    _dispatch(db, issue)
     return {"message": "Status updated successfully"}
 
+
+def _dispatch(db: Session, issue: Issue):
+    """Repair the crew dispatch for a changed issue (DISPATCH_MODE=incremental); never fails the request"""
+    try:
+        registry.get("dispatcher").issue_changed(db, issue)
+    except Exception as e:
+        logger.warning("Incremental dispatch of issue %s failed: %s", issue.id, e)
+
@@ -0,0 +1,522 @@
+"""
+Incremental crew dispatch between full optimizations
+
+``POST /assignments/optimize`` rebuilds the whole assignment problem. In
+incremental mode (``DISPATCH_MODE=incremental``) each worker keeps the last
+solution in memory instead: every dispatchable crew's position, load and
+movable assignments (assigned but not started) with their pair costs. Events
+are repaired locally against that state:
+
+- a verified issue takes the best free crew slot, or displaces the worst
+  movable assignment of a full crew it beats, which moves to a free slot
+  elsewhere or returns to the verified backlog
+- a crew going offline releases its movable assignments the same way; a crew
+  becoming available (or moving) fills its free slots from the backlog
+
+A periodic full re-solve over the movable assignments and the backlog, with
+a small bonus for keeping current pairs, bounds the drift of these greedy
+repairs. Workers detect each other's changes when they lock the crew rows
+they are about to update and reload their state on a mismatch.
+"""
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..models.crew import Assignment, Crew, CrewStatus
+from ..models.issue import Issue, IssueCategory, IssueStatus
+from .logs import StageTimer
+from .optimizer import DEPARTMENTS, optimizer
+from .priority_index import priority_index
+
+logger = logging.getLogger(__name__)
+
+# "batch" (only the optimize endpoint assigns crews) or "incremental"
+DISPATCH_MODE = os.getenv("DISPATCH_MODE", "batch").lower()
+# Seconds between full re-solves in incremental mode (0 disables the schedule)
+DISPATCH_FULL_RESOLVE_SECONDS = float(os.getenv("DISPATCH_FULL_RESOLVE_SECONDS", "900"))
+# Cost bonus of an assignment's current crew in a full re-solve (fewer reassignments)
+DISPATCH_STICKINESS = float(os.getenv("DISPATCH_STICKINESS", "5"))
+# Backlog issues considered when a crew becomes available (highest priority first)
+DISPATCH_BACKLOG_LIMIT = int(os.getenv("DISPATCH_BACKLOG_LIMIT", "1000"))
+# Same threshold as the optimize endpoint
+DISPATCH_MIN_PRIORITY = 50.0
+# PostgreSQL advisory lock key: one worker re-solves at a time
+DISPATCH_RESOLVE_LOCK_ID = 0x55495244
+
+# (issue id, crew it leaves or None, crew it joins or None)
+Change = Tuple[int, Optional[int], Optional[int]]
+
+
+class StaleState(Exception):
+    """The database changed under the in-memory state (another worker dispatched)"""
+
+
+class CrewSlots:
+    """In-memory copy of a dispatchable crew and its movable assignments (issue id -> cost)"""
+
+    __slots__ = ("id", "department", "current_latitude", "current_longitude", "max_capacity", "load", "pending")
+
+    def __init__(self, crew: Crew):
+        self.id = crew.id
+        self.department = crew.department
+        self.current_latitude = crew.current_latitude
+        self.current_longitude = crew.current_longitude
+        self.max_capacity = crew.max_capacity or 0
+        self.load = crew.current_load or 0
+        self.pending: Dict[int, float] = {}
+
+    @property
+    def free(self) -> int:
+        return self.max_capacity - self.load
+
+    def worst(self) -> Optional[Tuple[int, float]]:
+        """Most expensive movable assignment"""
+        if not self.pending:
+            return None
+        return max(self.pending.items(), key=lambda item: item[1])
+
+
+class IncrementalDispatcher:
+    def __init__(
+        self,
+        enabled: bool = DISPATCH_MODE == "incremental",
+        resolve_seconds: float = DISPATCH_FULL_RESOLVE_SECONDS,
+        stickiness: float = DISPATCH_STICKINESS
+    ):
+        self.enabled = enabled
+        self.resolve_seconds = resolve_seconds
+        self.stickiness = stickiness
+        self._crews: Optional[Dict[int, CrewSlots]] = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.counters = {
+            "repairs": 0, "dispatched": 0, "displaced": 0, "returned": 0, "conflicts": 0, "full_resolves": 0
+        }
+        self.last_repair: Optional[Dict] = None
+        self.last_resolve: Optional[Dict] = None
+
+    def start(self):
+        """Re-solve every ``resolve_seconds`` in a background thread (idempotent)"""
+        if not self.enabled or self.resolve_seconds <= 0 or (self._thread and self._thread.is_alive()):
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_schedule, name="dispatch-resolver", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def invalidate(self):
+        """Drop the in-memory state (reloaded on the next event), e.g. after a batch optimization"""
+        with self._lock:
+            self._crews = None
+
+    def _run_schedule(self):
+        from ..database import SessionLocal
+
+        while True:
+            db = SessionLocal()
+            try:
+                self.resolve(db)
+            except Exception:
+                logger.exception("Error re-solving crew dispatch")
+            finally:
+                db.close()
+            if self._stop.wait(self.resolve_seconds):
+                return
+
+    # Events
+
+    def issue_changed(self, db: Session, issue: Issue) -> List[Change]:
+        """Call after committing an issue's status: dispatch it when verified, forget it once started"""
+        if not self.enabled:
+            return []
+
+        def plan(loads):
+            holder = self._holder(issue.id)
+            if holder is not None and issue.status != IssueStatus.ASSIGNED:
+                del holder.pending[issue.id]
+                if issue.status == IssueStatus.VERIFIED:
+                    # Sent back to the backlog by hand: its assignment goes too
+                    holder.load -= 1
+                    return self._plan_insert(db, issue, source=holder.id)
+                return []
+            if holder is not None or not self._dispatchable_issue(issue):
+                return []
+            # Sent back by hand before this state saw its assignment (e.g. after a reload)
+            active = db.query(Assignment).filter(
+                Assignment.issue_id == issue.id,
+                Assignment.started_at.is_(None),
+                Assignment.is_completed == False
+            ).first()
+            if active is None:
+                return self._plan_insert(db, issue)
+            source = self._crews.get(active.crew_id)
+            if source is not None:
+                source.load -= 1
+            else:
+                loads[active.crew_id] = db.query(Crew.current_load).filter(Crew.id == active.crew_id).scalar() or 0
+            return self._plan_insert(db, issue, source=active.crew_id)
+
+        return self._repair(db, plan, "issue")
+
+    def crew_changed(self, db: Session, crew: Crew) -> List[Change]:
+        """Call after committing a crew's status, position or capacity"""
+        if not self.enabled:
+            return []
+
+        def plan(loads):
+            previous = self._crews.pop(crew.id, None)
+            if not self._dispatchable_crew(crew):
+                if previous is None or not previous.pending:
+                    return []
+                changes = []
+                released = db.query(Issue).filter(Issue.id.in_(list(previous.pending))).all()
+                for issue in sorted(released, key=lambda issue: -(issue.priority_score or 0)):
+                    changes += self._plan_insert(db, issue, source=crew.id)
+                return changes
+
+            slots = self._crews[crew.id] = CrewSlots(crew)
+            loads[crew.id] = slots.load
+            # Its assignments, re-costed from its current position
+            kept = [issue for _, issue in self._movable(db, [crew.id])]
+            if kept:
+                costs = optimizer.cost_matrix(kept, [slots])[:, 0]
+                slots.pending = {issue.id: self._pair_cost(cost) for issue, cost in zip(kept, costs)}
+
+            changes = []
+            backlog = self._backlog(db, crew) if slots.free > 0 else []
+            if backlog:
+                costs = optimizer.cost_matrix(backlog, [slots])[:, 0]
+                for i in np.argsort(costs, kind="stable")[:slots.free].tolist():
+                    if np.isfinite(costs[i]):
+                        slots.pending[backlog[i].id] = float(costs[i])
+                        slots.load += 1
+                        changes.append((backlog[i].id, None, crew.id))
+            return changes
+
+        return self._repair(db, plan, "crew")
+
+    def _repair(self, db: Session, plan, event: str) -> List[Change]:
+        """Plan against the in-memory state and write it back; replanned once on a stale state"""
+        for _ in range(2):
+            with self._lock:
+                timer = StageTimer()
+                try:
+                    if self._crews is None:
+                        with timer.stage("load"):
+                            self._load_state(db)
+                    loads = {crew_id: slots.load for crew_id, slots in self._crews.items()}
+                    with timer.stage("plan"):
+                        changes = plan(loads)
+                    if changes:
+                        with timer.stage("write"):
+                            self._apply(db, changes, loads)
+                except StaleState:
+                    db.rollback()
+                    self._crews = None
+                    self.counters["conflicts"] += 1
+                    continue
+                except Exception:
+                    db.rollback()
+                    self._crews = None
+                    raise
+
+                self.counters["repairs"] += 1
+                self.last_repair = timer.fields(event=event, changes=len(changes))
+                logger.debug("Dispatch repaired", extra=self.last_repair)
+                return changes
+        logger.warning("Incremental dispatch gave up after repeated conflicts (%s event)", event)
+        return []
+
+    def _plan_insert(self, db: Session, issue: Issue, source: Optional[int] = None) -> List[Change]:
+        """
+        Best single insertion of ``issue`` (taken off crew ``source``, if any):
+        a free slot, or the slot of a full crew's worst assignment when the
+        issue is cheaper there, the displaced issue moving to its best free
+        slot or back to the backlog. Updates the in-memory state.
+        """
+        crews = list(self._crews.values())
+        reward = optimizer.assignment_reward
+        costs = optimizer.cost_matrix([issue], crews)[0] if crews else np.empty(0)
+
+        # (gain, crew, cost, displaced issue id, its new crew or None, its new cost)
+        best = (0.0, None, None, None, None, None)
+        victims = []
+        for crew, cost in zip(crews, costs.tolist()):
+            if not np.isfinite(cost):
+                continue
+            if crew.free > 0:
+                if reward - cost > best[0]:
+                    best = (reward - cost, crew, cost, None, None, None)
+            elif crew.pending:
+                victim, victim_cost = crew.worst()
+                if victim_cost > cost:
+                    victims.append((crew, cost, victim, victim_cost))
+
+        if victims:
+            displaced = {row.id: row for row in db.query(Issue).filter(Issue.id.in_([v[2] for v in victims]))}
+            victims = [v for v in victims if v[2] in displaced]
+            free_crews = [crew for crew in crews if crew.free > 0]
+            moves = (
+                optimizer.cost_matrix([displaced[v[2]] for v in victims], free_crews)
+                if victims and free_crews else None
+            )
+            for n, (crew, cost, victim, victim_cost) in enumerate(victims):
+                # Dropping the victim loses (reward - victim_cost); moving it wins (reward - its new cost)
+                gain, target, target_cost = victim_cost - cost, None, None
+                if moves is not None and np.isfinite(moves[n]).any():
+                    m = int(np.argmin(moves[n]))
+                    gain += reward - moves[n, m]
+                    target, target_cost = free_crews[m], float(moves[n, m])
+                if gain > best[0]:
+                    best = (gain, crew, cost, victim, target, target_cost)
+
+        _, crew, cost, victim, target, target_cost = best
+        if crew is None:
+            return [(issue.id, source, None)] if source is not None else []
+
+        crew.pending[issue.id] = float(cost)
+        crew.load += 1
+        changes = [(issue.id, source, crew.id)]
+        if victim is not None:
+            del crew.pending[victim]
+            crew.load -= 1
+            if target is not None:
+                target.pending[victim] = target_cost
+                target.load += 1
+            changes.append((victim, crew.id, target.id if target is not None else None))
+        return changes
+
+    def _apply(self, db: Session, changes: List[Change], loads: Dict[int, int]):
+        """Write planned changes (crew rows locked and checked against the loads planned from)"""
+        crew_ids = {crew_id for _, source, target in changes for crew_id in (source, target) if crew_id is not None}
+        # populate_existing: rows already in the session must show what other workers committed
+        crews = db.query(Crew).filter(Crew.id.in_(crew_ids)).with_for_update().populate_existing().all()
+        if len(crews) != len(crew_ids) or any((crew.current_load or 0) != loads.get(crew.id) for crew in crews):
+            raise StaleState()
+
+        issue_ids = [issue_id for issue_id, _, _ in changes]
+        issues = {issue.id: issue for issue in db.query(Issue).filter(Issue.id.in_(issue_ids)).populate_existing()}
+        movable = {
+            assignment.issue_id: assignment
+            for assignment in db.query(Assignment).filter(
+                Assignment.issue_id.in_([issue_id for issue_id, source, _ in changes if source is not None]),
+                Assignment.started_at.is_(None),
+                Assignment.is_completed == False
+            ).populate_existing()
+        }
+
+        now = datetime.utcnow()
+        delta = dict.fromkeys(crew_ids, 0)
+        for issue_id, source, target in changes:
+            issue = issues.get(issue_id)
+            if issue is None:
+                raise StaleState()
+            if source is None:
+                if issue.status != IssueStatus.VERIFIED:
+                    raise StaleState()
+                db.add(Assignment(issue_id=issue_id, crew_id=target, estimated_duration=60))
+                issue.status = IssueStatus.ASSIGNED
+                issue.assigned_at = now
+            else:
+                assignment = movable.get(issue_id)
+                if assignment is None or assignment.crew_id != source:
+                    raise StaleState()
+                delta[source] -= 1
+                if target is None:
+                    db.delete(assignment)
+                    issue.status = IssueStatus.VERIFIED
+                    issue.assigned_at = None
+                else:
+                    assignment.crew_id = target
+                    assignment.assigned_at = now
+                    # Also for an issue sent back to the backlog by hand, which is VERIFIED here
+                    issue.status = IssueStatus.ASSIGNED
+                    issue.assigned_at = now
+            if target is not None:
+                delta[target] += 1
+
+        for crew in crews:
+            crew.current_load = (crew.current_load or 0) + delta[crew.id]
+            # Crews taken out of dispatch (offline, busy by hand) keep their status
+            if crew.id in self._crews:
+                crew.status = CrewStatus.BUSY if crew.current_load >= crew.max_capacity else CrewStatus.AVAILABLE
+
+        db.commit()
+        priority_index.issues_changed(db, list(issues.values()))
+        for _, source, target in changes:
+            key = "dispatched" if source is None else "displaced" if target is not None else "returned"
+            self.counters[key] += 1
+
+    # Full re-solve
+
+    def resolve(self, db: Session) -> Dict:
+        """Re-optimize every movable assignment and the verified backlog, then reload the state"""
+        with self._lock:
+            timer = StageTimer()
+            if db.get_bind().dialect.name == "postgresql" and not db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": DISPATCH_RESOLVE_LOCK_ID}
+            ).scalar():
+                db.rollback()
+                return {"skipped": "a re-solve is already running in another worker"}
+
+            try:
+                with timer.stage("load"):
+                    crews = [crew for crew in db.query(Crew).filter(
+                        Crew.status.in_([CrewStatus.AVAILABLE, CrewStatus.BUSY])
+                    ).all() if self._dispatchable_crew(crew)]
+                    rows = self._movable(db, [crew.id for crew in crews])
+                    backlog = self._backlog(db)
+                issues = [issue for _, issue in rows] + backlog
+                current = {issue.id: assignment.crew_id for assignment, issue in rows}
+
+                changes, solution = [], {}
+                if issues and crews:
+                    column = {crew.id: j for j, crew in enumerate(crews)}
+                    movable_counts = dict.fromkeys(column, 0)
+                    for crew_id in current.values():
+                        movable_counts[crew_id] += 1
+                    capacities = [
+                        crew.max_capacity - (crew.current_load or 0) + movable_counts[crew.id] for crew in crews
+                    ]
+                    with timer.stage("costs"):
+                        costs = optimizer.cost_matrix(issues, crews)
+                        sticky = costs.copy()
+                        rows_index = np.arange(len(rows))
+                        current_columns = np.array([column[current[issue.id]] for _, issue in rows], dtype=np.int64)
+                        sticky[rows_index, current_columns] -= self.stickiness
+                    with timer.stage("solve"):
+                        pairs = optimizer.solve_pairs(issues, crews, capacities, sticky)
+                    solution = {issues[i].id: (crews[j].id, float(costs[i, j])) for i, j in pairs}
+                    for issue in issues:
+                        source = current.get(issue.id)
+                        target = solution.get(issue.id, (None, None))[0]
+                        if source != target:
+                            changes.append((issue.id, source, target))
+
+                # The solution becomes the in-memory state
+                state = {crew.id: CrewSlots(crew) for crew in crews}
+                loads = {crew_id: slots.load for crew_id, slots in state.items()}
+                for crew_id in current.values():
+                    state[crew_id].load -= 1
+                for issue_id, (crew_id, cost) in solution.items():
+                    state[crew_id].pending[issue_id] = self._pair_cost(cost)
+                    state[crew_id].load += 1
+                self._crews = state
+                with timer.stage("write"):
+                    if changes:
+                        self._apply(db, changes, loads)
+                    else:
+                        db.commit()
+            except Exception:
+                db.rollback()
+                self._crews = None
+                raise
+
+            self.counters["full_resolves"] += 1
+            self.last_resolve = timer.fields(
+                finished_at=datetime.utcnow().isoformat(),
+                crews=len(crews),
+                issues=len(issues),
+                assigned=len(solution),
+                reassigned=sum(1 for _, source, target in changes if source is not None)
+            )
+            logger.info("Dispatch re-solved", extra=self.last_resolve)
+            return self.last_resolve
+
+    # State
+
+    def _load_state(self, db: Session):
+        crews = [crew for crew in db.query(Crew).filter(
+            Crew.status.in_([CrewStatus.AVAILABLE, CrewStatus.BUSY])
+        ).all() if self._dispatchable_crew(crew)]
+        state = {crew.id: CrewSlots(crew) for crew in crews}
+        rows = self._movable(db, list(state))
+        if rows:
+            slots = list(state.values())
+            column = {crew.id: j for j, crew in enumerate(slots)}
+            costs = optimizer.cost_matrix([issue for _, issue in rows], slots)
+            for i, (assignment, issue) in enumerate(rows):
+                state[assignment.crew_id].pending[issue.id] = self._pair_cost(costs[i, column[assignment.crew_id]])
+        self._crews = state
+
+    def _movable(self, db: Session, crew_ids: List[int]) -> List[Tuple[Assignment, Issue]]:
+        """Assignments of these crews that have not started"""
+        if not crew_ids:
+            return []
+        return db.query(Assignment, Issue).join(Issue, Assignment.issue_id == Issue.id).filter(
+            Assignment.crew_id.in_(crew_ids),
+            Assignment.started_at.is_(None),
+            Assignment.is_completed == False,
+            Issue.status == IssueStatus.ASSIGNED
+        ).all()
+
+    def _backlog(self, db: Session, crew: Optional[Crew] = None) -> List[Issue]:
+        """Verified, unassigned issues above the dispatch threshold (those a crew can handle, when given)"""
+        query = db.query(Issue).filter(
+            Issue.is_duplicate == False,
+            Issue.status == IssueStatus.VERIFIED,
+            Issue.priority_score >= DISPATCH_MIN_PRIORITY
+        )
+        if crew is None:
+            return query.all()
+        if crew.department != "General":
+            categories = [IssueCategory(category) for category, department in DEPARTMENTS.items()
+                          if department == crew.department]
+            if not categories:
+                return []
+            query = query.filter(Issue.category.in_(categories))
+        return query.order_by(Issue.priority_score.desc()).limit(DISPATCH_BACKLOG_LIMIT).all()
+
+    def _holder(self, issue_id: int) -> Optional[CrewSlots]:
+        for slots in self._crews.values():
+            if issue_id in slots.pending:
+                return slots
+        return None
+
+    @staticmethod
+    def _dispatchable_crew(crew: Crew) -> bool:
+        """Available crews, and busy ones only because they are full (their assignments can still move)"""
+        return crew.status == CrewStatus.AVAILABLE or (
+            crew.status == CrewStatus.BUSY and (crew.current_load or 0) >= (crew.max_capacity or 0)
+        )
+
+    @staticmethod
+    def _dispatchable_issue(issue: Issue) -> bool:
+        return (
+            issue.status == IssueStatus.VERIFIED
+            and not issue.is_duplicate
+            and (issue.priority_score or 0) >= DISPATCH_MIN_PRIORITY
+        )
+
+    @staticmethod
+    def _pair_cost(cost: float) -> float:
+        # A crew that moved out of range: its assignment is the first to go
+        return float(cost) if np.isfinite(cost) else optimizer.assignment_reward * 2 + 1.0
+
+    def stats(self) -> Dict:
+        crews = self._crews
+        return {
+            "enabled": self.enabled,
+            "resolve_seconds": self.resolve_seconds,
+            "scheduled": bool(self._thread and self._thread.is_alive()),
+            "crews": len(crews) if crews is not None else None,
+            "movable_assignments": sum(len(slots.pending) for slots in crews.values()) if crews is not None else None,
+            "free_slots": sum(max(slots.free, 0) for slots in crews.values()) if crews is not None else None,
+            **self.counters,
+            "last_repair": self.last_repair,
+            "last_resolve": self.last_resolve,
+        }
+
+
+# Singleton instance
+dispatcher = IncrementalDispatcher()
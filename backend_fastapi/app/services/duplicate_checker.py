@@ -1,32 +1,86 @@
 """
 Duplicate detection service using perceptual hashing and geo-distance clustering
 """
+import operator
+import os
+from functools import reduce
 import imagehash
-from PIL import Image
-import io
-from geopy.distance import geodesic
+import logging
+import numpy as np
 from typing import List, Tuple, Optional
+from sqlalchemy import cast, func
 from sqlalchemy.orm import Session
 from ..models.issue import Issue
+from .image_ingest import IngestedImage, ingest_image
+from .logs import StageTimer
+from .hash_index import hamming_distance, hamming_distances, hash_to_words, max_distance_for_similarity
+from .spatial_index import SpatialGridIndex
+from .text_dedup import TextLSHIndex, jaccard, normalize_text, shingles
+from . import geo
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
+# Reports older than this are never merged (the hash index makes weeks affordable)
+DUPLICATE_WINDOW_HOURS = float(os.getenv("DUPLICATE_WINDOW_HOURS", "24"))
+# Optional cheap 64-bit dHash check before the full 256-bit phash comparison
+DHASH_PREFILTER = os.getenv("DUPLICATE_DHASH_PREFILTER", "false").lower() in ("1", "true", "yes")
+DHASH_MAX_DISTANCE = int(os.getenv("DUPLICATE_DHASH_MAX_DISTANCE", "20"))
+# Score hashes inside PostgreSQL (bit_count, PG 14+) when the index cannot answer:
+# "auto" (on for PostgreSQL), "true" or "false"
+DUPLICATE_SQL_SCORING = os.getenv("DUPLICATE_SQL_SCORING", "auto").lower()
+
 
 class DuplicateChecker:
     def __init__(self):
         self.hash_size = 16  # Perceptual hash size
+        self.dhash_size = 8  # Difference hash size (prefilter)
         self.geo_threshold_km = 0.1  # 100 meters threshold for duplicate detection
-        self.time_threshold_hours = 24  # Consider reports within 24 hours
+        self.time_threshold_hours = DUPLICATE_WINDOW_HOURS  # Consider reports within 24 hours by default
+        self.similarity_threshold = 0.85  # Minimum image hash similarity of a duplicate
+        # hash_similarity normalizes by len(hash rows) * 8, i.e. hash_size * 8 bits
+        self.similarity_scale = self.hash_size * 8
+        self.max_hash_distance = max_distance_for_similarity(self.similarity_scale, self.similarity_threshold)
+        self.spatial_index = SpatialGridIndex(
+            self.time_threshold_hours,
+            hash_bits=self.hash_size ** 2,
+            hash_max_distance=self.max_hash_distance
+        )
+        self.text_index = TextLSHIndex(self.time_threshold_hours)
     
     def compute_image_hash(self, image_bytes: bytes) -> str:
         """Compute perceptual hash of image"""
         try:
-            image = Image.open(io.BytesIO(image_bytes))
-            image_hash = imagehash.phash(image, hash_size=self.hash_size)
+            ingested = ingest_image(image_bytes)
+        except Exception as e:
+            logger.error("Error computing image hash: %s", e)
+            return ""
+        return self.compute_hash(ingested)
+    
+    def compute_hash(self, ingested: IngestedImage) -> str:
+        """Compute perceptual hash of an already decoded upload"""
+        try:
+            # phash works on a (hash_size * 4)^2 grayscale view; hand it that directly
+            hash_view = ingested.hash_view(self.hash_size * 4)
+            image_hash = imagehash.phash(hash_view, hash_size=self.hash_size)
             return str(image_hash)
         except Exception as e:
-            print(f"Error computing image hash: {e}")
+            logger.error("Error computing image hash: %s", e)
             return ""
     
+    def compute_dhash(self, ingested: IngestedImage) -> str:
+        """Compute the difference hash used as a cheap duplicate prefilter"""
+        try:
+            image_hash = imagehash.dhash(ingested.hash_view(self.hash_size * 4), hash_size=self.dhash_size)
+            return str(image_hash)
+        except Exception as e:
+            logger.error("Error computing image dhash: %s", e)
+            return ""
+    
+    def compute_hashes(self, ingested: IngestedImage) -> Tuple[str, str]:
+        """(perceptual hash, difference hash) of an already decoded upload"""
+        return self.compute_hash(ingested), self.compute_dhash(ingested)
+    
     def hash_similarity(self, hash1: str, hash2: str) -> float:
         """Calculate similarity between two hashes (0-1, higher is more similar)"""
         if not hash1 or not hash2:
@@ -41,16 +95,34 @@ class DuplicateChecker:
             similarity = 1.0 - (distance / max_distance)
             return similarity
         except Exception as e:
-            print(f"Error calculating hash similarity: {e}")
+            logger.error("Error calculating hash similarity: %s", e)
             return 0.0
     
+    def hash_similarities(self, image_hash: str, issues: List[Issue]) -> np.ndarray:
+        """hash_similarity of ``image_hash`` to every issue, vectorized"""
+        bits = self.hash_size ** 2
+        query = hash_to_words(image_hash, bits)
+        similarities = np.zeros(len(issues))
+        if query is None or not issues:
+            return similarities
+        
+        words, comparable = [], []
+        for issue in issues:
+            issue_words = issue.image_phash_words
+            if None in issue_words:
+                # Not backfilled by migrate_db.py yet
+                issue_words = hash_to_words(issue.image_hash, bits)
+            comparable.append(issue_words is not None)
+            words.append(issue_words or [0] * len(query))
+        
+        distances = hamming_distances(np.array(words, dtype=np.int64), query)
+        similarities = 1.0 - distances / self.similarity_scale
+        similarities[~np.array(comparable)] = 0.0  # Different hash size
+        return similarities
+    
     def geo_distance_km(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance between two coordinates in kilometers"""
-        try:
-            return geodesic((lat1, lon1), (lat2, lon2)).kilometers
-        except Exception as e:
-            print(f"Error calculating geo distance: {e}")
-            return float('inf')
+        return geo.distance_km(lat1, lon1, lat2, lon2)
     
     def find_duplicates(
         self,
@@ -59,7 +131,8 @@ class DuplicateChecker:
         latitude: float,
         longitude: float,
         category: str,
-        time_window_hours: int = None
+        time_window_hours: int = None,
+        image_dhash: str = None
     ) -> Optional[Issue]:
         """
         Find duplicate issues based on image hash, location, and time
@@ -73,40 +146,250 @@ class DuplicateChecker:
         time_window = time_window_hours or self.time_threshold_hours
         time_threshold = datetime.utcnow() - timedelta(hours=time_window)
         
-        # Query recent issues of the same category
-        recent_issues = db.query(Issue).filter(
-            Issue.category == category,
-            Issue.reported_at >= time_threshold,
-            Issue.is_duplicate == False,
-            Issue.image_hash.isnot(None)
-        ).all()
+        timer = StageTimer()
+        # Recent issues of the same category with a similar image (or nearby)
+        with timer.stage("candidates"):
+            recent_issues = self.image_candidates(
+                db, image_hash, image_dhash, latitude, longitude, category, time_window, time_threshold
+            )
         
-        best_match = None
-        best_similarity = 0.0
+        recent_issues = [issue for issue in recent_issues if issue.image_hash]
+        if DHASH_PREFILTER and image_dhash:
+            recent_issues = [
+                issue for issue in recent_issues
+                if not issue.image_dhash
+                or hamming_distance(int(image_dhash, 16), int(issue.image_dhash, 16)) <= DHASH_MAX_DISTANCE
+            ]
         
-        for issue in recent_issues:
-            if not issue.image_hash:
-                continue
-            
-            # Check image hash similarity
-            hash_sim = self.hash_similarity(image_hash, issue.image_hash)
-            
-            # Check geo distance
-            geo_dist = self.geo_distance_km(
+        # Score every candidate at once (XOR + popcount over the stored hash words)
+        with timer.stage("scoring"):
+            similarities = self.hash_similarities(image_hash, recent_issues)
+            distances = geo.distances_km(
                 latitude, longitude,
-                issue.latitude, issue.longitude
+                [issue.latitude for issue in recent_issues],
+                [issue.longitude for issue in recent_issues]
             )
-            
+        
+        best_match = None
+        best_similarity = 0.0
+        
+        for issue, hash_sim, geo_dist in zip(recent_issues, similarities, distances):
             # Consider duplicate if:
             # 1. Hash similarity > 0.85 (very similar images)
             # 2. AND geo distance < threshold (same location)
-            if hash_sim > 0.85 and geo_dist < self.geo_threshold_km:
+            if hash_sim > self.similarity_threshold and geo_dist < self.geo_threshold_km:
                 if hash_sim > best_similarity:
                     best_similarity = hash_sim
                     best_match = issue
         
+        logger.debug("Image duplicate lookup", extra=timer.fields(
+            candidates=len(recent_issues), duplicate_of=best_match.id if best_match else None
+        ))
+        return best_match
+    
+    def image_candidates(
+        self,
+        db: Session,
+        image_hash: str,
+        image_dhash: Optional[str],
+        latitude: float,
+        longitude: float,
+        category: str,
+        time_window_hours: float,
+        time_threshold: datetime
+    ) -> List[Issue]:
+        """
+        Candidate issues for an image hash. With a warm index this is a Hamming
+        radius query (multi-index hashing) at the similarity threshold: near
+        identical photos are rare, so the result stays a handful of issues
+        however long the window is. Otherwise falls back to nearby_issues.
+        """
+        index = self.spatial_index
+        if not (index.is_warm and time_window_hours <= index.window_hours
+                and len(image_hash) * 4 == index.hash_bits):
+            if self._sql_scoring(db):
+                index.warm_async()
+                return self._sql_image_candidates(db, image_hash, latitude, longitude, category, time_threshold)
+            return self.nearby_issues(db, latitude, longitude, category, time_window_hours, time_threshold)
+        
+        index.sync(db)
+        matches = index.similar_images(
+            category, image_hash, self.max_hash_distance, time_threshold,
+            image_dhash if DHASH_PREFILTER else None, DHASH_MAX_DISTANCE
+        )
+        return self._load_candidates(db, [entry.id for entry, _ in matches])
+    
+    def nearby_issues(
+        self,
+        db: Session,
+        latitude: float,
+        longitude: float,
+        category: str,
+        time_window_hours: float,
+        time_threshold: datetime
+    ) -> List[Issue]:
+        """
+        Candidate issues with an image hash around a location: the few issues in
+        the neighbouring grid cells when the spatial index is warm, otherwise a
+        bounding-box query (while the index warms up in the background).
+        """
+        index = self.spatial_index
+        if index.is_warm and time_window_hours <= index.window_hours:
+            index.sync(db)
+            return self._load_candidates(db, [
+                entry.id
+                for entry in index.candidates(category, latitude, longitude, self.geo_threshold_km, time_threshold)
+                if entry.image_hash
+            ])
+        
+        index.warm_async()
+        min_lat, max_lat, min_lon, max_lon = geo.bounding_box(latitude, longitude, self.geo_threshold_km)
+        return db.query(Issue).filter(
+            Issue.category == category,
+            Issue.reported_at >= time_threshold,
+            Issue.is_duplicate == False,
+            Issue.image_hash.isnot(None),
+            Issue.latitude.between(min_lat, max_lat),
+            Issue.longitude.between(min_lon, max_lon)
+        ).all()
+    
+    def _sql_scoring(self, db: Session) -> bool:
+        if DUPLICATE_SQL_SCORING == "auto":
+            return db.get_bind().dialect.name == "postgresql"
+        return DUPLICATE_SQL_SCORING in ("1", "true", "yes")
+    
+    def _sql_image_candidates(
+        self,
+        db: Session,
+        image_hash: str,
+        latitude: float,
+        longitude: float,
+        category: str,
+        time_threshold: datetime
+    ) -> List[Issue]:
+        """
+        Bounding box + Hamming distance filter evaluated by PostgreSQL
+        (XOR and bit_count per 64-bit word): only matching rows leave the database.
+        """
+        from sqlalchemy.dialects.postgresql import BIT
+        
+        query_words = hash_to_words(image_hash, self.hash_size ** 2)
+        if query_words is None:
+            return []
+        columns = (Issue.image_phash_0, Issue.image_phash_1, Issue.image_phash_2, Issue.image_phash_3)
+        distance = reduce(operator.add, [
+            func.bit_count(cast(column.op("#")(word), BIT(64)))
+            for column, word in zip(columns, query_words)
+        ])
+        min_lat, max_lat, min_lon, max_lon = geo.bounding_box(latitude, longitude, self.geo_threshold_km)
+        return db.query(Issue).filter(
+            Issue.category == category,
+            Issue.reported_at >= time_threshold,
+            Issue.is_duplicate == False,
+            Issue.image_phash_0.isnot(None),
+            Issue.latitude.between(min_lat, max_lat),
+            Issue.longitude.between(min_lon, max_lon),
+            distance <= self.max_hash_distance
+        ).all()
+    
+    def find_text_duplicate(
+        self,
+        db: Session,
+        title: str,
+        description: Optional[str],
+        latitude: float,
+        longitude: float,
+        category: str,
+        time_window_hours: int = None
+    ) -> Optional[Issue]:
+        """
+        Find a recent nearby issue of the same category whose title and
+        description are a near copy (for reports without a photo)
+        
+        Returns:
+            Issue object if duplicate found, None otherwise
+        """
+        time_window = time_window_hours or self.time_threshold_hours
+        time_threshold = datetime.utcnow() - timedelta(hours=time_window)
+        
+        timer = StageTimer()
+        index = self.text_index
+        if index.is_warm and time_window <= index.window_hours:
+            # MinHash LSH candidates, then the geo constraint
+            with timer.stage("candidates"):
+                index.sync(db)
+                matches = index.similar_texts(category, title, description, time_threshold)
+            best_match = None
+            with timer.stage("verify"):
+                distances = geo.distances_km(
+                    latitude, longitude,
+                    [entry.latitude for entry, _ in matches],
+                    [entry.longitude for entry, _ in matches]
+                )
+                for (entry, _), geo_dist in zip(matches, distances):
+                    if geo_dist < self.geo_threshold_km:
+                        best_match = db.query(Issue).filter(Issue.id == entry.id, Issue.is_duplicate == False).first()
+                        if best_match is not None:
+                            break
+            logger.debug("Text duplicate lookup", extra=timer.fields(
+                index="lsh", candidates=len(matches), duplicate_of=best_match.id if best_match else None
+            ))
+            return best_match
+        
+        # Cold index: compare against the issues around the report
+        index.warm_async()
+        shingle_hashes = shingles(normalize_text(title, description))
+        if not shingle_hashes:
+            return None
+        with timer.stage("candidates"):
+            min_lat, max_lat, min_lon, max_lon = geo.bounding_box(latitude, longitude, self.geo_threshold_km)
+            nearby = db.query(Issue).filter(
+                Issue.category == category,
+                Issue.reported_at >= time_threshold,
+                Issue.is_duplicate == False,
+                Issue.latitude.between(min_lat, max_lat),
+                Issue.longitude.between(min_lon, max_lon)
+            ).all()
+        
+        best_match = None
+        best_similarity = 0.0
+        with timer.stage("verify"):
+            distances = geo.distances_km(
+                latitude, longitude,
+                [issue.latitude for issue in nearby],
+                [issue.longitude for issue in nearby]
+            )
+            for issue, geo_dist in zip(nearby, distances):
+                if geo_dist >= self.geo_threshold_km:
+                    continue
+                similarity = jaccard(shingle_hashes, shingles(normalize_text(issue.title, issue.description)))
+                if similarity >= index.threshold and similarity > best_similarity:
+                    best_similarity = similarity
+                    best_match = issue
+        
+        logger.debug("Text duplicate lookup", extra=timer.fields(
+            index="bbox", candidates=len(nearby), duplicate_of=best_match.id if best_match else None
+        ))
         return best_match
     
+    def _load_candidates(self, db: Session, candidate_ids: List[int]) -> List[Issue]:
+        """Re-check index candidates against the database: the index is only a prefilter"""
+        if not candidate_ids:
+            return []
+        return db.query(Issue).filter(
+            Issue.id.in_(candidate_ids),
+            Issue.is_duplicate == False,
+            Issue.image_hash.isnot(None)
+        ).all()
+    
+    def index_stats(self) -> dict:
+        """State of the spatial candidate index"""
+        return self.spatial_index.stats()
+    
+    def text_index_stats(self) -> dict:
+        """State of the MinHash LSH index of report texts"""
+        return self.text_index.stats()
+    
     def mark_as_duplicate(
         self,
         db: Session,
@@ -120,9 +403,11 @@ class DuplicateChecker:
         
         # Trigger priority re-calculation
         from .priority_engine import priority_engine
+        from .priority_index import priority_index
         priority_engine.update_priority(original_issue)
         
         db.commit()
+        priority_index.issues_changed(db, [duplicate_issue, original_issue])
 
     def increment_upvotes(self, db: Session, original_issue: Issue):
         """Increment upvotes on an issue without marking a new one (used when a new report is a duplicate)"""
@@ -130,9 +415,11 @@ class DuplicateChecker:
         
         # Trigger priority re-calculation
         from .priority_engine import priority_engine
+        from .priority_index import priority_index
         priority_engine.update_priority(original_issue)
         
         db.commit()
+        priority_index.issues_changed(db, [original_issue])
 
 
 # Singleton instance
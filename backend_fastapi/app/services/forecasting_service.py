@@ -1,6 +1,7 @@
 """
 Forecasting service using Prophet for hotspot prediction
 """
+import logging
 import pandas as pd
 from prophet import Prophet
 from typing import List, Dict, Tuple
@@ -9,6 +10,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from ..models.issue import Issue
 
+logger = logging.getLogger(__name__)
+
 
 class ForecastingService:
     def __init__(self):
@@ -71,7 +74,7 @@ class ForecastingService:
             model.fit(df)
             return model
         except Exception as e:
-            print(f"Prophet training failed: {e}")
+            logger.error("Prophet training failed: %s", e)
             return None
 
     def predict_hotspots(
@@ -116,7 +119,7 @@ class ForecastingService:
             
             return predictions
         except Exception as e:
-            print(f"Prediction failed: {e}")
+            logger.error("Prediction failed: %s", e)
             return []
     
     def get_location_hotspots(
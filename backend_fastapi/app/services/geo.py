@@ -0,0 +1,105 @@
+"""
+Vectorized geographic distances shared by the services
+
+Distances are computed for whole coordinate arrays at once with the
+haversine formula on a spherical Earth (within ~0.5% of the WGS84
+ellipsoid). ``GEO_DISTANCE_MODE=geodesic`` switches to geopy's ellipsoidal
+geodesic for exact distances, at the cost of one iterative solve per pair.
+"""
+import math
+import os
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# "haversine" (vectorized, default) or "geodesic" (geopy, per pair)
+GEO_DISTANCE_MODE = os.getenv("GEO_DISTANCE_MODE", "haversine").lower()
+
+EARTH_RADIUS_KM = 6371.0088  # Mean Earth radius (IUGG)
+METERS_PER_DEGREE_LAT = 111320.0
+# Bounding box padding for the spherical approximation (WGS84 degrees vary ~1%)
+BBOX_MARGIN = 1.02
+
+
+def _coordinates(values) -> np.ndarray:
+    # None (e.g. a crew without a position) becomes NaN and yields an infinite distance
+    return np.asarray(values, dtype=np.float64)
+
+
+def _invalid_to_inf(distances: np.ndarray, *latitudes: np.ndarray) -> np.ndarray:
+    invalid = np.isnan(distances)
+    for lat in latitudes:
+        invalid |= np.abs(lat) > 90.0
+    distances[invalid] = np.inf
+    return distances
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km; arguments broadcast like NumPy arrays"""
+    lat1, lon1, lat2, lon2 = map(_coordinates, (lat1, lon1, lat2, lon2))
+    with np.errstate(invalid="ignore"):
+        phi1, phi2 = np.radians(lat1), np.radians(lat2)
+        a = (
+            np.sin((phi2 - phi1) / 2) ** 2
+            + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lon2 - lon1) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return _invalid_to_inf(np.array(distances, dtype=np.float64, ndmin=1), *np.broadcast_arrays(lat1, lat2))
+
+
+def geodesic_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Ellipsoidal (WGS84) distance in km, broadcast like ``haversine_km``"""
+    from geopy.distance import geodesic
+
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*map(_coordinates, (lat1, lon1, lat2, lon2)))
+    distances = np.empty(lat1.shape, dtype=np.float64)
+    for index in np.ndindex(lat1.shape):
+        try:
+            distances[index] = geodesic((lat1[index], lon1[index]), (lat2[index], lon2[index])).kilometers
+        except ValueError:
+            distances[index] = np.inf
+    return _invalid_to_inf(np.array(distances, ndmin=1), lat1, lat2)
+
+
+def distances_km(lat1, lon1, lat2, lon2, mode: Optional[str] = None) -> np.ndarray:
+    """Element-wise (broadcast) distances in km using ``mode`` or GEO_DISTANCE_MODE"""
+    if (mode or GEO_DISTANCE_MODE) == "geodesic":
+        return geodesic_km(lat1, lon1, lat2, lon2)
+    return haversine_km(lat1, lon1, lat2, lon2)
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float, mode: Optional[str] = None) -> float:
+    """Distance between two points in km (inf for missing or invalid coordinates)"""
+    return float(distances_km(lat1, lon1, lat2, lon2, mode)[0])
+
+
+def distance_matrix_km(
+    latitudes_a: Sequence[float],
+    longitudes_a: Sequence[float],
+    latitudes_b: Sequence[float],
+    longitudes_b: Sequence[float],
+    mode: Optional[str] = None
+) -> np.ndarray:
+    """(len(a), len(b)) matrix of distances in km between two point sets"""
+    lat_a, lon_a = _coordinates(latitudes_a)[:, None], _coordinates(longitudes_a)[:, None]
+    lat_b, lon_b = _coordinates(latitudes_b)[None, :], _coordinates(longitudes_b)[None, :]
+    return distances_km(lat_a, lon_a, lat_b, lon_b, mode).reshape(lat_a.shape[0], lat_b.shape[1])
+
+
+def within_radius(
+    latitude: float,
+    longitude: float,
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    radius_km: float,
+    mode: Optional[str] = None
+) -> np.ndarray:
+    """Boolean mask of the points strictly closer than ``radius_km``"""
+    return distances_km(latitude, longitude, latitudes, longitudes, mode) < radius_km
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) enclosing a radius, padded for the spherical approximation"""
+    dlat = radius_km * 1000 * BBOX_MARGIN / METERS_PER_DEGREE_LAT
+    dlon = dlat / max(math.cos(math.radians(min(abs(latitude) + dlat, 90.0))), 1e-6)
+    return latitude - dlat, latitude + dlat, longitude - dlon, longitude + dlon
@@ -0,0 +1,153 @@
+"""
+Hamming-space search over perceptual hashes: multi-index hashing for radius
+queries and vectorized XOR + popcount scoring of hashes stored as 64-bit words
+"""
+import math
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Stored image hashes are split into signed 64-bit words (most significant first)
+HASH_WORD_BITS = 64
+
+try:
+    _popcount = int.bit_count  # Python 3.10+
+except AttributeError:
+    def _popcount(value: int) -> int:
+        return bin(value).count("1")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return _popcount(a ^ b)
+
+
+if hasattr(np, "bitwise_count"):  # NumPy 2.0+
+    def popcount64(values: np.ndarray) -> np.ndarray:
+        """Set bits of each element of a uint64 array"""
+        return np.bitwise_count(values)
+else:
+    _BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount64(values: np.ndarray) -> np.ndarray:
+        """Set bits of each element of a uint64 array"""
+        values = np.ascontiguousarray(values, dtype=np.uint64)
+        return _BYTE_POPCOUNT[values.view(np.uint8)].reshape(values.shape + (8,)).sum(axis=-1)
+
+
+def hash_to_words(image_hash: str, bits: int = 256) -> Optional[List[int]]:
+    """Hex hash -> signed 64-bit words for BIGINT columns (None if not ``bits`` long)"""
+    if not image_hash or len(image_hash) * 4 != bits:
+        return None
+    words = []
+    for i in range(0, len(image_hash), HASH_WORD_BITS // 4):
+        word = int(image_hash[i:i + HASH_WORD_BITS // 4], 16)
+        words.append(word - (1 << 64) if word >= 1 << 63 else word)
+    return words
+
+
+def words_to_int(words: Sequence[int]) -> int:
+    """Signed 64-bit words -> the hash as one (unsigned) integer"""
+    value = 0
+    for word in words:
+        value = (value << HASH_WORD_BITS) | (word & 0xFFFFFFFFFFFFFFFF)
+    return value
+
+
+def hamming_distances(words: np.ndarray, query: Sequence[int]) -> np.ndarray:
+    """
+    Hamming distance of each row of an (n, k) int64 word matrix to the query
+    words: one vectorized XOR + popcount over the whole candidate set.
+    """
+    words = np.asarray(words, dtype=np.int64).view(np.uint64)
+    query = np.asarray(query, dtype=np.int64).view(np.uint64)
+    return popcount64(words ^ query).sum(axis=1)
+
+
+def max_distance_for_similarity(bits: int, similarity: float) -> int:
+    """Largest Hamming distance d with ``1 - d / bits > similarity``"""
+    return max(math.ceil(bits * (1.0 - similarity) - 1e-9) - 1, 0)
+
+
+class MultiIndexHashTable:
+    """
+    Multi-index hashing (Norouzi et al.): each hash is split into ``m``
+    substrings, each indexed in its own exact-match table. By pigeonhole, two
+    hashes within distance ``r`` agree to within ``r // m`` bits on at least
+    one substring, so a query only probes the keys within that small radius
+    of each substring and verifies the few candidates with a popcount.
+
+    ``m`` is chosen so the per-substring radius stays at ``substring_radius``
+    for queries up to ``max_distance``. (A BK-tree prunes poorly on 256-bit
+    phashes: every node sits ~128 bits from the others, so the triangle
+    inequality rarely excludes a subtree.)
+    """
+
+    def __init__(self, bits: int = 256, max_distance: int = 19, substring_radius: int = 1):
+        self.bits = bits
+        self.max_distance = max_distance
+        m = max_distance // (substring_radius + 1) + 1
+        self._substrings: List[Tuple[int, int]] = []  # (shift, mask)
+        self._probes: Dict[Tuple[int, int], List[int]] = {}  # (width, radius) -> xor masks
+        for i in range(m):
+            start, end = i * bits // m, (i + 1) * bits // m
+            width = end - start
+            self._substrings.append((start, (1 << width) - 1))
+            for radius in range(substring_radius + 1):
+                if (width, radius) not in self._probes:
+                    self._probes[(width, radius)] = [
+                        sum(1 << bit for bit in flipped)
+                        for k in range(radius + 1)
+                        for flipped in combinations(range(width), k)
+                    ]
+        self._widths = [mask.bit_length() for _, mask in self._substrings]
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in self._substrings]
+        self._hashes: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, key: int, value: int):
+        self.remove(key)
+        self._hashes[key] = value
+        for (shift, mask), table in zip(self._substrings, self._tables):
+            table.setdefault((value >> shift) & mask, set()).add(key)
+
+    def remove(self, key: int):
+        value = self._hashes.pop(key, None)
+        if value is None:
+            return
+        for (shift, mask), table in zip(self._substrings, self._tables):
+            substring = (value >> shift) & mask
+            keys = table.get(substring)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del table[substring]
+
+    def candidates(self, value: int, max_distance: int) -> Set[int]:
+        """Keys that may lie within ``max_distance`` (superset; verify with ``distance``)"""
+        if max_distance > self.max_distance:
+            raise ValueError(f"Index built for radius {self.max_distance}, got {max_distance}")
+        radius = max_distance // len(self._substrings)
+        found: Set[int] = set()
+        for (shift, mask), width, table in zip(self._substrings, self._widths, self._tables):
+            substring = (value >> shift) & mask
+            for probe in self._probes[(width, radius)]:
+                keys = table.get(substring ^ probe)
+                if keys:
+                    found |= keys
+        return found
+
+    def distance(self, key: int, value: int) -> int:
+        return hamming_distance(self._hashes[key], value)
+
+    def query(self, value: int, max_distance: int) -> List[Tuple[int, int]]:
+        """(key, distance) of every stored hash within ``max_distance``, closest first"""
+        matches = [
+            (key, distance)
+            for key in self.candidates(value, max_distance)
+            for distance in (self.distance(key, value),)
+            if distance <= max_distance
+        ]
+        return sorted(matches, key=lambda match: match[1])
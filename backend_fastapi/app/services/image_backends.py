@@ -0,0 +1,188 @@
+"""
+Inference backends for the image classifier (Keras, quantized TFLite or a shared model server)
+"""
+import logging
+import os
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INPUT_SHAPE = (224, 224, 3)
+NUM_CLASSES = 3
+
+
+class KerasBackend:
+    """Full Keras model executed through ``model.predict``"""
+
+    name = "keras"
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self.model = None
+        self.is_placeholder = False
+
+    def load(self):
+        """Load the pre-trained MobileNetV2 model"""
+        import tensorflow as tf
+
+        try:
+            if os.path.exists(self.model_path):
+                self.model = tf.keras.models.load_model(self.model_path)
+            else:
+                # Initialize a placeholder model structure for development
+                # In production, this should be a trained model
+                logger.warning("Model not found at %s. Using placeholder.", self.model_path)
+                self.model = self._create_placeholder_model()
+        except Exception as e:
+            logger.error("Error loading model: %s. Using placeholder.", e)
+            self.model = self._create_placeholder_model()
+
+    def _create_placeholder_model(self):
+        """Create a placeholder model for development/testing without downloading weights"""
+        import tensorflow as tf
+
+        self.is_placeholder = True
+        try:
+            # Try to use MobileNetV2 without weights (faster, no download)
+            base_model = tf.keras.applications.MobileNetV2(
+                input_shape=INPUT_SHAPE,
+                include_top=False,
+                weights=None  # No weights download - random initialization
+            )
+            base_model.trainable = False
+        except Exception as e:
+            logger.warning("Could not create MobileNetV2 base. Using simple CNN: %s", e)
+            # Fallback to simple CNN if MobileNetV2 fails
+            base_model = tf.keras.Sequential([
+                tf.keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=INPUT_SHAPE),
+                tf.keras.layers.MaxPooling2D(2, 2),
+                tf.keras.layers.Conv2D(64, (3, 3), activation='relu'),
+                tf.keras.layers.MaxPooling2D(2, 2),
+                tf.keras.layers.GlobalAveragePooling2D()
+            ])
+
+        model = tf.keras.Sequential([
+            base_model,
+            tf.keras.layers.GlobalAveragePooling2D(),
+            tf.keras.layers.Dense(128, activation='relu'),
+            tf.keras.layers.Dropout(0.2),
+            tf.keras.layers.Dense(NUM_CLASSES, activation='softmax')  # 3 categories
+        ])
+
+        model.compile(
+            optimizer='adam',
+            loss='categorical_crossentropy',
+            metrics=['accuracy']
+        )
+
+        return model
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        return self.model.predict(images, verbose=0)
+
+
+class TFLiteBackend:
+    """
+    TFLite interpreter for float16 / int8 models exported by
+    ``ml_training/image_model/train.py --export_tflite``.
+
+    Uses the lightweight ``tflite_runtime`` package when installed so the API
+    process does not need to import TensorFlow at all.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_path: str, num_threads: int = None):
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.interpreter = None
+        self.is_placeholder = False
+        self._lock = threading.Lock()  # Interpreters are not thread-safe
+        self._batch_size = None
+
+    def load(self):
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"TFLite model not found at {self.model_path}")
+
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(model_path=self.model_path, num_threads=self.num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        with self._lock:
+            batch_size = images.shape[0]
+            if batch_size != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input['index'], [batch_size, *INPUT_SHAPE])
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+                self._batch_size = batch_size
+
+            self.interpreter.set_tensor(self._input['index'], self._quantize(images, self._input))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output['index'])
+            return self._dequantize(output, self._output)
+
+    @staticmethod
+    def _quantize(values: np.ndarray, details: dict) -> np.ndarray:
+        """Map float inputs onto the model's input dtype (no-op for float models)"""
+        dtype = details['dtype']
+        if np.issubdtype(dtype, np.floating):
+            return values.astype(dtype)
+        scale, zero_point = details['quantization']
+        info = np.iinfo(dtype)
+        quantized = np.round(values / scale + zero_point)
+        return np.clip(quantized, info.min, info.max).astype(dtype)
+
+    @staticmethod
+    def _dequantize(values: np.ndarray, details: dict) -> np.ndarray:
+        """Map quantized outputs back to float probabilities"""
+        if np.issubdtype(values.dtype, np.floating):
+            return values.astype(np.float32)
+        scale, zero_point = details['quantization']
+        return (values.astype(np.float32) - zero_point) * scale
+
+
+class RemoteBackend:
+    """Forwards batches to the shared model server; TensorFlow is never imported here"""
+
+    name = "remote"
+
+    def __init__(self, client):
+        self.client = client
+        self.model_path = None
+        self.model_version = None
+        self.is_placeholder = False
+
+    def load(self):
+        info = self.client.call("info")
+        self.model_version = f"remote-{info['image_model_version']}"
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        return self.client.call("image.predict", images.astype(np.float32))
+
+
+def create_backend(name: str, keras_path: str, tflite_path: str, num_threads: int = None):
+    """Build and load the configured backend, falling back to Keras if TFLite is unavailable"""
+    if name == "tflite":
+        backend = TFLiteBackend(tflite_path, num_threads=num_threads)
+        try:
+            backend.load()
+            return backend
+        except Exception as e:
+            logger.error("Error loading TFLite backend: %s. Falling back to Keras.", e)
+    elif name != "keras":
+        logger.warning("Unknown image model backend '%s'. Using Keras.", name)
+
+    backend = KerasBackend(keras_path)
+    backend.load()
+    return backend
@@ -1,89 +1,94 @@
 """
 Image classification service using MobileNetV2 for issue category detection
 """
-import tensorflow as tf
+import logging
 import numpy as np
-from PIL import Image
-import io
 import os
-from typing import Tuple, Dict
+import uuid
+from typing import Dict, Optional, Tuple
+from .inference_batcher import BatchingInferenceQueue
+from .image_backends import RemoteBackend, create_backend
+from .model_client import get_model_client
+from .image_ingest import IngestedImage, ingest_image
+from .inference_cache import InferenceCache, content_digest, file_fingerprint
+from .logs import StageTimer
+
+logger = logging.getLogger(__name__)
 
 # Model will be loaded from saved path
 MODEL_PATH = os.getenv("IMAGE_MODEL_PATH", "ml_training/image_model/mobilenetv2_issue_classifier.keras")
 
+# Inference backend: "keras" (full model) or "tflite" (float16/int8 quantized)
+MODEL_BACKEND = os.getenv("IMAGE_MODEL_BACKEND", "keras").lower()
+TFLITE_MODEL_PATH = os.getenv("IMAGE_TFLITE_MODEL_PATH", "ml_training/image_model/mobilenetv2_issue_classifier.tflite")
+TFLITE_NUM_THREADS = int(os.getenv("IMAGE_TFLITE_NUM_THREADS", "0")) or None
+
+# Micro-batching: concurrent requests are grouped into one forward pass
+BATCH_MAX_SIZE = int(os.getenv("IMAGE_BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("IMAGE_BATCH_MAX_WAIT_MS", "5"))
+
 class ImageClassifier:
     def __init__(self):
-        self.model = None
+        self.backend = None
+        self.model_version = None
+        self.cache = InferenceCache("image_classifier")
         self.load_model()
         self.category_map = {
             0: "road_damage",
             1: "streetlight_failure",
             2: "waste_overflow"
         }
+        self.batcher = BatchingInferenceQueue(
+            self.predict_batch,
+            max_batch_size=BATCH_MAX_SIZE,
+            max_wait_ms=BATCH_MAX_WAIT_MS,
+            name="image_classifier"
+        )
     
     def load_model(self):
-        """Load the pre-trained MobileNetV2 model"""
-        try:
-            if os.path.exists(MODEL_PATH):
-                self.model = tf.keras.models.load_model(MODEL_PATH)
-            else:
-                # Initialize a placeholder model structure for development
-                # In production, this should be a trained model
-                print(f"Warning: Model not found at {MODEL_PATH}. Using placeholder.")
-                self.model = self._create_placeholder_model()
-        except Exception as e:
-            print(f"Error loading model: {e}. Using placeholder.")
-            self.model = self._create_placeholder_model()
-    
-    def _create_placeholder_model(self):
-        """Create a placeholder model for development/testing without downloading weights"""
-        try:
-            # Try to use MobileNetV2 without weights (faster, no download)
-            base_model = tf.keras.applications.MobileNetV2(
-                input_shape=(224, 224, 3),
-                include_top=False,
-                weights=None  # No weights download - random initialization
+        """Load the configured inference backend (Keras, TFLite or the shared model server)"""
+        client = get_model_client()
+        if client is not None:
+            self.backend = RemoteBackend(client)
+            self.backend.load()
+        else:
+            self.backend = create_backend(
+                MODEL_BACKEND,
+                keras_path=MODEL_PATH,
+                tflite_path=TFLITE_MODEL_PATH,
+                num_threads=TFLITE_NUM_THREADS
             )
-            base_model.trainable = False
-        except Exception as e:
-            print(f"Warning: Could not create MobileNetV2 base. Using simple CNN: {e}")
-            # Fallback to simple CNN if MobileNetV2 fails
-            base_model = tf.keras.Sequential([
-                tf.keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=(224, 224, 3)),
-                tf.keras.layers.MaxPooling2D(2, 2),
-                tf.keras.layers.Conv2D(64, (3, 3), activation='relu'),
-                tf.keras.layers.MaxPooling2D(2, 2),
-                tf.keras.layers.GlobalAveragePooling2D()
-            ])
-        
-        model = tf.keras.Sequential([
-            base_model,
-            tf.keras.layers.GlobalAveragePooling2D(),
-            tf.keras.layers.Dense(128, activation='relu'),
-            tf.keras.layers.Dropout(0.2),
-            tf.keras.layers.Dense(3, activation='softmax')  # 3 categories
-        ])
-        
-        model.compile(
-            optimizer='adam',
-            loss='categorical_crossentropy',
-            metrics=['accuracy']
-        )
-        
-        return model
+        self.model_version = self._model_version()
+        # Results of the previous model must never be served again
+        self.cache.invalidate(self.model_version)
+    
+    def _model_version(self) -> str:
+        """Identifier of the loaded weights, part of every cache key"""
+        if self.backend.is_placeholder:
+            # Randomly initialized per process: never share its results
+            return f"placeholder-{uuid.uuid4().hex[:8]}"
+        if isinstance(self.backend, RemoteBackend):
+            return self.backend.model_version
+        return f"{self.backend.name}-{file_fingerprint(self.backend.model_path)}"
     
     def preprocess_image(self, image_bytes: bytes) -> np.ndarray:
         """Preprocess image for model input"""
         try:
-            image = Image.open(io.BytesIO(image_bytes))
-            image = image.convert('RGB')
-            image = image.resize((224, 224))
-            image_array = np.array(image) / 255.0
-            image_array = np.expand_dims(image_array, axis=0)
-            return image_array
+            return ingest_image(image_bytes).classifier_input()
         except Exception as e:
             raise ValueError(f"Error preprocessing image: {e}")
     
+    def predict_batch(self, images: np.ndarray) -> np.ndarray:
+        """Run one forward pass over a stacked batch of preprocessed images"""
+        return self.backend.predict(images)
+    
+    def inference_stats(self) -> Dict:
+        """Queue depth and batch-size metrics of the batching front-end"""
+        stats = self.batcher.stats()
+        stats["backend"] = self.backend.name if self.backend else None
+        stats["cache"] = self.cache.stats()
+        return stats
+    
     def classify(self, image_bytes: bytes) -> Tuple[str, float]:
         """
         Classify image and return category and confidence
@@ -91,17 +96,54 @@ class ImageClassifier:
         Returns:
             Tuple of (category, confidence_score)
         """
+        timer = StageTimer()
+        # Retried uploads are answered from the cache without decoding
+        with timer.stage("cache"):
+            cached = self.cache.get(content_digest(image_bytes))
+        if cached is not None:
+            logger.debug("Image classified", extra=timer.fields(cached=True))
+            return tuple(cached)
+        
+        try:
+            with timer.stage("decode"):
+                ingested = ingest_image(image_bytes)
+        except Exception as e:
+            logger.error("Error in classification: %s", e, extra=timer.fields())
+            return "road_damage", 0.5  # Default fallback
+        return self.classify_image(ingested, timer)
+    
+    def classify_image(self, ingested: IngestedImage, timer: Optional[StageTimer] = None) -> Tuple[str, float]:
+        """
+        Classify an already decoded upload (see image_ingest.ingest_image)
+        
+        Returns:
+            Tuple of (category, confidence_score)
+        """
+        timer = timer or StageTimer()
+        with timer.stage("cache"):
+            cached = self.cache.get(ingested.digest)
+        if cached is not None:
+            logger.debug("Image classified", extra=timer.fields(cached=True))
+            return tuple(cached)
+        
         try:
-            processed_image = self.preprocess_image(image_bytes)
-            predictions = self.model.predict(processed_image, verbose=0)
+            with timer.stage("preprocess"):
+                model_input = ingested.classifier_input()
+            # Includes the wait for the micro-batch to fill
+            with timer.stage("predict"):
+                predictions = self.batcher.predict(model_input)
             
-            predicted_class = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_class])
+            predicted_class = int(np.argmax(predictions))
+            confidence = float(predictions[predicted_class])
             category = self.category_map.get(predicted_class, "road_damage")
             
+            self.cache.set(ingested.digest, [category, confidence])
+            logger.debug("Image classified", extra=timer.fields(
+                cached=False, category=category, confidence=round(confidence, 4)
+            ))
             return category, confidence
         except Exception as e:
-            print(f"Error in classification: {e}")
+            logger.error("Error in classification: %s", e, extra=timer.fields())
             return "road_damage", 0.5  # Default fallback
 
 
@@ -0,0 +1,73 @@
+"""
+Decode-once image ingest shared by duplicate hashing and classification
+"""
+import hashlib
+import io
+import time
+from typing import Dict, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# Largest view any consumer needs (MobileNetV2 input)
+CLASSIFIER_SIZE = (224, 224)
+
+
+class IngestedImage:
+    """
+    An upload decoded exactly once.
+
+    ``image`` is an EXIF-oriented RGB buffer downscaled to just above the
+    largest size a consumer needs; the classifier input and perceptual-hash
+    views are derived from it on demand and memoized.
+    """
+
+    def __init__(self, image: Image.Image, digest: str, original_size: Tuple[int, int], decode_ms: float):
+        self.image = image
+        self.digest = digest  # sha256 of the raw upload bytes
+        self.original_size = original_size
+        self.decode_ms = decode_ms
+        self._classifier_input = None
+        self._hash_views: Dict[int, Image.Image] = {}
+
+    def classifier_input(self) -> np.ndarray:
+        """224x224 RGB scaled to [0, 1] with a leading batch dimension"""
+        if self._classifier_input is None:
+            resized = self.image.resize(CLASSIFIER_SIZE)
+            array = np.asarray(resized, dtype=np.float32) / 255.0
+            self._classifier_input = np.expand_dims(array, axis=0)
+        return self._classifier_input
+
+    def hash_view(self, size: int) -> Image.Image:
+        """Grayscale ``size`` x ``size`` view, as imagehash.phash would compute it"""
+        if size not in self._hash_views:
+            self._hash_views[size] = self.image.convert("L").resize((size, size), Image.LANCZOS)
+        return self._hash_views[size]
+
+
+def ingest_image(image_bytes: bytes, min_size: int = max(CLASSIFIER_SIZE)) -> IngestedImage:
+    """
+    Decode an upload once at reduced size.
+
+    JPEGs are decoded in draft mode (DCT scaling by 1/2, 1/4 or 1/8) so a 12MP
+    photo never materializes at full resolution; other formats are box-reduced
+    right after decoding. EXIF orientation is applied before any consumer sees
+    the pixels.
+    """
+    start = time.perf_counter()
+    digest = hashlib.sha256(image_bytes).hexdigest()
+
+    image = Image.open(io.BytesIO(image_bytes))
+    original_size = image.size
+    if image.format == "JPEG":
+        image.draft("RGB", (min_size, min_size))
+
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGB")
+
+    factor = min(image.size) // min_size
+    if factor > 1:
+        image = image.reduce(factor)
+
+    decode_ms = (time.perf_counter() - start) * 1000
+    return IngestedImage(image, digest, original_size, decode_ms)
@@ -0,0 +1,153 @@
+"""
+Dynamic micro-batching queue for model inference
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+
+class BatchingInferenceQueue:
+    """
+    Groups concurrent single-sample inference requests into one forward pass.
+
+    Callers submit a sample with a leading batch dimension of 1 and block on
+    (or await) the returned future. A background worker collects up to
+    ``max_batch_size`` samples, or whatever arrived within ``max_wait_ms`` of
+    the first one, runs ``predict_fn`` once on the stacked batch and hands each
+    caller its own row of the output. Batches only form when callers submit
+    from several threads at once (create_issue classifies on the ML executor).
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        name: str = "inference"
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.name = name
+
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future]]" = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self.batch_size_histogram: Dict[int, int] = {}
+        self.queue_depth_histogram: Dict[str, int] = {}
+        self.max_queue_depth = 0
+        self.total_requests = 0
+        self.total_batches = 0
+        self.total_errors = 0
+
+    def submit(self, sample: np.ndarray) -> Future:
+        """Queue a single sample (shape ``(1, ...)``) and return a future for its output row"""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((sample, future))
+        return future
+
+    def predict(self, sample: np.ndarray) -> np.ndarray:
+        """Submit a sample and block until its prediction is available"""
+        return self.submit(sample).result()
+
+    def queue_depth(self) -> int:
+        """Number of samples currently waiting to be batched"""
+        return self._queue.qsize()
+
+    def stats(self) -> Dict:
+        """Snapshot of queue depth and batch-size metrics"""
+        with self._stats_lock:
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "queue_depth": self.queue_depth(),
+                "max_queue_depth": self.max_queue_depth,
+                "total_requests": self.total_requests,
+                "total_batches": self.total_batches,
+                "total_errors": self.total_errors,
+                "avg_batch_size": (
+                    round(self.total_requests / self.total_batches, 2)
+                    if self.total_batches else 0.0
+                ),
+                "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+                "queue_depth_histogram": dict(self.queue_depth_histogram),
+            }
+
+    def _ensure_worker(self):
+        """Start the batching thread on first use"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name=f"{self.name}-batcher",
+                    daemon=True
+                )
+                self._worker.start()
+
+    def _collect_batch(self) -> List[Tuple[np.ndarray, Future]]:
+        """Block for the first sample, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Still drain anything that is already waiting
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            self._record_batch(len(batch), self._queue.qsize() + len(batch))
+
+            # Skip callers that gave up before the batch ran
+            batch = [(sample, future) for sample, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                inputs = np.concatenate([sample for sample, _ in batch], axis=0)
+                outputs = self.predict_fn(inputs)
+                for i, (_, future) in enumerate(batch):
+                    future.set_result(outputs[i])
+            except Exception as e:
+                with self._stats_lock:
+                    self.total_errors += 1
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def _record_batch(self, batch_size: int, depth: int):
+        with self._stats_lock:
+            self.total_requests += batch_size
+            self.total_batches += 1
+            self.batch_size_histogram[batch_size] = self.batch_size_histogram.get(batch_size, 0) + 1
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+            bucket = self._depth_bucket(depth)
+            self.queue_depth_histogram[bucket] = self.queue_depth_histogram.get(bucket, 0) + 1
+
+    @staticmethod
+    def _depth_bucket(depth: int) -> str:
+        """Power-of-two bucket label for a queue depth (1, 2-3, 4-7, ...)"""
+        if depth <= 1:
+            return "1"
+        low = 1 << (depth.bit_length() - 1)
+        return f"{low}-{2 * low - 1}"
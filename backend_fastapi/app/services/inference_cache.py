@@ -0,0 +1,253 @@
+"""
+Content-addressed cache for model inference results
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES = int(os.getenv("INFERENCE_CACHE_SIZE", "2048"))
+CACHE_TTL_SECONDS = float(os.getenv("INFERENCE_CACHE_TTL_SECONDS", "86400"))
+# Optional on-disk tier shared by all workers on a node (disabled when unset)
+CACHE_DIR = os.getenv("INFERENCE_CACHE_DIR")
+# Files kept per cache in the disk tier; beyond it expired, then least recently used files are removed
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("INFERENCE_CACHE_DISK_MAX_ENTRIES", "100000"))
+
+
+def content_digest(data: Any) -> str:
+    """sha256 hex digest of raw bytes or a string"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_fingerprint(*paths: str) -> str:
+    """Cheap model-version identifier from artifact sizes and modification times"""
+    parts = []
+    for path in paths:
+        stat = os.stat(path)
+        parts.append(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return content_digest("|".join(parts))[:16]
+
+
+class InferenceCache:
+    """
+    Bounded LRU + TTL cache keyed by ``model_version:content_digest``.
+
+    Results must be JSON-serializable so they can live in the optional disk
+    tier. Keys embed the model version, so loading a new model never serves
+    stale results; ``invalidate`` also drops the in-memory entries and the
+    disk directories of other model versions.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        disk_dir: Optional[str] = CACHE_DIR,
+        disk_max_entries: int = CACHE_DISK_MAX_ENTRIES
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = os.path.join(disk_dir, name) if disk_dir else None
+        self.disk_max_entries = disk_max_entries
+        self.model_version = "unversioned"
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._disk_writes = 0
+        self._pruning = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, digest: str) -> str:
+        return f"{self.model_version}:{digest}"
+
+    def get(self, digest: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        key = self.key(digest)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        value = self._disk_get(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._memory_set(key, value, now)
+        return value
+
+    def set(self, digest: str, value: Any):
+        if not self.enabled:
+            return
+        key = self.key(digest)
+        now = time.time()
+        self._memory_set(key, value, now)
+        self._disk_set(key, value, now)
+
+    def invalidate(self, model_version: str = None):
+        """Drop cached results, e.g. after a new model was loaded"""
+        with self._lock:
+            if model_version is not None:
+                self.model_version = model_version
+            self._entries.clear()
+        if model_version is not None:
+            self._schedule_prune(other_versions=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "name": self.name,
+                "model_version": self.model_version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_tier": self.disk_dir,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_max_entries": self.disk_max_entries if self.disk_dir else None,
+                "disk_evictions": self.disk_evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+    def _memory_set(self, key: str, value: Any, now: float):
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        version, digest = key.split(":", 1)
+        return os.path.join(self.disk_dir, version, digest[:2], f"{digest}.json")
+
+    def _disk_get(self, key: str, now: float) -> Optional[Any]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("expires_at", 0) <= now:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path)  # Recently used: evicted last
+        except OSError:
+            pass
+        return record.get("value")
+
+    def _disk_set(self, key: str, value: Any, now: float):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"expires_at": now + self.ttl_seconds, "value": value}, f)
+            os.replace(tmp_path, path)  # atomic, safe across workers
+        except (OSError, TypeError) as e:
+            logger.warning("Error writing inference cache entry: %s", e)
+            return
+        with self._lock:
+            self._disk_writes += 1
+            due = self._disk_writes >= max(self.disk_max_entries // 10, 1)
+        if due:
+            self._schedule_prune()
+
+    def _schedule_prune(self, other_versions: bool = False):
+        """Prune the disk tier in a background thread (at most one at a time per cache)"""
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return
+        with self._lock:
+            if self._pruning:
+                return
+            self._pruning = True
+            self._disk_writes = 0
+        threading.Thread(
+            target=self._prune_disk, args=(other_versions,), name=f"{self.name}-cache-prune", daemon=True
+        ).start()
+
+    def _prune_disk(self, other_versions: bool = False):
+        """
+        Remove the directories of other model versions (when asked), expired
+        files, then the least recently used files beyond ``disk_max_entries``
+        (down to 90% of it, so pruning does not run on every write)
+        """
+        try:
+            with self._lock:
+                version = self.model_version
+            if other_versions:
+                for entry in os.scandir(self.disk_dir):
+                    if entry.is_dir() and entry.name != version:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+
+            files = []
+            now = time.time()
+            for root, _, names in os.walk(os.path.join(self.disk_dir, version)):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        # Written (or last read) at mtime: expired for sure once mtime + ttl has passed
+                        modified = os.stat(path).st_mtime
+                    except OSError:
+                        continue
+                    files.append((modified, path))
+
+            removed = 0
+            files.sort()
+            excess = len(files) - int(self.disk_max_entries * 0.9) if len(files) > self.disk_max_entries else 0
+            for index, (modified, path) in enumerate(files):
+                if index >= excess and modified + self.ttl_seconds > now:
+                    break
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            if removed:
+                with self._lock:
+                    self.disk_evictions += removed
+                logger.info("Inference cache disk tier pruned", extra={"cache": self.name, "removed": removed})
+        except OSError as e:
+            logger.warning("Error pruning inference cache: %s", e)
+        finally:
+            with self._lock:
+                self._pruning = False
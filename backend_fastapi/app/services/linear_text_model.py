@@ -0,0 +1,52 @@
+"""
+NumPy inference for the linear text models exported by
+``ml_training/text_model/train.py`` (no scikit-learn / libsvm at request time)
+"""
+import numpy as np
+
+
+class LinearTextModel:
+    """
+    Multinomial logistic regression evaluated as one sparse-dense dot product
+    followed by a softmax. Exposes the ``predict`` / ``predict_proba`` subset
+    of the scikit-learn estimator API used by TextClassifier.
+
+    ``weights`` has shape (n_features, n_outputs) so ``X @ weights`` needs no
+    transpose; it is used as given, so memory-mapped arrays stay shared.
+    """
+
+    def __init__(self, weights: np.ndarray, intercept: np.ndarray, classes: np.ndarray):
+        self.weights = weights
+        self.intercept = intercept
+        self.classes_ = classes
+
+    @classmethod
+    def from_coef(cls, coef: np.ndarray, intercept: np.ndarray, classes: np.ndarray) -> "LinearTextModel":
+        """Build from scikit-learn shaped ``coef_`` (n_outputs, n_features)"""
+        return cls(
+            np.ascontiguousarray(np.asarray(coef, dtype=np.float64).T),
+            np.asarray(intercept, dtype=np.float64),
+            np.asarray(classes)
+        )
+
+    @property
+    def n_features(self) -> int:
+        return self.weights.shape[0]
+
+    def decision_function(self, X) -> np.ndarray:
+        # X is the scipy.sparse TF-IDF matrix; the product is a dense ndarray
+        return np.asarray(X @ self.weights) + self.intercept
+
+    def predict_proba(self, X) -> np.ndarray:
+        scores = self.decision_function(X)
+        if scores.shape[1] == 1:
+            # Binary models store a single row of weights for the positive class
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -0,0 +1,281 @@
+"""
+Structured, sampled, non-blocking logging for the API and its services
+
+Modules log through ``logging.getLogger(__name__)`` with structured fields
+passed as ``extra``. ``configure_logging`` routes the ``app`` logger tree
+through a bounded queue: the calling thread only filters and enqueues, a
+listener thread formats and writes (text or one JSON object per line).
+Per-logger sampling thins out chatty debug/info records, and a per-logger
+rate limit caps bursts (the number of dropped records is reported on the
+next record that gets through). ``StageTimer`` collects per-stage latencies
+as ``<stage>_ms`` fields.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" (human readable, key=value fields) or "json" (one object per line)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Fraction of debug/info records kept per logger, e.g. "app.services.priority_engine=0.01"
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+# Records per second (with an equal burst) let through per logger; 0 disables the limit
+LOG_RATE_LIMIT_PER_SECOND = float(os.getenv("LOG_RATE_LIMIT_PER_SECOND", "50"))
+# Records waiting for the writer thread; beyond this new records are dropped, never waited on
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+ROOT_LOGGER = "app"
+
+# Attributes of every LogRecord; anything else on a record is a structured field
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def record_fields(record: logging.LogRecord) -> Dict:
+    """Structured fields attached to a record through ``extra``"""
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED}
+
+
+def parse_sample_rates(setting: str) -> Dict[str, float]:
+    rates = {}
+    for item in setting.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a ``rate`` fraction of the debug/info records of each configured
+    logger (and its children); warnings and errors are never sampled.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def rate_for(self, name: str) -> float:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1.0:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per logger for debug/info records (warnings and errors always
+    pass); counts what it drops and reports it on the next record let through.
+    """
+
+    def __init__(self, per_second: float, burst: Optional[float] = None):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst or max(per_second, 1.0)
+        self._buckets: Dict[str, list] = {}  # logger -> [tokens, last refill, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.per_second <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1.0
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue without waiting: a full queue drops the record (counted) rather
+    than stalling the request thread. Only the message is rendered here; the
+    listener thread does all the formatting and I/O.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Traceback objects keep frames alive: render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class TextFormatter(logging.Formatter):
+    """``time level logger message key=value ...``"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            extras = " ".join(f"{key}={value}" for key, value in fields.items())
+            head, newline, traceback = line.partition("\n")
+            line = f"{head} {extras}{newline}{traceback}"
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, message and the structured fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        entry.update(record_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class StageTimer:
+    """
+    Wall-clock latency of the stages of one operation:
+
+        timer = StageTimer()
+        with timer.stage("decode"):
+            ...
+        logger.debug("done", extra=timer.fields())
+    """
+
+    __slots__ = ("started", "stages")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def fields(self, **extra) -> Dict:
+        fields = {f"{name}_ms": round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+        fields["total_ms"] = round((time.perf_counter() - self.started) * 1000, 3)
+        fields.update(extra)
+        return fields
+
+
+class LoggingSetup:
+    """The queue, writer thread and filters installed on the ``app`` logger"""
+
+    def __init__(self):
+        self.handler: Optional[NonBlockingQueueHandler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self._lock = threading.Lock()
+        self._fork_hook = False
+
+    def configure(
+        self,
+        level: str = LOG_LEVEL,
+        fmt: str = LOG_FORMAT,
+        sample_rates: str = LOG_SAMPLE_RATES,
+        rate_limit: float = LOG_RATE_LIMIT_PER_SECOND,
+        queue_size: int = LOG_QUEUE_SIZE,
+        stream=None
+    ):
+        """Install the handlers (idempotent: later calls are no-ops until ``shutdown``)"""
+        with self._lock:
+            if self.handler is not None:
+                return
+            writer = logging.StreamHandler(stream or sys.stderr)
+            writer.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+            self.handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+            self.handler.addFilter(SamplingFilter(parse_sample_rates(sample_rates)))
+            self.handler.addFilter(RateLimitFilter(rate_limit))
+            self.listener = logging.handlers.QueueListener(self.handler.queue, writer)
+            self.listener.start()
+
+            logger = logging.getLogger(ROOT_LOGGER)
+            logger.setLevel(level)
+            logger.addHandler(self.handler)
+            logger.propagate = False
+            atexit.register(self.shutdown)
+            if hasattr(os, "register_at_fork") and not self._fork_hook:
+                os.register_at_fork(after_in_child=self._after_fork)
+                self._fork_hook = True
+
+    def shutdown(self):
+        """Flush the queue and stop the writer thread"""
+        with self._lock:
+            if self.handler is None:
+                return
+            logging.getLogger(ROOT_LOGGER).removeHandler(self.handler)
+            self.listener.stop()
+            self.handler = self.listener = None
+
+    def _after_fork(self):
+        # The writer thread does not survive fork(): forked workers start their own
+        self._lock = threading.Lock()
+        if self.handler is not None:
+            self.handler.queue = self.listener.queue = queue.Queue(maxsize=self.handler.queue.maxsize)
+            self.listener._thread = None
+            self.listener.start()
+
+    def stats(self) -> Dict:
+        if self.handler is None:
+            return {"configured": False}
+        return {
+            "configured": True,
+            "level": logging.getLevelName(logging.getLogger(ROOT_LOGGER).level),
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+        }
+
+
+# Singleton instance
+logging_setup = LoggingSetup()
+configure_logging = logging_setup.configure
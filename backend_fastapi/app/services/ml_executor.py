@@ -0,0 +1,23 @@
+"""
+Dedicated, bounded executor for CPU-bound ML stages
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+# Enough threads to fill an image batch while keeping the pool bounded.
+# TensorFlow, NumPy and PIL release the GIL for the heavy parts.
+ML_EXECUTOR_WORKERS = int(os.getenv("ML_EXECUTOR_WORKERS", "16"))
+
+ml_executor = ThreadPoolExecutor(
+    max_workers=ML_EXECUTOR_WORKERS,
+    thread_name_prefix="ml-stage"
+)
+
+
+async def run_in_ml_executor(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking ML stage on the ML executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(ml_executor, partial(func, *args, **kwargs))
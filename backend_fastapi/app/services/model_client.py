@@ -0,0 +1,99 @@
+"""
+Client for the shared model server (see model_server.py)
+"""
+import os
+import secrets
+import threading
+from multiprocessing.connection import Client
+from typing import Any, Optional
+
+# When set, ImageClassifier and TextClassifier delegate inference to the model
+# server listening on this Unix socket instead of loading models in-process
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET")
+# Shared secret of the server and its clients: set one of these (there is no built-in key,
+# connections carry pickles). The file must be private (0600); the server creates it if missing.
+MODEL_SERVER_AUTHKEY = os.getenv("MODEL_SERVER_AUTHKEY")
+MODEL_SERVER_AUTHKEY_FILE = os.getenv("MODEL_SERVER_AUTHKEY_FILE")
+
+MIN_AUTHKEY_LENGTH = 16
+
+
+class ModelServerError(RuntimeError):
+    """Raised when the model server reports a failure"""
+
+
+def model_server_authkey(create: bool = False) -> bytes:
+    """
+    The configured shared secret. Raises ModelServerError when none is set,
+    when it is too short or when its file is readable by other users;
+    ``create`` writes a random key to a missing MODEL_SERVER_AUTHKEY_FILE.
+    """
+    if MODEL_SERVER_AUTHKEY:
+        key = MODEL_SERVER_AUTHKEY.strip()
+    elif MODEL_SERVER_AUTHKEY_FILE:
+        if create and not os.path.exists(MODEL_SERVER_AUTHKEY_FILE):
+            fd = os.open(MODEL_SERVER_AUTHKEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+        if not os.path.exists(MODEL_SERVER_AUTHKEY_FILE):
+            raise ModelServerError(f"{MODEL_SERVER_AUTHKEY_FILE} does not exist (the model server creates it)")
+        if os.stat(MODEL_SERVER_AUTHKEY_FILE).st_mode & 0o077:
+            raise ModelServerError(f"{MODEL_SERVER_AUTHKEY_FILE} must not be accessible to other users (chmod 600)")
+        with open(MODEL_SERVER_AUTHKEY_FILE) as f:
+            key = f.read().strip()
+    else:
+        raise ModelServerError("Set MODEL_SERVER_AUTHKEY or MODEL_SERVER_AUTHKEY_FILE to use the model server")
+    if len(key) < MIN_AUTHKEY_LENGTH:
+        raise ModelServerError(f"The model server key must be at least {MIN_AUTHKEY_LENGTH} characters")
+    return key.encode()
+
+
+class ModelServerClient:
+    """
+    Thread-safe RPC client: each calling thread keeps its own persistent
+    connection, so concurrent requests reach the server in parallel.
+    """
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None):
+        self.address = address
+        self.authkey = authkey if authkey is not None else model_server_authkey()
+        self._local = threading.local()
+
+    def call(self, op: str, *args) -> Any:
+        """Invoke ``op`` on the server, reconnecting once if the connection dropped"""
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.send((op, args))
+                status, result = conn.recv()
+                break
+            except (EOFError, OSError):
+                self._reset()
+                if attempt == 1:
+                    raise
+        if status != "ok":
+            raise ModelServerError(result)
+        return result
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+
+def get_model_client() -> Optional[ModelServerClient]:
+    """Client for the configured model server, or None for in-process inference"""
+    if not MODEL_SERVER_SOCKET:
+        return None
+    return ModelServerClient(MODEL_SERVER_SOCKET)
@@ -0,0 +1,152 @@
+"""
+Shared model server for multi-worker deployments
+
+One pool of inference processes holds the TensorFlow graph, the text models
+and the TF-IDF vocabulary for every API worker on the node. API workers started
+with MODEL_SERVER_SOCKET set talk to it over a Unix socket and never import
+TensorFlow themselves.
+
+Usage:
+    MODEL_SERVER_AUTHKEY_FILE=/run/uirs/model-server.key \
+    python -m app.services.model_server --socket /tmp/uirs-models.sock --workers 2
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import logging
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener
+
+import numpy as np
+
+from .logs import configure_logging
+from .model_client import ModelServerError, model_server_authkey
+
+# Named explicitly: this module usually runs as __main__
+logger = logging.getLogger("app.services.model_server")
+
+MODEL_SERVER_WORKERS = int(os.getenv("MODEL_SERVER_WORKERS", "1"))
+
+
+def _load_handlers():
+    """Load the models in-process and map RPC operations onto them"""
+    # This process *is* the model server: always run inference locally
+    os.environ.pop("MODEL_SERVER_SOCKET", None)
+    from . import model_client
+    model_client.MODEL_SERVER_SOCKET = None
+
+    from .image_classifier import image_classifier
+    from .text_classifier import text_classifier
+
+    def image_predict(images):
+        # Rows from all API workers are merged by the server-side batcher
+        futures = [image_classifier.batcher.submit(images[i:i + 1]) for i in range(len(images))]
+        return np.stack([future.result() for future in futures])
+
+    return {
+        "ping": lambda: "pong",
+        "info": lambda: {
+            "pid": os.getpid(),
+            "image_backend": image_classifier.backend.name,
+            "image_model_version": image_classifier.model_version,
+            "text_model_version": text_classifier.model_version,
+        },
+        "image.predict": image_predict,
+        "text.severity_batch": text_classifier._severity_batch,
+        "text.text_department_batch": text_classifier._text_department_batch,
+    }
+
+
+def _serve_connection(conn, handlers):
+    """Answer requests on one persistent client connection until it closes"""
+    with conn:
+        while True:
+            try:
+                op, args = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                handler = handlers[op]
+                conn.send(("ok", handler(*args)))
+            except Exception as e:
+                conn.send(("error", f"{op} failed: {e}"))
+
+
+def _worker_main(listener, worker_id):
+    """Inference process: load models after fork, then accept connections forever"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    handlers = _load_handlers()
+    logger.info("Worker ready", extra={"worker": worker_id, "pid": os.getpid()})
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception as e:
+            logger.warning("Worker rejected a connection: %s", e, extra={"worker": worker_id})
+            continue
+        threading.Thread(target=_serve_connection, args=(conn, handlers), daemon=True).start()
+
+
+def serve(socket_path: str, workers: int = MODEL_SERVER_WORKERS):
+    """Bind the socket, then fork ``workers`` inference processes sharing it"""
+    authkey = model_server_authkey(create=True)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # Stale socket from a previous run
+    listener = Listener(socket_path, family="AF_UNIX", authkey=authkey)
+    os.chmod(socket_path, 0o660)
+
+    # fork (not spawn): children inherit the listening socket, and nothing
+    # heavy has been imported yet so forking is safe
+    ctx = multiprocessing.get_context("fork")
+    processes = {}
+
+    def start(worker_id):
+        process = ctx.Process(target=_worker_main, args=(listener, worker_id), daemon=True)
+        process.start()
+        processes[worker_id] = process
+
+    for worker_id in range(workers):
+        start(worker_id)
+    logger.info("Listening on %s", socket_path, extra={"workers": workers})
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    try:
+        while not stopping:
+            for worker_id, process in list(processes.items()):
+                if not process.is_alive():
+                    logger.warning("Worker exited, restarting", extra={"worker": worker_id, "exitcode": process.exitcode})
+                    start(worker_id)
+            time.sleep(1)
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join(timeout=5)
+        listener.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared model server for API workers")
+    parser.add_argument("--socket", type=str, default=os.getenv("MODEL_SERVER_SOCKET", "/tmp/uirs-models.sock"))
+    parser.add_argument("--workers", type=int, default=MODEL_SERVER_WORKERS, help="Inference processes")
+    args = parser.parse_args()
+
+    if sys.platform == "win32":
+        print("The model server needs Unix sockets and fork(); run the API in-process on Windows.")
+        sys.exit(1)
+    configure_logging()
+    try:
+        serve(args.socket, args.workers)
+    except ModelServerError as e:
+        logger.error("Not starting the model server: %s", e)
+        sys.exit(1)
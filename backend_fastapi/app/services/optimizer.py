@@ -1,18 +1,63 @@
 """
-Resource optimization service using PuLP for crew assignment
+Resource optimization service for crew assignment
 """
-from pulp import LpProblem, LpMinimize, LpVariable, lpSum, LpStatus
-from typing import List, Dict, Tuple
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
-from geopy.distance import geodesic
+import numpy as np
 from sqlalchemy.orm import Session
 from ..models.issue import Issue
 from ..models.crew import Crew, Assignment, CrewStatus
+from . import geo
+from .assignment import ENGINES, solve_many
+from .logs import StageTimer
+from .priority_index import priority_index
+from .travel_time import ROAD_DEFAULT_SPEED_KMH, get_road_network
+
+logger = logging.getLogger(__name__)
+
+# "hungarian" (linear_sum_assignment over crew slots) or "pulp" (CBC binary program)
+OPTIMIZER_ENGINE = os.getenv("OPTIMIZER_ENGINE", "hungarian").lower()
+# Longest drive a crew is sent on when a road graph is installed
+OPTIMIZER_MAX_TRAVEL_MINUTES = float(os.getenv("OPTIMIZER_MAX_TRAVEL_MINUTES", "60"))
+# Backlogs larger than this are split by department and region
+OPTIMIZER_PARTITION_MIN_ISSUES = int(os.getenv("OPTIMIZER_PARTITION_MIN_ISSUES", "500"))
+# Side of the square regions a large backlog is split into
+OPTIMIZER_REGION_KM = float(os.getenv("OPTIMIZER_REGION_KM", "10"))
+# Processes solving regions in parallel (0 or 1 solves them in the request thread)
+OPTIMIZER_WORKERS = int(os.getenv("OPTIMIZER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Department whose crews handle each issue category (General crews handle all)
+DEPARTMENTS = {
+    "road_damage": "Road Maintenance",
+    "waste_overflow": "Sanitation",
+    "streetlight_failure": "Electrical"
+}
 
 
 class Optimizer:
-    def __init__(self):
+    def __init__(self, engine: str = OPTIMIZER_ENGINE):
         self.max_distance_km = 50.0  # Maximum distance for assignment
+        self.max_travel_minutes = OPTIMIZER_MAX_TRAVEL_MINUTES  # Same, on the road graph
+        if engine not in ENGINES:
+            logger.warning("Unknown optimizer engine '%s'. Using hungarian.", engine)
+            engine = "hungarian"
+        self.engine = engine
+        self._executor = None
+        self._executor_lock = threading.Lock()
+    
+    @property
+    def assignment_reward(self) -> float:
+        """Value of assigning an issue: above the cost of any allowed pair, so no issue is left out for nothing"""
+        return self.travel_limit() + 10 + 1
+    
+    def travel_limit(self) -> float:
+        """Largest allowed travel cost: minutes on the road graph, otherwise kilometers"""
+        return self.max_travel_minutes if get_road_network() is not None else self.max_distance_km
     
     def calculate_distance(
         self,
@@ -22,10 +67,48 @@ class Optimizer:
         issue_lon: float
     ) -> float:
         """Calculate distance between crew and issue in kilometers"""
-        try:
-            return geodesic((crew_lat, crew_lon), (issue_lat, issue_lon)).kilometers
-        except:
-            return float('inf')
+        return geo.distance_km(crew_lat, crew_lon, issue_lat, issue_lon)
+    
+    def travel_matrix(self, issues: List[Issue], crews: List[Crew]) -> np.ndarray:
+        """
+        Issue x crew travel cost: driving minutes from the crew to the issue
+        on the road graph when one is installed, otherwise straight-line km
+        """
+        crew_lats = [crew.current_latitude or 0 for crew in crews]
+        crew_lons = [crew.current_longitude or 0 for crew in crews]
+        issue_lats = [issue.latitude for issue in issues]
+        issue_lons = [issue.longitude for issue in issues]
+        network = get_road_network()
+        if network is not None:
+            return network.travel_minutes(crew_lats, crew_lons, issue_lats, issue_lons).T
+        return geo.distance_matrix_km(issue_lats, issue_lons, crew_lats, crew_lons)
+    
+    def travel_minutes(self, crew: Crew, issue: Issue) -> float:
+        """Estimated drive of a crew to an issue (straight line at the default speed without a road graph)"""
+        network = get_road_network()
+        if network is not None:
+            return float(self.travel_matrix([issue], [crew])[0, 0])
+        return self.calculate_distance(
+            crew.current_latitude or 0, crew.current_longitude or 0, issue.latitude, issue.longitude
+        ) / ROAD_DEFAULT_SPEED_KMH * 60
+    
+    def cost_matrix(self, issues: List[Issue], crews: List[Crew]) -> np.ndarray:
+        """
+        Issue x crew assignment costs: travel + (100 - priority) / 10, so
+        lower priority issues cost more; inf where the crew is from another
+        department or beyond the travel limit
+        """
+        # Issue x crew travel costs, computed once for the whole problem
+        distances = self.travel_matrix(issues, crews)
+        priorities = np.array([issue.priority_score or 0.0 for issue in issues], dtype=np.float64)
+        costs = distances + ((100 - priorities) / 10)[:, None]
+        
+        # _can_handle_issue for every pair
+        required = np.array([self._required_department(issue) for issue in issues], dtype=object)
+        departments = np.array([crew.department for crew in crews], dtype=object)
+        handles = (required[:, None] == departments[None, :]) | (departments == "General")[None, :]
+        costs[~handles | ~(distances <= self.travel_limit())] = np.inf
+        return costs
     
     def optimize_assignments(
         self,
@@ -34,7 +117,7 @@ class Optimizer:
         crews: List[Crew]
     ) -> List[Tuple[Issue, Crew]]:
         """
-        Optimize crew assignments using Linear Programming
+        Optimize crew assignments (capacity-constrained transportation problem)
         
         Returns:
             List of (issue, crew) tuples for optimal assignments
@@ -47,86 +130,147 @@ class Optimizer:
         if not available_crews:
             return []
         
-        # Create optimization problem
-        prob = LpProblem("Crew_Assignment", LpMinimize)
-        
-        # Decision variables: x[i][j] = 1 if crew j is assigned to issue i
-        assignments = {}
-        for i, issue in enumerate(issues):
-            for j, crew in enumerate(available_crews):
-                # Check if crew can handle this issue type
-                if self._can_handle_issue(crew, issue):
-                    # Calculate cost (distance + priority penalty)
-                    distance = self.calculate_distance(
-                        crew.current_latitude or 0,
-                        crew.current_longitude or 0,
-                        issue.latitude,
-                        issue.longitude
-                    )
-                    # Cost = distance + (100 - priority_score) / 10
-                    # Lower priority issues get higher cost
-                    cost = distance + (100 - issue.priority_score) / 10
-                    assignments[(i, j)] = LpVariable(f"x_{i}_{j}", cat='Binary')
-        
-        # Objective: Minimize total cost
-        prob += lpSum([
-            assignments[(i, j)] * (
-                self.calculate_distance(
-                    available_crews[j].current_latitude or 0,
-                    available_crews[j].current_longitude or 0,
-                    issues[i].latitude,
-                    issues[i].longitude
-                ) + (100 - issues[i].priority_score) / 10
-            )
-            for (i, j) in assignments.keys()
-        ])
+        capacities = [crew.max_capacity - (crew.current_load or 0) for crew in available_crews]
+        pairs = self.solve_pairs(issues, available_crews, capacities)
+        return [(issues[i], available_crews[j]) for i, j in pairs]
+    
+    def solve_pairs(
+        self,
+        issues: List[Issue],
+        crews: List[Crew],
+        capacities: List[int],
+        costs: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, int]]:
+        """(issue index, crew index) pairs of the optimal assignment, given each crew's free capacity"""
+        timer = StageTimer()
+        if costs is None:
+            with timer.stage("costs"):
+                costs = self.cost_matrix(issues, crews)
+        partitioned = len(issues) > OPTIMIZER_PARTITION_MIN_ISSUES
+        with timer.stage("solve"):
+            if partitioned:
+                pairs = self._partitioned_pairs(issues, crews, costs, capacities)
+            else:
+                pairs = ENGINES[self.engine](costs, capacities, self.assignment_reward)
+        logger.info("Assignments optimized", extra=timer.fields(
+            engine=self.engine, issues=len(issues), crews=len(crews), assigned=len(pairs),
+            partitioned=partitioned
+        ))
+        return sorted(pairs)
+    
+    def _partitioned_pairs(
+        self,
+        issues: List[Issue],
+        crews: List[Crew],
+        costs: np.ndarray,
+        capacities: List[int]
+    ) -> List[Tuple[int, int]]:
+        """
+        Decomposed solve of a large backlog:
         
-        # Constraints
+        1. each department's own crews against its issues, region by region
+        2. General crews and leftover capacity against what is left, region by region
+        3. one reconciliation problem over the remaining issues and free
+           capacity, for pairs across region borders
         
-        # 1. Each issue assigned to at most one crew
-        for i in range(len(issues)):
-            prob += lpSum([assignments.get((i, j), 0) for j in range(len(available_crews))]) <= 1
+        Subproblems of a stage are independent and solved in parallel.
+        """
+        remaining = np.maximum(np.asarray(capacities, dtype=np.int64), 0)
+        assigned = np.zeros(len(issues), dtype=bool)
+        required = [self._required_department(issue) for issue in issues]
+        issue_cells = self._region_cells([issue.latitude for issue in issues], [issue.longitude for issue in issues])
+        crew_cells = self._region_cells(
+            [crew.current_latitude or 0 for crew in crews], [crew.current_longitude or 0 for crew in crews]
+        )
         
-        # 2. Each crew capacity constraint
-        for j, crew in enumerate(available_crews):
-            prob += lpSum([
-                assignments.get((i, j), 0)
-                for i in range(len(issues))
-            ]) <= (crew.max_capacity - crew.current_load)
+        groups: Dict[tuple, Tuple[list, list]] = {}
+        for i, key in enumerate(zip(required, issue_cells)):
+            groups.setdefault(key, ([], []))[0].append(i)
+        for j, key in enumerate(zip((crew.department for crew in crews), crew_cells)):
+            if key in groups and crews[j].department != "General":
+                groups[key][1].append(j)
+        pairs = self._solve_groups(groups.values(), costs, remaining, assigned)
         
-        # 3. Distance constraint
-        for (i, j) in assignments.keys():
-            distance = self.calculate_distance(
-                available_crews[j].current_latitude or 0,
-                available_crews[j].current_longitude or 0,
-                issues[i].latitude,
-                issues[i].longitude
-            )
-            if distance > self.max_distance_km:
-                prob += assignments[(i, j)] == 0
+        groups = {}
+        for i in np.flatnonzero(~assigned).tolist():
+            groups.setdefault(issue_cells[i], ([], []))[0].append(i)
+        for j in np.flatnonzero(remaining > 0).tolist():
+            if crew_cells[j] in groups:
+                groups[crew_cells[j]][1].append(j)
+        pairs += self._solve_groups(groups.values(), costs, remaining, assigned)
         
-        # Solve
-        prob.solve()
+        pairs += self._solve_groups(
+            [(np.flatnonzero(~assigned).tolist(), np.flatnonzero(remaining > 0).tolist())],
+            costs, remaining, assigned
+        )
+        return pairs
+    
+    def _solve_groups(self, groups, costs, remaining, assigned) -> List[Tuple[int, int]]:
+        """Solve (issue indices, crew indices) subproblems; updates ``remaining`` and ``assigned``"""
+        problems, index = [], []
+        for issue_ids, crew_ids in groups:
+            if not issue_ids or not crew_ids:
+                continue
+            issue_ids, crew_ids = np.asarray(issue_ids), np.asarray(crew_ids)
+            sub_costs = costs[np.ix_(issue_ids, crew_ids)]
+            # Issues no crew of the group can reach only enlarge the problem
+            reachable = np.isfinite(sub_costs).any(axis=1)
+            if not reachable.any():
+                continue
+            problems.append((sub_costs[reachable], remaining[crew_ids]))
+            index.append((issue_ids[reachable], crew_ids))
         
-        # Extract assignments
-        result = []
-        for (i, j), var in assignments.items():
-            if var.varValue == 1:
-                result.append((issues[i], available_crews[j]))
+        executor = None
+        if len(problems) > 1 and sum(len(issue_ids) for issue_ids, _ in index) > OPTIMIZER_PARTITION_MIN_ISSUES:
+            executor = self._get_executor()
+        try:
+            solutions = solve_many(problems, self.engine, self.assignment_reward, executor)
+        except Exception as e:
+            # e.g. a worker process died: solve here instead
+            logger.warning("Parallel assignment solve failed: %s. Solving in process.", e)
+            with self._executor_lock:
+                self._executor = None
+            solutions = solve_many(problems, self.engine, self.assignment_reward)
         
-        return result
+        pairs = []
+        for (issue_ids, crew_ids), solution in zip(index, solutions):
+            for i, j in solution:
+                pair = (int(issue_ids[i]), int(crew_ids[j]))
+                pairs.append(pair)
+                assigned[pair[0]] = True
+                remaining[pair[1]] -= 1
+        return pairs
+    
+    def _region_cells(self, latitudes, longitudes) -> List[Tuple[int, int]]:
+        """Square region (OPTIMIZER_REGION_KM per side) of each point"""
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        lat_step = OPTIMIZER_REGION_KM * 1000 / geo.METERS_PER_DEGREE_LAT
+        lon_step = lat_step / max(np.cos(np.radians(np.nanmean(latitudes))) if len(latitudes) else 1.0, 0.01)
+        rows = np.floor(latitudes / lat_step).astype(np.int64)
+        columns = np.floor(longitudes / lon_step).astype(np.int64)
+        return list(zip(rows.tolist(), columns.tolist()))
+    
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Process pool for region subproblems (spawned: the API process is multi-threaded)"""
+        if OPTIMIZER_WORKERS <= 1:
+            return None
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=OPTIMIZER_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
     
     def _can_handle_issue(self, crew: Crew, issue: Issue) -> bool:
         """Check if crew can handle the issue based on department"""
-        dept_map = {
-            "road_damage": "Road Maintenance",
-            "waste_overflow": "Sanitation",
-            "streetlight_failure": "Electrical"
-        }
-        
-        required_dept = dept_map.get(issue.category.value, "General")
+        required_dept = self._required_department(issue)
         return crew.department == required_dept or crew.department == "General"
     
+    def _required_department(self, issue: Issue) -> str:
+        return DEPARTMENTS.get(issue.category.value, "General")
+    
     def create_assignments(
         self,
         db: Session,
@@ -151,6 +295,7 @@ class Optimizer:
                 crew.status = CrewStatus.BUSY
         
         db.commit()
+        priority_index.issues_changed(db, [issue for issue, _ in assignments])
 
 
 # Singleton instance
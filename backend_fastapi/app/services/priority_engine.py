@@ -1,9 +1,13 @@
 """
 Dynamic priority scoring engine
 """
+import logging
 from datetime import datetime, timedelta
 from typing import Dict
 from ..models.issue import Issue, IssueSeverity
+from .rolling_index import _utc_naive
+
+logger = logging.getLogger(__name__)
 
 
 class PriorityEngine:
@@ -23,6 +27,22 @@ class PriorityEngine:
             IssueSeverity.HIGH: 60,
             IssueSeverity.CRITICAL: 100
         }
+        
+        # Category-based risk
+        self.category_risk = {
+            "road_damage": 40,  # High risk for accidents
+            "waste_overflow": 30,  # Health risk
+            "streetlight_failure": 25  # Safety risk
+        }
+        self.default_category_risk = 20
+        
+        # Severity multiplier of the risk score
+        self.severity_multiplier = {
+            IssueSeverity.LOW: 0.5,
+            IssueSeverity.MEDIUM: 0.75,
+            IssueSeverity.HIGH: 1.0,
+            IssueSeverity.CRITICAL: 1.5
+        }
     
     def calculate_age_score(self, reported_at: datetime) -> float:
         """
@@ -35,7 +55,8 @@ class PriorityEngine:
             return 0.0
         
         now = datetime.utcnow()
-        age_hours = (now - reported_at).total_seconds() / 3600
+        # PostgreSQL returns timezone-aware timestamps
+        age_hours = (now - _utc_naive(reported_at)).total_seconds() / 3600
         
         # Exponential increase: 0-24h = 0-30, 24-72h = 30-60, 72h+ = 60-100
         if age_hours < 24:
@@ -70,31 +91,23 @@ class PriorityEngine:
         Returns:
             Score from 0-100
         """
-        base_risk = 0.0
+        base_risk = self.category_risk.get(category, self.default_category_risk)
+        multiplier = self.severity_multiplier.get(severity, 1.0)
         
-        # Category-based risk
-        category_risk = {
-            "road_damage": 40,  # High risk for accidents
-            "waste_overflow": 30,  # Health risk
-            "streetlight_failure": 25  # Safety risk
-        }
-        base_risk = category_risk.get(category, 20)
-        
-        # Severity multiplier
-        severity_multiplier = {
-            IssueSeverity.LOW: 0.5,
-            IssueSeverity.MEDIUM: 0.75,
-            IssueSeverity.HIGH: 1.0,
-            IssueSeverity.CRITICAL: 1.5
-        }
-        multiplier = severity_multiplier.get(severity, 1.0)
-        
-        # Location-based risk (could be enhanced with population density data)
-        # For now, using a simple heuristic
-        risk_score = base_risk * multiplier
+        # Location-based risk: population density / road importance at the issue
+        risk_score = base_risk * multiplier * self.location_factor(latitude, longitude)
         
         return min(risk_score, 100)
     
+    def location_factor(self, latitude: float, longitude: float) -> float:
+        """Risk multiplier of a location (1 without a risk raster or outside it)"""
+        from .risk_raster import get_risk_raster
+        
+        raster = get_risk_raster()
+        if raster is None:
+            return 1.0
+        return raster.location_factor(latitude, longitude)
+    
     def calculate_priority_score(self, issue: Issue) -> Dict[str, float]:
         """
         Calculate comprehensive priority score for an issue
@@ -124,7 +137,15 @@ class PriorityEngine:
             # Ensure a minimum floor for any valid issue (at least 5.0)
             total_score = max(total_score, 5.0)
             
-            print(f"Priority Calc for Issue {issue.id}: Total={total_score} (Sev={severity_score}, Age={age_score}, Up={upvote_score}, Risk={risk_score})")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Priority calculated", extra={
+                    "issue_id": issue.id,
+                    "total_score": round(total_score, 2),
+                    "severity_score": severity_score,
+                    "age_score": round(age_score, 2),
+                    "upvote_score": upvote_score,
+                    "risk_score": risk_score
+                })
             
             return {
                 'severity_score': float(severity_score),
@@ -133,8 +154,8 @@ class PriorityEngine:
                 'risk_score': float(risk_score),
                 'total_score': round(float(total_score), 2)
             }
-        except Exception as e:
-            print(f"Error calculating priority score: {e}")
+        except Exception:
+            logger.exception("Error calculating priority score", extra={"issue_id": getattr(issue, "id", None)})
             # Reliable fallback
             return {
                 'severity_score': 0.0, 'age_score': 0.0, 'upvote_score': 0.0, 'risk_score': 0.0, 'total_score': 0.0
@@ -0,0 +1,376 @@
+"""
+In-memory priority ranking of non-duplicate issues
+
+Serves the admin priority list and the issue list (priority order with
+OFFSET/LIMIT) from sorted lists per (category, status) instead of sorting
+in the database on every dashboard refresh. Writers call ``issues_changed``
+after committing. Other workers hear about it through PostgreSQL
+LISTEN/NOTIFY; on other databases, and as a safety net everywhere, a
+periodic consistency check against the database rebuilds an index that
+drifted (plus a rare full rebuild without LISTEN/NOTIFY).
+"""
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+import uuid
+from itertools import islice
+from select import select as wait_readable
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import String, func, select, text, type_coerce
+from sqlalchemy.orm import Session
+
+from ..models.issue import Issue, IssueCategory, IssueStatus
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INDEX_CHANNEL = "priority_index"
+# Seconds between consistency checks against the database
+PRIORITY_INDEX_VERIFY_SECONDS = float(os.getenv("PRIORITY_INDEX_VERIFY_SECONDS", "300"))
+# Seconds between safety-net full rebuilds on databases without LISTEN/NOTIFY
+PRIORITY_INDEX_REFRESH_SECONDS = float(os.getenv("PRIORITY_INDEX_REFRESH_SECONDS", "3600"))
+# Top-N depth compared with the database by the consistency check
+PRIORITY_INDEX_CHECK_DEPTH = 200
+
+_WORKER_ID = uuid.uuid4().hex[:12]
+_RELOAD = "*"
+# NOTIFY payloads are limited to 8000 bytes; larger id lists ask for a reload
+_MAX_NOTIFY_IDS = 500
+
+
+# Enum columns store member names; the index keys on values
+_ENUM_VALUES = {member.name: member.value for enum in (IssueCategory, IssueStatus) for member in enum}
+
+
+def _value(value) -> Optional[str]:
+    return getattr(value, "value", value)
+
+
+def _dialect_name(executor) -> str:
+    bind = executor.get_bind() if isinstance(executor, Session) else executor
+    return bind.dialect.name
+
+
+class PriorityIndex:
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], List[Tuple[float, int]]] = {}  # sorted (-score, id)
+        self._entries: Dict[int, Tuple[str, str, float]] = {}  # id -> (category, status, score)
+        self._lock = threading.RLock()
+        self._warm = False
+        self._warming = False
+        self._thread: Optional[threading.Thread] = None
+        self.last_check: Optional[Dict] = None
+        self.notifications = 0
+        self.rebuilds = 0
+
+    @property
+    def is_warm(self) -> bool:
+        return self._warm
+
+    def warm(self, db: Session):
+        """(Re)build the index from every non-duplicate issue"""
+        # Raw enum strings: no per-row Enum conversion when loading every issue
+        rows = db.execute(select(
+            Issue.id, type_coerce(Issue.category, String), type_coerce(Issue.status, String), Issue.priority_score
+        ).where(Issue.is_duplicate == False)).all()
+        values = _ENUM_VALUES
+        entries = {
+            issue_id: (values.get(category, category), values.get(status, status), score or 0.0)
+            for issue_id, category, status, score in rows
+        }
+        with self._lock:
+            self._rebuild(entries)
+            self._warm = True
+            self.rebuilds += 1
+
+    def start(self):
+        """Warm up and keep the index in step in a background thread (no-op if running)"""
+        with self._lock:
+            if self._warming or (self._thread and self._thread.is_alive()):
+                return
+            self._warming = True
+        self._thread = threading.Thread(target=self._maintain, name="priority-index", daemon=True)
+        self._thread.start()
+
+    def top(
+        self,
+        limit: int,
+        offset: int = 0,
+        categories: Optional[Iterable[str]] = None,
+        statuses: Optional[Iterable[str]] = None
+    ) -> List[Tuple[int, float]]:
+        """(id, score) of the highest priority issues, ties by id, like ORDER BY priority_score DESC"""
+        categories = None if categories is None else {_value(c) for c in categories}
+        statuses = None if statuses is None else {_value(s) for s in statuses}
+        with self._lock:
+            lists = [
+                bucket for (category, status), bucket in self._buckets.items()
+                if (categories is None or category in categories)
+                and (statuses is None or status in statuses)
+            ]
+            ranked = islice(heapq.merge(*lists), offset, offset + limit)
+            return [(issue_id, -negative_score) for negative_score, issue_id in ranked]
+
+    def ranked_issues(
+        self,
+        db: Session,
+        limit: int,
+        offset: int = 0,
+        categories: Optional[Iterable[str]] = None,
+        statuses: Optional[Iterable[str]] = None
+    ) -> Optional[List[Issue]]:
+        """
+        The issues of ``top`` loaded by primary key, in rank order. None when
+        the index is cold or a loaded row disagrees with it (the row is
+        re-applied); callers then fall back to the database query.
+        """
+        if not self._warm:
+            self.start()
+            return None
+        ranked = self.top(limit, offset, categories, statuses)
+        if not ranked:
+            return []
+        issues = {
+            issue.id: issue
+            for issue in db.query(Issue).populate_existing().filter(Issue.id.in_([i for i, _ in ranked]))
+        }
+        stale = [
+            issue_id for issue_id, score in ranked
+            if issue_id not in issues or issues[issue_id].is_duplicate
+            or (issues[issue_id].priority_score or 0.0) != score
+            or (statuses is not None and _value(issues[issue_id].status) not in {_value(s) for s in statuses})
+        ]
+        if stale:
+            self.refresh(db, stale)
+            return None
+        return [issues[issue_id] for issue_id, _ in ranked]
+
+    def apply(self, issues: Iterable):
+        """Insert, move or drop issues (anything with id, category, status, priority_score, is_duplicate)"""
+        with self._lock:
+            if not self._warm:
+                return
+            for issue in issues:
+                self._discard(issue.id)
+                if not issue.is_duplicate:
+                    self._insert(issue.id, _value(issue.category), _value(issue.status), issue.priority_score or 0.0)
+
+    def refresh(self, db: Session, issue_ids: Iterable[int]):
+        """Re-read issues from the database and apply them (dropping deleted ones)"""
+        issue_ids = set(issue_ids)
+        rows = db.query(
+            Issue.id, Issue.category, Issue.status, Issue.priority_score, Issue.is_duplicate
+        ).filter(Issue.id.in_(issue_ids)).all()
+        self.apply(rows)
+        self.remove(issue_ids - {row.id for row in rows})
+
+    def remove(self, issue_ids: Iterable[int]):
+        with self._lock:
+            for issue_id in issue_ids:
+                self._discard(issue_id)
+
+    def update_scores(self, issue_ids: Sequence[int], scores: Sequence[float]):
+        """New totals of a bulk rescore: incremental for a few, one in-memory rebuild for many"""
+        with self._lock:
+            if not self._warm:
+                return
+            if len(issue_ids) * 10 < len(self._entries):
+                for issue_id, score in zip(issue_ids, scores):
+                    entry = self._entries.get(issue_id)
+                    if entry is not None:
+                        self._discard(issue_id)
+                        self._insert(issue_id, entry[0], entry[1], float(score))
+                return
+            entries = dict(self._entries)
+            for issue_id, score in zip(issue_ids, scores):
+                entry = entries.get(issue_id)
+                if entry is not None:
+                    entries[issue_id] = (entry[0], entry[1], float(score))
+            self._rebuild(entries)
+
+    def issues_changed(self, db: Session, issues: Sequence):
+        """Call after committing changes to issues: update this worker and notify the others"""
+        self.apply(issues)
+        if _dialect_name(db) == "postgresql":
+            self.publish(db, [issue.id for issue in issues])
+            db.commit()
+
+    def publish(self, executor, issue_ids: Optional[Sequence[int]] = None):
+        """
+        NOTIFY the other workers (PostgreSQL only; delivered when the
+        transaction commits). ``None`` asks them to reload everything.
+        """
+        if _dialect_name(executor) != "postgresql":
+            return
+        if issue_ids is None or len(issue_ids) > _MAX_NOTIFY_IDS:
+            body = _RELOAD
+        else:
+            body = ",".join(str(issue_id) for issue_id in issue_ids)
+        executor.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": PRIORITY_INDEX_CHANNEL, "payload": f"{_WORKER_ID}:{body}"}
+        )
+
+    def check(self, db: Session, depth: int = PRIORITY_INDEX_CHECK_DEPTH) -> Dict:
+        """Compare issue count and top ``depth`` ranking with the database; rebuild on mismatch"""
+        db_count = db.query(func.count(Issue.id)).filter(Issue.is_duplicate == False).scalar()
+        db_top = [
+            (row.id, row.priority_score or 0.0)
+            for row in db.query(Issue.id, Issue.priority_score).filter(
+                Issue.is_duplicate == False
+            ).order_by(func.coalesce(Issue.priority_score, 0.0).desc(), Issue.id).limit(depth)
+        ]
+        index_top = self.top(depth)
+        with self._lock:
+            index_count = len(self._entries)
+        consistent = self._warm and db_count == index_count and db_top == index_top
+        self.last_check = {
+            "checked_at": time.time(),
+            "consistent": consistent,
+            "db_issues": db_count,
+            "index_issues": index_count,
+            "top_mismatches": sum(a != b for a, b in zip(db_top, index_top)) + abs(len(db_top) - len(index_top)),
+        }
+        if not consistent:
+            self.warm(db)
+        return self.last_check
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "warm": self._warm,
+                "issues": len(self._entries),
+                "buckets": len(self._buckets),
+                "rebuilds": self.rebuilds,
+                "notifications": self.notifications,
+                "last_check": self.last_check,
+            }
+
+    def _insert(self, issue_id: int, category: str, status: str, score: float):
+        self._entries[issue_id] = (category, status, score)
+        bisect.insort(self._buckets.setdefault((category, status), []), (-score, issue_id))
+
+    def _discard(self, issue_id: int):
+        entry = self._entries.pop(issue_id, None)
+        if entry is None:
+            return
+        key = (entry[0], entry[1])
+        bucket = self._buckets[key]
+        position = bisect.bisect_left(bucket, (-entry[2], issue_id))
+        if position < len(bucket) and bucket[position][1] == issue_id:
+            del bucket[position]
+        if not bucket:
+            del self._buckets[key]
+
+    def _rebuild(self, entries: Dict[int, Tuple[str, str, float]]):
+        buckets: Dict[Tuple[str, str], List[Tuple[float, int]]] = {}
+        for issue_id, (category, status, score) in entries.items():
+            buckets.setdefault((category, status), []).append((-score, issue_id))
+        for bucket in buckets.values():
+            bucket.sort()
+        self._entries, self._buckets = entries, buckets
+
+    def _maintain(self):
+        from ..database import engine
+
+        while True:
+            try:
+                if engine.dialect.name == "postgresql":
+                    self._listen(engine)
+                else:
+                    self._poll()
+            except Exception:
+                logger.exception("Error maintaining priority index")
+                time.sleep(5)
+
+    def _reload(self):
+        from ..database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.warm(db)
+        finally:
+            db.close()
+            self._warming = False
+
+    def _poll(self):
+        """Without LISTEN/NOTIFY: local writes are applied by ``issues_changed``; check
+        consistency every PRIORITY_INDEX_VERIFY_SECONDS, rebuild every PRIORITY_INDEX_REFRESH_SECONDS"""
+        from ..database import SessionLocal
+
+        self._reload()
+        next_rebuild = time.monotonic() + PRIORITY_INDEX_REFRESH_SECONDS
+        while True:
+            time.sleep(max(min(PRIORITY_INDEX_VERIFY_SECONDS, next_rebuild - time.monotonic()), 0.0))
+            if time.monotonic() >= next_rebuild:
+                self._reload()
+                next_rebuild = time.monotonic() + PRIORITY_INDEX_REFRESH_SECONDS
+                continue
+            db = SessionLocal()
+            try:
+                self.check(db)
+            finally:
+                db.close()
+
+    def _listen(self, engine):
+        """Apply NOTIFYs of other workers; check consistency every PRIORITY_INDEX_VERIFY_SECONDS"""
+        from ..database import SessionLocal
+
+        connection = engine.raw_connection()
+        connection.detach()  # Never hand a LISTENing connection back to the pool
+        try:
+            listener = connection.driver_connection
+            listener.autocommit = True
+            listener.cursor().execute(f"LISTEN {PRIORITY_INDEX_CHANNEL}")
+            # Subscribed first, so nothing committed after this snapshot is missed
+            self._reload()
+            next_check = time.monotonic() + PRIORITY_INDEX_VERIFY_SECONDS
+            while True:
+                timeout = max(next_check - time.monotonic(), 0.0)
+                if wait_readable([listener], [], [], timeout)[0]:
+                    listener.poll()
+                    payloads = [notify.payload for notify in listener.notifies]
+                    listener.notifies.clear()
+                    self._on_notifications(payloads)
+                if time.monotonic() >= next_check:
+                    db = SessionLocal()
+                    try:
+                        self.check(db)
+                    finally:
+                        db.close()
+                    next_check = time.monotonic() + PRIORITY_INDEX_VERIFY_SECONDS
+        finally:
+            connection.close()
+
+    def _on_notifications(self, payloads: List[str]):
+        from ..database import SessionLocal
+
+        issue_ids = set()
+        reload = False
+        for payload in payloads:
+            worker, _, body = payload.partition(":")
+            if worker == _WORKER_ID:
+                continue
+            self.notifications += 1
+            if body == _RELOAD:
+                reload = True
+            elif body:
+                issue_ids.update(int(issue_id) for issue_id in body.split(","))
+        if not reload and not issue_ids:
+            return
+
+        if reload:
+            self._reload()
+            return
+        db = SessionLocal()
+        try:
+            self.refresh(db, issue_ids)
+        finally:
+            db.close()
+
+
+# Singleton instance
+priority_index = PriorityIndex()
@@ -0,0 +1,313 @@
+"""
+Scheduled batch rescoring of every open issue's priority
+
+The age component of a priority score grows with time, but scores are only
+computed when an issue is created or upvoted. This job loads the open issues
+as column arrays, recomputes all four components with NumPy for the whole set
+(the same formulas and weights as PriorityEngine), and writes back the rows
+whose total changed with bulk UPDATE / INSERT ... ON CONFLICT statements.
+"""
+import enum
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Type
+
+import numpy as np
+from sqlalchemy import String, func, or_, select, text, type_coerce
+from sqlalchemy.engine import Connection, Engine
+
+from ..models.issue import Issue, IssueCategory, IssueSeverity, IssueStatus
+from ..models.priority import PriorityScore
+from .priority_engine import PriorityEngine, priority_engine
+from .priority_index import priority_index
+from .risk_raster import get_risk_raster
+from .rolling_index import _utc_naive
+
+logger = logging.getLogger(__name__)
+
+# Seconds between scheduled runs (0 disables the schedule; the admin endpoint still works)
+PRIORITY_RESCORE_INTERVAL_SECONDS = float(os.getenv("PRIORITY_RESCORE_INTERVAL_SECONDS", "900"))
+# Rows fetched / written per round trip
+PRIORITY_RESCORE_BATCH_SIZE = int(os.getenv("PRIORITY_RESCORE_BATCH_SIZE", "50000"))
+# PostgreSQL advisory lock key: one worker rescores at a time
+PRIORITY_RESCORE_LOCK_ID = 0x55495253
+
+CLOSED_STATUSES = (IssueStatus.RESOLVED, IssueStatus.REJECTED)
+COMPONENTS = ("severity_score", "age_score", "upvote_score", "risk_score", "total_score")
+
+
+def _lookup(values, table: Dict, enum_type: Type[enum.Enum], default: float) -> np.ndarray:
+    """Map raw enum strings (member names as stored, or values) through a score table"""
+    keyed = {}
+    for key, score in table.items():
+        member = enum_type(key)
+        keyed[member.name] = keyed[member.value] = score
+    return np.fromiter((keyed.get(value, default) for value in values), dtype=np.float64, count=len(values))
+
+
+def score_arrays(
+    severities,
+    categories,
+    upvotes: np.ndarray,
+    reported_epoch: np.ndarray,
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    now: float,
+    engine: PriorityEngine = priority_engine
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized PriorityEngine.calculate_priority_score over column arrays.
+
+    ``severities``/``categories`` hold enum names or values, ``reported_epoch``
+    UTC seconds (NaN when unknown) and ``now`` the current UTC epoch.
+    """
+    severity_score = _lookup(severities, engine.severity_scores, IssueSeverity, 30.0)
+
+    age_hours = (now - reported_epoch) / 3600
+    age_score = np.where(
+        age_hours < 24,
+        (age_hours / 24) * 30,
+        np.where(
+            age_hours < 72,
+            30 + ((age_hours - 24) / 48) * 30,
+            np.minimum(60 + ((age_hours - 72) / 24) * 10, 100)
+        )
+    )
+    age_score = np.where(np.isnan(age_score), 0.0, age_score)
+
+    upvote_score = np.minimum(np.nan_to_num(upvotes.astype(np.float64)) * 10, 100)
+
+    raster = get_risk_raster()
+    risk_score = np.minimum(
+        _lookup(categories, engine.category_risk, IssueCategory, engine.default_category_risk)
+        * _lookup(severities, engine.severity_multiplier, IssueSeverity, 1.0)
+        * (raster.location_factors(latitudes, longitudes) if raster is not None else 1.0),
+        100
+    )
+
+    total_score = (
+        severity_score * engine.weights['severity'] +
+        age_score * engine.weights['age'] +
+        upvote_score * engine.weights['upvotes'] +
+        risk_score * engine.weights['risk']
+    )
+    total_score = np.round(np.maximum(total_score, 5.0), 2)
+
+    return {
+        "severity_score": severity_score,
+        "age_score": age_score,
+        "upvote_score": upvote_score,
+        "risk_score": risk_score,
+        "total_score": total_score,
+    }
+
+
+class PriorityRescorer:
+    def __init__(
+        self,
+        interval_seconds: float = PRIORITY_RESCORE_INTERVAL_SECONDS,
+        batch_size: int = PRIORITY_RESCORE_BATCH_SIZE
+    ):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[Dict] = None
+        self.runs = 0
+
+    def start(self):
+        """Rescore every ``interval_seconds`` in a background thread (idempotent)"""
+        if self.interval_seconds <= 0 or (self._thread and self._thread.is_alive()):
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_schedule, name="priority-rescorer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run_schedule(self):
+        from ..database import engine
+
+        while True:
+            try:
+                self.rescore(engine)
+            except Exception:
+                logger.exception("Error rescoring priorities")
+            if self._stop.wait(self.interval_seconds):
+                return
+
+    def rescore(self, engine: Engine) -> Dict:
+        """Recompute the priority of every open issue and write back the changed ones"""
+        if not self._run_lock.acquire(blocking=False):
+            return {"skipped": "a rescore is already running in this worker"}
+        try:
+            started = time.perf_counter()
+            with engine.begin() as connection:
+                postgres = connection.dialect.name == "postgresql"
+                if postgres and not connection.execute(
+                    text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": PRIORITY_RESCORE_LOCK_ID}
+                ).scalar():
+                    return {"skipped": "a rescore is already running in another worker"}
+
+                columns = self._load(connection)
+                loaded = time.perf_counter()
+                scores = score_arrays(
+                    columns["severity"], columns["category"], columns["upvotes"],
+                    columns["reported_epoch"], columns["latitude"], columns["longitude"], time.time()
+                )
+                scored = time.perf_counter()
+
+                # Only rows whose total moved (NaN, i.e. never scored, compares unequal)
+                changed = scores["total_score"] != columns["priority_score"]
+                stale = scores["total_score"] != columns["stored_total"]
+                ids = columns["id"]
+                if postgres:
+                    self._write_postgres(connection, ids, scores, changed, stale)
+                else:
+                    self._write_generic(connection, ids, scores, changed, stale)
+                # Other workers reload their priority index once this commits
+                priority_index.publish(connection)
+
+            priority_index.update_scores(ids[changed].tolist(), scores["total_score"][changed].tolist())
+
+            self.runs += 1
+            self.last_run = {
+                "finished_at": datetime.utcnow().isoformat(),
+                "open_issues": int(len(ids)),
+                "updated_issues": int(changed.sum()),
+                "upserted_scores": int(stale.sum()),
+                "load_seconds": round(loaded - started, 3),
+                "score_seconds": round(scored - loaded, 3),
+                "write_seconds": round(time.perf_counter() - scored, 3),
+            }
+            return self.last_run
+        finally:
+            self._run_lock.release()
+
+    def stats(self) -> Dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "scheduled": bool(self._thread and self._thread.is_alive()),
+            "runs": self.runs,
+            "last_run": self.last_run,
+        }
+
+    def _load(self, connection: Connection) -> Dict[str, np.ndarray]:
+        """Open issues as column arrays (enum columns as raw strings, timestamps as epoch seconds)"""
+        epoch = self._epoch_expression(connection.dialect.name)
+        query = select(
+            Issue.id,
+            type_coerce(Issue.severity, String),
+            type_coerce(Issue.category, String),
+            Issue.upvotes,
+            Issue.latitude,
+            Issue.longitude,
+            epoch if epoch is not None else Issue.reported_at,
+            Issue.priority_score,
+            PriorityScore.total_score
+        ).outerjoin(
+            PriorityScore, PriorityScore.issue_id == Issue.id
+        ).where(
+            Issue.is_duplicate == False,
+            or_(Issue.status.is_(None), Issue.status.notin_(CLOSED_STATUSES))
+        )
+
+        ids, severities, categories, upvotes, latitudes, longitudes, reported, priorities, stored = columns = tuple(
+            [] for _ in range(9)
+        )
+        result = connection.execution_options(stream_results=True, yield_per=self.batch_size).execute(query)
+        for rows in result.partitions():
+            for column, values in zip(columns, zip(*rows)):
+                column.extend(values)
+
+        if epoch is None:
+            unix_epoch = datetime(1970, 1, 1)
+            reported = [
+                None if value is None else (_utc_naive(value) - unix_epoch).total_seconds()
+                for value in reported
+            ]
+        # None becomes NaN in float arrays
+        return {
+            "id": np.array(ids, dtype=np.int64),
+            "severity": severities,
+            "category": categories,
+            "upvotes": np.array(upvotes, dtype=np.float64),
+            "latitude": np.array(latitudes, dtype=np.float64),
+            "longitude": np.array(longitudes, dtype=np.float64),
+            "reported_epoch": np.array(reported, dtype=np.float64),
+            "priority_score": np.array(priorities, dtype=np.float64),
+            "stored_total": np.array(stored, dtype=np.float64),
+        }
+
+    @staticmethod
+    def _epoch_expression(dialect_name: str):
+        # UTC epoch seconds computed by the database: no per-row datetime objects
+        if dialect_name == "postgresql":
+            return func.extract("epoch", Issue.reported_at)
+        if dialect_name == "sqlite":
+            return (func.julianday(Issue.reported_at) - 2440587.5) * 86400.0
+        return None
+
+    def _batches(self, ids: np.ndarray, mask: np.ndarray):
+        selected = np.flatnonzero(mask)
+        for start in range(0, len(selected), self.batch_size):
+            yield selected[start:start + self.batch_size]
+
+    def _write_postgres(self, connection, ids, scores, changed, stale):
+        """unnest() array parameters: one statement per batch whatever its size"""
+        for batch in self._batches(ids, changed):
+            connection.execute(text(
+                "UPDATE issues SET priority_score = v.score "
+                "FROM unnest(CAST(:ids AS integer[]), CAST(:scores AS double precision[])) AS v(id, score) "
+                "WHERE issues.id = v.id"
+            ), {"ids": ids[batch].tolist(), "scores": scores["total_score"][batch].tolist()})
+
+        for batch in self._batches(ids, stale):
+            params = {"ids": ids[batch].tolist()}
+            params.update({name: scores[name][batch].tolist() for name in COMPONENTS})
+            connection.execute(text(
+                "INSERT INTO priority_scores "
+                "(issue_id, severity_score, age_score, upvote_score, risk_score, total_score) "
+                "SELECT * FROM unnest("
+                "CAST(:ids AS integer[]), CAST(:severity_score AS double precision[]), "
+                "CAST(:age_score AS double precision[]), CAST(:upvote_score AS double precision[]), "
+                "CAST(:risk_score AS double precision[]), CAST(:total_score AS double precision[])) "
+                "ON CONFLICT (issue_id) DO UPDATE SET "
+                "severity_score = excluded.severity_score, age_score = excluded.age_score, "
+                "upvote_score = excluded.upvote_score, risk_score = excluded.risk_score, "
+                "total_score = excluded.total_score, updated_at = now()"
+            ), params)
+
+    def _write_generic(self, connection, ids, scores, changed, stale):
+        """executemany UPDATE and INSERT ... ON CONFLICT (SQLite 3.24+)"""
+        from sqlalchemy.dialects.sqlite import insert
+
+        for batch in self._batches(ids, changed):
+            connection.execute(
+                text("UPDATE issues SET priority_score = :score WHERE id = :id"),
+                [{"id": int(i), "score": float(s)} for i, s in zip(ids[batch], scores["total_score"][batch])]
+            )
+
+        statement = insert(PriorityScore.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=[PriorityScore.issue_id],
+            set_={
+                **{name: statement.excluded[name] for name in COMPONENTS},
+                "updated_at": func.now(),
+            }
+        )
+        for batch in self._batches(ids, stale):
+            connection.execute(statement, [
+                {"issue_id": int(ids[i]), **{name: float(scores[name][i]) for name in COMPONENTS}}
+                for i in batch
+            ])
+
+
+# Singleton instance
+priority_rescorer = PriorityRescorer()
@@ -0,0 +1,205 @@
+"""
+Lazy service registry for heavy ML engines
+
+Service modules (TensorFlow, Prophet, PuLP, scikit-learn, NLTK) are only
+imported when a service is first requested or by the background warm-up, so
+importing ``app.main`` and serving auth-only routes never pays for them.
+"""
+import asyncio
+import enum
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Services warmed in the background at startup: "all", "none" or a comma list
+SERVICE_WARMUP = os.getenv("SERVICE_WARMUP", "all")
+
+
+class ServiceState(str, enum.Enum):
+    NOT_LOADED = "not_loaded"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class ServiceRegistry:
+    def __init__(self):
+        self._loaders: Dict[str, Union[str, Callable[[], Any]]] = {}
+        self._required: Dict[str, bool] = {}
+        self._services: Dict[str, Any] = {}
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._warmup_thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, loader: Union[str, Callable[[], Any]], required: bool = True):
+        """
+        Register a service.
+
+        ``loader`` is either ``"module.path:attribute"`` (resolved relative to
+        this package when it starts with a dot) or a zero-argument callable.
+        Required services gate the readiness probe.
+        """
+        self._loaders[name] = loader
+        self._required[name] = required
+        self._locks[name] = threading.Lock()
+        self._state[name] = {"state": ServiceState.NOT_LOADED, "load_seconds": None, "error": None}
+
+    def get(self, name: str) -> Any:
+        """Return a service, loading it on first use (blocking)"""
+        if name in self._services:
+            return self._services[name]
+        if name not in self._loaders:
+            raise KeyError(f"Unknown service: {name}")
+
+        with self._locks[name]:
+            if name in self._services:
+                return self._services[name]
+
+            self._state[name].update(state=ServiceState.LOADING, error=None)
+            start = time.perf_counter()
+            try:
+                service = self._load(self._loaders[name])
+            except Exception as e:
+                self._state[name].update(
+                    state=ServiceState.FAILED,
+                    load_seconds=round(time.perf_counter() - start, 3),
+                    error=str(e)
+                )
+                raise
+            self._services[name] = service
+            self._state[name].update(
+                state=ServiceState.READY,
+                load_seconds=round(time.perf_counter() - start, 3)
+            )
+            return service
+
+    async def get_async(self, name: str) -> Any:
+        """Return a service without blocking the event loop while it loads"""
+        if name in self._services:
+            return self._services[name]
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get, name)
+
+    def peek(self, name: str) -> Optional[Any]:
+        """Return a service only if it is already loaded"""
+        return self._services.get(name)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Per-service load state"""
+        return {
+            name: {**state, "required": self._required[name]}
+            for name, state in self._state.items()
+        }
+
+    def is_ready(self) -> bool:
+        """True once every required service has loaded"""
+        return all(
+            self._state[name]["state"] == ServiceState.READY
+            for name, required in self._required.items()
+            if required
+        )
+
+    def pending_required(self) -> List[str]:
+        """Required services that are not loaded yet (or failed to load)"""
+        return [
+            name for name, required in self._required.items()
+            if required and self._state[name]["state"] != ServiceState.READY
+        ]
+
+    def warm_up(self, names: Optional[List[str]] = None):
+        """Load services in a background thread (in registration order)"""
+        if names is None:
+            names = self._warmup_names()
+        if not names or (self._warmup_thread and self._warmup_thread.is_alive()):
+            return
+
+        def _run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.warning("Service '%s' failed to load: %s", name, e)
+
+        self._warmup_thread = threading.Thread(target=_run, name="service-warmup", daemon=True)
+        self._warmup_thread.start()
+
+    def _warmup_names(self) -> List[str]:
+        setting = SERVICE_WARMUP.strip().lower()
+        if setting in ("", "none", "0", "false"):
+            return []
+        if setting in ("all", "1", "true"):
+            return list(self._loaders)
+        wanted = {name.strip() for name in setting.split(",")}
+        return [name for name in self._loaders if name in wanted]
+
+    @staticmethod
+    def _load(loader: Union[str, Callable[[], Any]]) -> Any:
+        if callable(loader):
+            return loader()
+        module_path, attribute = loader.split(":")
+        module = importlib.import_module(module_path, package=__package__)
+        return getattr(module, attribute)
+
+
+def _init_database():
+    """Create database tables (only if database is available)"""
+    from ..database import engine, Base
+    from .. import models  # noqa: F401 - registers every table on Base.metadata
+
+    try:
+        Base.metadata.create_all(bind=engine)
+        logger.info("Database tables created/verified successfully")
+    except Exception as e:
+        logger.warning(
+            "Could not connect to database: %s. Server will start but database features will not "
+            "work until connection is established; please check your DATABASE_URL in .env file", e
+        )
+        raise
+    return engine
+
+
+def _load_risk_raster():
+    """Memory-map the location risk raster (None when none is installed)"""
+    from .risk_raster import get_risk_raster
+
+    return get_risk_raster()
+
+
+def _load_road_network():
+    """Road graph for dispatch travel times (None when none is installed)"""
+    from .travel_time import get_road_network
+
+    return get_road_network()
+
+
+def _start_priority_rescorer():
+    """Rescore open issues now and then on a schedule (background thread)"""
+    from .priority_rescorer import priority_rescorer
+
+    return priority_rescorer.start()
+
+
+def _start_dispatcher():
+    """Incremental crew dispatch and its periodic full re-solve (no-op unless DISPATCH_MODE=incremental)"""
+    from .dispatcher import dispatcher
+
+    return dispatcher.start()
+
+
+# Singleton instance
+registry = ServiceRegistry()
+registry.register("database", _init_database)
+registry.register("text_classifier", ".text_classifier:text_classifier")
+registry.register("duplicate_checker", ".duplicate_checker:duplicate_checker")
+registry.register("image_classifier", ".image_classifier:image_classifier")
+registry.register("optimizer", ".optimizer:optimizer", required=False)
+registry.register("road_network", _load_road_network, required=False)
+registry.register("forecasting_service", ".forecasting_service:forecasting_service", required=False)
+registry.register("risk_raster", _load_risk_raster, required=False)
+registry.register("priority_rescorer", _start_priority_rescorer, required=False)
+registry.register("dispatcher", _start_dispatcher, required=False)
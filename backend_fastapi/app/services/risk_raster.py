@@ -0,0 +1,183 @@
+"""
+Memory-mapped location risk rasters (population density, road importance)
+
+A raster is a directory written by ``build_risk_raster.py``::
+
+    manifest.json      format, bounds, grid shape, layer scales, sha256 per file
+    <layer>.npy        (rows, cols) grid per layer, north-up (row 0 at max_lat)
+
+Layers are opened with ``np.load(mmap_mode='r')``, so every worker shares the
+pages and only the cells that are looked up are ever read. A lookup is two
+multiplications and an array index: O(1) per issue, vectorized for the
+batch rescorer.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from .text_artifact import file_sha256
+
+logger = logging.getLogger(__name__)
+
+RISK_RASTER_DIR = os.getenv("RISK_RASTER_DIR", "ml_training/risk_raster")
+# Extra risk at the densest / most important cell: risk *= 1 + sum(weight * normalized value)
+RISK_DENSITY_WEIGHT = float(os.getenv("RISK_DENSITY_WEIGHT", "0.5"))
+RISK_ROAD_WEIGHT = float(os.getenv("RISK_ROAD_WEIGHT", "0.5"))
+
+RASTER_FORMAT = "uirs-risk-raster"
+RASTER_FORMAT_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+LAYER_WEIGHTS = {"density": RISK_DENSITY_WEIGHT, "road_importance": RISK_ROAD_WEIGHT}
+
+
+class RiskRaster:
+    """Location factor (>= 1) of a coordinate from the weighted, normalized raster layers"""
+
+    def __init__(self, path: str, weights: Optional[Dict[str, float]] = None, verify: bool = True):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILENAME)) as f:
+            self.manifest = json.load(f)
+
+        if self.manifest.get("format") != RASTER_FORMAT:
+            raise ValueError(f"{path} is not a risk raster")
+        if self.manifest.get("format_version") != RASTER_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported raster format version {self.manifest.get('format_version')} "
+                f"(expected {RASTER_FORMAT_VERSION})"
+            )
+        if verify:
+            self.verify()
+
+        bounds = self.manifest["bounds"]
+        self.min_lat, self.max_lat = bounds["min_lat"], bounds["max_lat"]
+        self.min_lon, self.max_lon = bounds["min_lon"], bounds["max_lon"]
+        self.rows, self.cols = self.manifest["shape"]
+        self.rows_per_degree = self.rows / (self.max_lat - self.min_lat)
+        self.cols_per_degree = self.cols / (self.max_lon - self.min_lon)
+
+        weights = LAYER_WEIGHTS if weights is None else weights
+        # (grid, weight / scale, weight) of every layer that contributes
+        self.layers = []
+        for name, layer in self.manifest["layers"].items():
+            weight = weights.get(name, 0.0)
+            if weight and layer["scale"] > 0:
+                grid = np.load(os.path.join(path, layer["file"]), mmap_mode="r", allow_pickle=False)
+                if grid.shape != (self.rows, self.cols):
+                    raise ValueError(f"Layer {name} of {path} is {grid.shape}, expected {(self.rows, self.cols)}")
+                self.layers.append((grid, weight / layer["scale"], weight))
+
+    def verify(self):
+        """Check every file against the sha256 recorded in the manifest"""
+        for filename, expected in self.manifest["files"].items():
+            if file_sha256(os.path.join(self.path, filename)) != expected:
+                raise ValueError(f"Checksum mismatch for {filename} in {self.path}")
+
+    def location_factor(self, latitude: float, longitude: float) -> float:
+        """1 outside the raster or without coordinates, up to 1 + sum of the weights"""
+        if latitude is None or longitude is None:
+            return 1.0
+        # Also rejects NaN; negative indices would silently wrap around
+        if not (self.min_lat <= latitude <= self.max_lat and self.min_lon <= longitude <= self.max_lon):
+            return 1.0
+        row = min(int((self.max_lat - latitude) * self.rows_per_degree), self.rows - 1)
+        col = min(int((longitude - self.min_lon) * self.cols_per_degree), self.cols - 1)
+        factor = 1.0
+        for grid, per_unit, weight in self.layers:
+            factor += min(float(grid[row, col]) * per_unit, weight)
+        return factor
+
+    def location_factors(self, latitudes, longitudes) -> np.ndarray:
+        """location_factor of many coordinates at once (None / NaN -> 1)"""
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        factors = np.ones(latitudes.shape)
+        inside = (
+            (latitudes >= self.min_lat) & (latitudes <= self.max_lat)
+            & (longitudes >= self.min_lon) & (longitudes <= self.max_lon)
+        )
+        if not self.layers or not inside.any():
+            return factors
+        rows = np.minimum(((self.max_lat - latitudes[inside]) * self.rows_per_degree).astype(np.int64), self.rows - 1)
+        cols = np.minimum(((longitudes[inside] - self.min_lon) * self.cols_per_degree).astype(np.int64), self.cols - 1)
+        for grid, per_unit, weight in self.layers:
+            factors[inside] += np.minimum(np.asarray(grid[rows, cols], dtype=np.float64) * per_unit, weight)
+        return factors
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "version": self.manifest.get("version"),
+            "shape": [self.rows, self.cols],
+            "layers": {name: layer["scale"] for name, layer in self.manifest["layers"].items()},
+        }
+
+
+def write_risk_raster(
+    path: str,
+    layers: Dict[str, np.ndarray],
+    min_lat: float,
+    max_lat: float,
+    min_lon: float,
+    max_lon: float,
+    scales: Optional[Dict[str, float]] = None,
+    version: Optional[str] = None
+) -> Dict:
+    """
+    Write north-up ``layers`` covering the given bounds as a raster directory.
+    Each layer's ``scale`` (the value counted as full risk) defaults to its
+    maximum; NaN cells are stored as 0.
+    """
+    if not layers:
+        raise ValueError("A risk raster needs at least one layer")
+    if min_lat >= max_lat or min_lon >= max_lon:
+        raise ValueError("Raster bounds are empty")
+    shapes = {np.shape(grid) for grid in layers.values()}
+    if len(shapes) != 1 or len(next(iter(shapes))) != 2:
+        raise ValueError(f"Layers must be 2-D grids of one shape, got {sorted(shapes)}")
+
+    os.makedirs(path, exist_ok=True)
+    manifest = {
+        "format": RASTER_FORMAT,
+        "format_version": RASTER_FORMAT_VERSION,
+        "bounds": {"min_lat": min_lat, "max_lat": max_lat, "min_lon": min_lon, "max_lon": max_lon},
+        "shape": list(next(iter(shapes))),
+        "layers": {},
+        "files": {},
+    }
+    for name, grid in layers.items():
+        grid = np.nan_to_num(np.asarray(grid, dtype=np.float32), nan=0.0)
+        filename = f"{name}.npy"
+        np.save(os.path.join(path, filename), np.ascontiguousarray(grid))
+        scale = (scales or {}).get(name)
+        manifest["layers"][name] = {"file": filename, "scale": float(grid.max() if scale is None else scale)}
+        manifest["files"][filename] = file_sha256(os.path.join(path, filename))
+    manifest["version"] = version or file_sha256(os.path.join(path, sorted(manifest["files"])[0]))[:12]
+
+    with open(os.path.join(path, MANIFEST_FILENAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+_raster: Optional[RiskRaster] = None
+_raster_loaded = False
+_raster_lock = threading.Lock()
+
+
+def get_risk_raster() -> Optional[RiskRaster]:
+    """The configured raster (loaded once per process), or None when there is none"""
+    global _raster, _raster_loaded
+    if not _raster_loaded:
+        with _raster_lock:
+            if not _raster_loaded:
+                if os.path.isfile(os.path.join(RISK_RASTER_DIR, MANIFEST_FILENAME)):
+                    try:
+                        _raster = RiskRaster(RISK_RASTER_DIR)
+                        logger.info("Risk raster loaded", extra=_raster.stats())
+                    except Exception as e:
+                        logger.error("Error loading risk raster from %s: %s. Scoring without location.", RISK_RASTER_DIR, e)
+                _raster_loaded = True
+    return _raster
@@ -0,0 +1,168 @@
+"""
+In-memory indexes over the issues reported within a rolling time window
+
+The base class keeps the index in step with the database (initial warm-up,
+incremental sync of rows inserted by any worker, expiry of old issues);
+subclasses decide which columns they read and how entries are indexed.
+"""
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from ..models.issue import Issue
+
+logger = logging.getLogger(__name__)
+
+# Re-read issues reported this recently on every sync, so rows committed out of
+# id order by concurrent workers are not missed
+SYNC_SLACK_SECONDS = 120
+
+
+def _utc_naive(value: datetime) -> datetime:
+    """Compare timestamps from SQLite (naive) and PostgreSQL (aware) alike"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class RollingIssueIndex:
+    """
+    Non-duplicate issues reported within the last ``window_hours``.
+
+    Subclasses implement ``_query`` (columns to read, must include id,
+    reported_at and is_duplicate), ``_entry`` (row -> entry with ``id`` and
+    ``reported_at``), ``_insert``/``_remove`` (index bookkeeping), ``_clear``
+    and ``_same`` (whether a re-read row changed).
+    """
+
+    name = "index"
+
+    def __init__(self, window_hours: float):
+        self.window_hours = window_hours
+        self._entries: Dict[int, object] = {}
+        self._expiry: deque = deque()  # (reported_at, id), roughly in report order
+        self._synced_id = 0
+        self._synced_at: Optional[datetime] = None
+        self._warm = False
+        self._warming = False
+        self._lock = threading.RLock()
+
+    @property
+    def is_warm(self) -> bool:
+        return self._warm
+
+    def warm(self, db: Session):
+        """(Re)build the index from every issue in the window"""
+        started_at = datetime.utcnow()
+        rows = self._query(db).filter(
+            Issue.reported_at >= started_at - timedelta(hours=self.window_hours)
+        ).all()
+        with self._lock:
+            self._clear()
+            self._entries.clear()
+            self._expiry.clear()
+            self._synced_id = 0
+            self._apply(rows)
+            self._synced_at = started_at
+            self._warm = True
+        logger.info("%s%s warmed", self.name[0].upper(), self.name[1:], extra={"issues": len(self._entries)})
+
+    def warm_async(self):
+        """Build the index in a background thread (no-op if warm or warming)"""
+        with self._lock:
+            if self._warm or self._warming:
+                return
+            self._warming = True
+        threading.Thread(
+            target=self._warm_in_background, name=f"{self.name.replace(' ', '-')}-warmup", daemon=True
+        ).start()
+
+    def _warm_in_background(self):
+        from ..database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.warm(db)
+        except Exception:
+            logger.exception("Error warming %s", self.name)
+        finally:
+            db.close()
+            self._warming = False
+
+    def sync(self, db: Session):
+        """Pull issues inserted (by any worker) since the last sync and expire old ones"""
+        started_at = datetime.utcnow()
+        with self._lock:
+            synced_id, synced_at = self._synced_id, self._synced_at
+        rows = self._query(db).filter(
+            or_(
+                Issue.id > synced_id,
+                Issue.reported_at >= synced_at - timedelta(seconds=SYNC_SLACK_SECONDS)
+            ),
+            Issue.reported_at >= started_at - timedelta(hours=self.window_hours)
+        ).all()
+        with self._lock:
+            self._apply(rows)
+            self._synced_at = started_at
+            self._expire(started_at)
+
+    def add(self, issue):
+        """Index one issue right away (e.g. just inserted by this worker)"""
+        with self._lock:
+            self._apply([issue])
+
+    def discard(self, issue_id: int):
+        with self._lock:
+            entry = self._entries.pop(issue_id, None)
+            if entry is not None:
+                self._remove(entry)
+
+    def _apply(self, rows):
+        for row in rows:
+            self._synced_id = max(self._synced_id, row.id)
+            existing = self._entries.get(row.id)
+            if row.is_duplicate:
+                self.discard(row.id)
+                continue
+            entry = self._entry(row)
+            if existing is not None:
+                if self._same(existing, entry):
+                    continue  # Re-read by the sync slack window, unchanged
+                self.discard(row.id)
+            self._entries[entry.id] = entry
+            self._insert(entry)
+            if existing is None or existing.reported_at != entry.reported_at:
+                self._expiry.append((entry.reported_at, entry.id))
+
+    def _expire(self, now: datetime):
+        threshold = now - timedelta(hours=self.window_hours)
+        while self._expiry and (self._expiry[0][0] is None or self._expiry[0][0] < threshold):
+            reported_at, issue_id = self._expiry.popleft()
+            entry = self._entries.get(issue_id)
+            # Skip stale queue items of issues re-applied since
+            if entry is not None and entry.reported_at == reported_at:
+                self.discard(issue_id)
+
+    def _query(self, db: Session):
+        raise NotImplementedError
+
+    def _entry(self, row):
+        raise NotImplementedError
+
+    def _insert(self, entry):
+        raise NotImplementedError
+
+    def _remove(self, entry):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    @staticmethod
+    def _same(a, b) -> bool:
+        return all(getattr(a, name) == getattr(b, name) for name in type(a).__slots__)
@@ -0,0 +1,193 @@
+"""
+Rolling-window spatial grid index of recent issues
+
+Keeps every non-duplicate issue reported within the window in ~100 m grid
+cells per category, so duplicate detection only looks at the issues in the
+cells around a new report instead of every recent issue in the city. Image
+hashes of the same issues are kept in a multi-index hash table per category
+for Hamming radius queries.
+"""
+import math
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.issue import Issue
+from .geo import BBOX_MARGIN, METERS_PER_DEGREE_LAT
+from .hash_index import MultiIndexHashTable, hamming_distance, words_to_int
+from .rolling_index import RollingIssueIndex, _utc_naive
+
+SPATIAL_INDEX_CELL_METERS = float(os.getenv("SPATIAL_INDEX_CELL_METERS", "100"))
+
+
+class IndexedIssue:
+    """The columns of an issue needed to pick duplicate candidates"""
+
+    __slots__ = (
+        "id", "category", "latitude", "longitude", "reported_at",
+        "image_hash", "phash_value", "image_dhash", "cell"
+    )
+
+    def __init__(self, row, cell: Tuple[int, int]):
+        self.id = row.id
+        self.category = getattr(row.category, "value", row.category)
+        self.latitude = row.latitude
+        self.longitude = row.longitude
+        self.reported_at = _utc_naive(row.reported_at)
+        self.image_hash = row.image_hash
+        words = (row.image_phash_0, row.image_phash_1, row.image_phash_2, row.image_phash_3)
+        if None not in words:
+            self.phash_value = words_to_int(words)
+        else:
+            # Row not backfilled by migrate_db.py yet
+            self.phash_value = int(row.image_hash, 16) if row.image_hash else None
+        self.image_dhash = row.image_dhash
+        self.cell = cell
+
+    @property
+    def dhash_value(self) -> Optional[int]:
+        return int(self.image_dhash, 16) if self.image_dhash else None
+
+
+class SpatialGridIndex(RollingIssueIndex):
+    """
+    Grid of ``cell_meters`` cells per category over a rolling time window.
+
+    The index is only a candidate prefilter: callers re-load the few
+    candidate rows from the database before deciding. ``sync`` pulls issues
+    inserted by any worker since the last call and drops expired ones.
+    """
+
+    name = "spatial index"
+
+    def __init__(
+        self,
+        window_hours: float,
+        cell_meters: float = SPATIAL_INDEX_CELL_METERS,
+        hash_bits: int = 256,
+        hash_max_distance: int = 19
+    ):
+        super().__init__(window_hours)
+        self.cell_meters = cell_meters
+        self.hash_bits = hash_bits
+        self.hash_max_distance = hash_max_distance
+        self._dlat = cell_meters / METERS_PER_DEGREE_LAT
+
+        self._cells: Dict[str, Dict[Tuple[int, int], Dict[int, IndexedIssue]]] = {}
+        self._hash_tables: Dict[str, MultiIndexHashTable] = {}
+
+    def cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        row = math.floor(latitude / self._dlat)
+        return row, math.floor(longitude * self._lon_scale(row) / self._dlat)
+
+    def _lon_scale(self, row: int) -> float:
+        # Longitude degrees shrink with latitude: keep cells ~square in meters
+        return max(math.cos(math.radians((row + 0.5) * self._dlat)), 1e-6)
+
+    def candidates(
+        self,
+        category: str,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        since: datetime
+    ) -> List[IndexedIssue]:
+        """Issues of ``category`` in the cells that can hold points within ``radius_km``"""
+        ring = math.ceil(radius_km * 1000 * BBOX_MARGIN / self.cell_meters)
+        since = _utc_naive(since)
+        row = math.floor(latitude / self._dlat)
+        found = []
+        with self._lock:
+            cells = self._cells.get(getattr(category, "value", category))
+            if not cells:
+                return found
+            for cell_row in range(row - ring, row + ring + 1):
+                col = math.floor(longitude * self._lon_scale(cell_row) / self._dlat)
+                for cell_col in range(col - ring, col + ring + 1):
+                    for entry in cells.get((cell_row, cell_col), {}).values():
+                        if entry.reported_at is None or entry.reported_at >= since:
+                            found.append(entry)
+        return found
+
+    def similar_images(
+        self,
+        category: str,
+        image_hash: str,
+        max_distance: int,
+        since: datetime,
+        image_dhash: str = None,
+        dhash_max_distance: int = None
+    ) -> List[Tuple[IndexedIssue, int]]:
+        """
+        (issue, phash distance) of every indexed issue of ``category`` whose
+        image hash is within ``max_distance`` bits, closest first. With
+        ``image_dhash``, candidates whose 64-bit dHash is further than
+        ``dhash_max_distance`` are dropped before the full phash comparison.
+        """
+        value = int(image_hash, 16)
+        dhash_value = int(image_dhash, 16) if image_dhash and dhash_max_distance is not None else None
+        since = _utc_naive(since)
+        matches = []
+        with self._lock:
+            table = self._hash_tables.get(getattr(category, "value", category))
+            if table is None:
+                return matches
+            for issue_id in table.candidates(value, max_distance):
+                entry = self._entries[issue_id]
+                if entry.reported_at is not None and entry.reported_at < since:
+                    continue
+                if dhash_value is not None and entry.image_dhash:
+                    if hamming_distance(entry.dhash_value, dhash_value) > dhash_max_distance:
+                        continue
+                distance = table.distance(issue_id, value)
+                if distance <= max_distance:
+                    matches.append((entry, distance))
+        return sorted(matches, key=lambda match: match[1])
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "warm": self._warm,
+                "issues": len(self._entries),
+                "cells": sum(len(cells) for cells in self._cells.values()),
+                "hashed_issues": sum(len(table) for table in self._hash_tables.values()),
+                "cell_meters": self.cell_meters,
+                "window_hours": self.window_hours,
+            }
+
+    def _query(self, db: Session):
+        return db.query(
+            Issue.id, Issue.category, Issue.latitude, Issue.longitude,
+            Issue.reported_at, Issue.image_hash, Issue.image_dhash, Issue.is_duplicate,
+            Issue.image_phash_0, Issue.image_phash_1, Issue.image_phash_2, Issue.image_phash_3
+        )
+
+    def _entry(self, row) -> IndexedIssue:
+        return IndexedIssue(row, self.cell(row.latitude, row.longitude))
+
+    def _insert(self, entry: IndexedIssue):
+        self._cells.setdefault(entry.category, {}).setdefault(entry.cell, {})[entry.id] = entry
+        # Hashes of another hash_size are never comparable; keep them out of the table
+        if entry.image_hash and len(entry.image_hash) * 4 == self.hash_bits:
+            self._hash_table(entry.category).add(entry.id, entry.phash_value)
+
+    def _remove(self, entry: IndexedIssue):
+        cell = self._cells[entry.category][entry.cell]
+        cell.pop(entry.id, None)
+        if not cell:
+            del self._cells[entry.category][entry.cell]
+        table = self._hash_tables.get(entry.category)
+        if table is not None:
+            table.remove(entry.id)
+
+    def _clear(self):
+        self._cells.clear()
+        self._hash_tables.clear()
+
+    def _hash_table(self, category: str) -> MultiIndexHashTable:
+        table = self._hash_tables.get(category)
+        if table is None:
+            table = self._hash_tables[category] = MultiIndexHashTable(self.hash_bits, self.hash_max_distance)
+        return table
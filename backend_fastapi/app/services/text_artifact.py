@@ -0,0 +1,159 @@
+"""
+Memory-mapped, versioned text model artifacts
+
+An artifact is a directory written by ``ml_training/text_model/train.py``::
+
+    manifest.json          format, version, analyzer settings, models, sha256 per file
+    vocab_terms.npy        TF-IDF vocabulary terms, sorted (fixed-width unicode)
+    vocab_index.npy        feature column of each sorted term
+    idf.npy                IDF weight per feature column
+    <model>_weights.npy    (n_features, n_outputs) linear weights
+    <model>_intercept.npy
+    <model>_classes.npy
+
+Arrays are opened with ``np.load(mmap_mode='r')``: nothing is unpickled, and
+every worker on the node shares the same pages through the OS page cache.
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List
+
+import numpy as np
+
+from .linear_text_model import LinearTextModel
+
+ARTIFACT_FORMAT = "uirs-text-model"
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArtifactVectorizer:
+    """
+    ``TfidfVectorizer.transform`` over the memory-mapped vocabulary and IDF
+    arrays (word analyzer: lowercase, token regex, stop words, n-grams,
+    optional sublinear tf, l2 norm). Terms are found with a binary search over
+    the sorted term array, so no per-process vocabulary dict is built.
+    """
+
+    def __init__(self, analyzer: Dict, terms: np.ndarray, term_index: np.ndarray, idf: np.ndarray):
+        self.lowercase = analyzer["lowercase"]
+        self.token_pattern = re.compile(analyzer["token_pattern"])
+        self.stop_words = frozenset(analyzer["stop_words"] or ())
+        self.min_n, self.max_n = analyzer["ngram_range"]
+        self.sublinear_tf = analyzer["sublinear_tf"]
+        self.norm = analyzer["norm"]
+        self.terms = terms
+        self.term_index = term_index
+        self.idf = idf
+
+    def analyze(self, text: str) -> List[str]:
+        """Tokens and n-grams in the same order as scikit-learn's word analyzer"""
+        if self.lowercase:
+            text = text.lower()
+        tokens = [token for token in self.token_pattern.findall(text) if token not in self.stop_words]
+        if self.max_n == 1:
+            return tokens
+
+        original_tokens = tokens
+        n_original_tokens = len(original_tokens)
+        tokens = list(original_tokens) if self.min_n == 1 else []
+        for n in range(max(self.min_n, 2), min(self.max_n + 1, n_original_tokens + 1)):
+            for i in range(n_original_tokens - n + 1):
+                tokens.append(" ".join(original_tokens[i:i + n]))
+        return tokens
+
+    def transform(self, texts: List[str]):
+        from scipy.sparse import csr_matrix
+
+        rows, terms = [], []
+        for row, text in enumerate(texts):
+            analyzed = self.analyze(text)
+            rows.extend([row] * len(analyzed))
+            terms.extend(analyzed)
+
+        shape = (len(texts), self.idf.shape[0])
+        if not terms:
+            return csr_matrix(shape, dtype=np.float64)
+
+        # Vocabulary lookup: one vectorized binary search for the whole batch
+        queries = np.array(terms)
+        positions = np.searchsorted(self.terms, queries)
+        positions = np.minimum(positions, len(self.terms) - 1)
+        found = self.terms[positions] == queries
+        columns = self.term_index[positions[found]]
+        rows = np.asarray(rows, dtype=np.int64)[found]
+
+        # Duplicate (row, column) pairs are summed into term counts
+        counts = csr_matrix((np.ones(len(columns)), (rows, columns)), shape=shape)
+        counts.sum_duplicates()
+        if self.sublinear_tf:
+            np.log(counts.data, out=counts.data)
+            counts.data += 1
+        counts.data *= self.idf[counts.indices]
+
+        if self.norm == "l2":
+            norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+            norms[norms == 0] = 1.0
+            counts.data /= np.repeat(norms, np.diff(counts.indptr))
+        elif self.norm == "l1":
+            norms = np.asarray(abs(counts).sum(axis=1)).ravel()
+            norms[norms == 0] = 1.0
+            counts.data /= np.repeat(norms, np.diff(counts.indptr))
+        return counts
+
+
+class TextModelArtifact:
+    """A loaded artifact: manifest, vectorizer and linear models"""
+
+    def __init__(self, path: str, verify: bool = True):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILENAME)) as f:
+            self.manifest = json.load(f)
+
+        if self.manifest.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"{path} is not a text model artifact")
+        if self.manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported artifact format version {self.manifest.get('format_version')} "
+                f"(expected {ARTIFACT_FORMAT_VERSION})"
+            )
+        if verify:
+            self.verify()
+
+        self.version = self.manifest["version"]
+        self.vectorizer = ArtifactVectorizer(
+            self.manifest["analyzer"],
+            self._array("vocab_terms.npy"),
+            self._array("vocab_index.npy"),
+            self._array("idf.npy")
+        )
+        self.models = {
+            name: LinearTextModel(
+                self._array(f"{name}_weights.npy"),
+                self._array(f"{name}_intercept.npy"),
+                self._array(f"{name}_classes.npy")
+            )
+            for name in self.manifest["models"]
+        }
+
+    def verify(self):
+        """Check every file against the sha256 recorded in the manifest"""
+        for filename, expected in self.manifest["files"].items():
+            actual = file_sha256(os.path.join(self.path, filename))
+            if actual != expected:
+                raise ValueError(f"Checksum mismatch for {filename} in {self.path}")
+
+    def _array(self, filename: str) -> np.ndarray:
+        if filename not in self.manifest["files"]:
+            raise ValueError(f"{filename} is not listed in the manifest of {self.path}")
+        return np.load(os.path.join(self.path, filename), mmap_mode="r", allow_pickle=False)
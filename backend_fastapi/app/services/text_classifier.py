@@ -1,68 +1,96 @@
 """
-Text classification service using TF-IDF + SVM for severity and department classification
+Text classification service using TF-IDF + linear models for severity and department classification
 """
+import logging
 import pickle
 import os
-from typing import Tuple, Dict
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.svm import SVC
+import uuid
+from typing import Tuple, Dict, List, Optional
 import nltk
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 from nltk.stem import WordNetLemmatizer
-import re
+from .inference_cache import InferenceCache, content_digest, file_fingerprint
+from .logs import StageTimer
+from .model_client import get_model_client
+from .text_artifact import TextModelArtifact
+from .text_preprocessing import TextPreprocessor
 
-# Download NLTK data if not present
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
-
-try:
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('wordnet', quiet=True)
+logger = logging.getLogger(__name__)
 
 MODEL_PATH = os.getenv("TEXT_MODEL_PATH", "ml_training/text_model/text_classifier.pkl")
 VECTORIZER_PATH = os.getenv("VECTORIZER_PATH", "ml_training/text_model/tfidf_vectorizer.pkl")
+# Memory-mapped artifact written by train.py; preferred over the pickles above
+ARTIFACT_DIR = os.getenv("TEXT_ARTIFACT_DIR", "ml_training/text_model/text_model_artifact")
+
+
+def ensure_nltk_data():
+    """Download NLTK data if not present (runs when the classifier is first built)"""
+    for resource, package in (
+        ('corpora/stopwords', 'stopwords'),
+        ('corpora/wordnet', 'wordnet'),
+    ):
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package, quiet=True)
 
 
 class TextClassifier:
     def __init__(self):
+        ensure_nltk_data()
         self.lemmatizer = WordNetLemmatizer()
         self.stop_words = set(stopwords.words('english'))
+        self.preprocessor = TextPreprocessor(self.stop_words, self.lemmatizer.lemmatize)
         self.vectorizer = None
         self.severity_model = None
         self.department_model = None
+        self.model_version = None
+        self.cache = InferenceCache("text_severity")
+        self.remote = get_model_client()
         self.load_models()
     
     def load_models(self):
         """Load pre-trained models and vectorizer"""
+        if self.remote is not None:
+            # Models live in the shared model server; only preprocessing runs here
+            info = self.remote.call("info")
+            self.model_version = f"remote-{info['text_model_version']}"
+            self.cache.invalidate(self.model_version)
+            return
+        
         try:
-            if os.path.exists(MODEL_PATH) and os.path.exists(VECTORIZER_PATH):
+            if os.path.isdir(ARTIFACT_DIR):
+                artifact = TextModelArtifact(ARTIFACT_DIR)
+                self.vectorizer = artifact.vectorizer
+                self.severity_model = artifact.models['severity']
+                self.department_model = artifact.models['department']
+                self.model_version = artifact.version
+            elif os.path.exists(MODEL_PATH) and os.path.exists(VECTORIZER_PATH):
+                logger.warning("Text model artifact not found. Loading the legacy pickled models.")
                 with open(VECTORIZER_PATH, 'rb') as f:
                     self.vectorizer = pickle.load(f)
                 with open(MODEL_PATH, 'rb') as f:
                     models = pickle.load(f)
                     self.severity_model = models.get('severity')
                     self.department_model = models.get('department')
+                self.model_version = file_fingerprint(VECTORIZER_PATH, MODEL_PATH)
             else:
-                print(f"Warning: Models not found. Using placeholder models.")
+                logger.warning("Models not found. Using placeholder models.")
                 self._create_placeholder_models()
         except Exception as e:
-            print(f"Error loading models: {e}. Using placeholder models.")
+            logger.error("Error loading models: %s. Using placeholder models.", e)
             self._create_placeholder_models()
+        # Results of the previous models must never be served again
+        self.cache.invalidate(self.model_version)
     
     def _create_placeholder_models(self):
         """Create placeholder models for development"""
         from sklearn.feature_extraction.text import TfidfVectorizer
         from sklearn.svm import SVC
         
+        # Platt scaling is randomized: never share placeholder results across processes
+        self.model_version = f"placeholder-{uuid.uuid4().hex[:8]}"
+        
         # Placeholder training data
         sample_texts = [
             "pothole on road", "garbage overflow", "streetlight not working",
@@ -84,26 +112,11 @@ class TextClassifier:
     
     def preprocess_text(self, text: str) -> str:
         """Preprocess text: lowercase, remove special chars, lemmatize"""
-        if not text:
-            return ""
-        
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove special characters and digits
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        
-        # Tokenize
-        tokens = word_tokenize(text)
-        
-        # Remove stopwords and lemmatize
-        tokens = [
-            self.lemmatizer.lemmatize(token)
-            for token in tokens
-            if token not in self.stop_words and len(token) > 2
-        ]
-        
-        return ' '.join(tokens)
+        return self.preprocessor.preprocess(text)
+    
+    def join_processed(self, *parts: str) -> str:
+        """Join independently preprocessed fragments as if they were preprocessed together"""
+        return ' '.join(part for part in parts if part)
     
     def classify_severity(self, text: str) -> Tuple[str, float]:
         """
@@ -114,65 +127,188 @@ class TextClassifier:
         """
         try:
             processed_text = self.preprocess_text(text)
-            if not processed_text:
-                return "medium", 0.5
-            
-            text_vector = self.vectorizer.transform([processed_text])
-            prediction = self.severity_model.predict(text_vector)[0]
-            probabilities = self.severity_model.predict_proba(text_vector)[0]
-            confidence = float(max(probabilities))
-            
-            severity_map = {0: "low", 1: "medium", 2: "high", 3: "critical"}
-            severity = severity_map.get(prediction, "medium")
-            
-            return severity, confidence
         except Exception as e:
-            print(f"Error in severity classification: {e}")
+            logger.error("Error in severity classification: %s", e)
             return "medium", 0.5
+        return self.predict_severity(processed_text)
     
-    def classify_department(self, text: str, category: str) -> str:
+    def predict_severity(self, processed_text: str) -> Tuple[str, float]:
         """
-        Classify department based on text and category using a hybrid approach.
+        Classify severity of already preprocessed text
+        
+        Returns:
+            Tuple of (severity_level, confidence)
         """
         try:
-            # 1. Start with Category-based mapping (Fixed source of truth)
-            dept_map = {
-                "road_damage": "Road Maintenance",
-                "waste_overflow": "Sanitation",
-                "streetlight_failure": "Electrical"
-            }
-            category_dept = dept_map.get(category, "General")
-
-            # 2. Try Text-based classification as a "Secondary Vote"
-            processed_text = self.preprocess_text(text)
+            return self._severity_batch([processed_text])[0]
+        except Exception as e:
+            logger.error("Error in severity classification: %s", e)
+            return "medium", 0.5
+    
+    def classify_batch(self, texts: List[str], categories: List[str]) -> List["TextClassification"]:
+        """
+        Classify severity and department of many texts in one pass.
+        
+        Each text is preprocessed once and the whole batch is vectorized as a
+        single sparse matrix, so the severity model runs once per batch.
+        """
+        timer = StageTimer()
+        try:
+            with timer.stage("preprocess"):
+                processed_texts = self.preprocessor.preprocess_batch(texts)
+        except Exception as e:
+            logger.error("Error in text preprocessing: %s", e, extra=timer.fields())
+            processed_texts = [""] * len(texts)
+        return self.classify_processed_batch(processed_texts, categories, timer)
+    
+    def classify_processed_batch(
+        self,
+        processed_texts: List[str],
+        categories: List[str],
+        timer: Optional[StageTimer] = None
+    ) -> List["TextClassification"]:
+        """classify_batch for texts that were already preprocessed"""
+        timer = timer or StageTimer()
+        try:
+            with timer.stage("severity"):
+                severities = self._severity_batch(processed_texts)
+        except Exception as e:
+            logger.error("Error in severity classification: %s", e, extra=timer.fields())
+            severities = [("medium", 0.5)] * len(processed_texts)
+        logger.debug("Text batch classified", extra=timer.fields(batch_size=len(processed_texts)))
+        
+        batch = _TextBatch(self, processed_texts)
+        return [
+            TextClassification(
+                severity=severity,
+                severity_confidence=confidence,
+                department=self.classify_department(processed_texts[i], category),
+                batch=batch,
+                index=i
+            )
+            for i, ((severity, confidence), category) in enumerate(zip(severities, categories))
+        ]
+    
+    def _severity_batch(self, processed_texts: List[str]) -> List[Tuple[str, float]]:
+        """Severity for each text: cache first, then one vectorized call for the misses"""
+        results: List[Optional[Tuple[str, float]]] = [None] * len(processed_texts)
+        missing = {}  # processed text -> indices (duplicates are classified once)
+        
+        for i, processed_text in enumerate(processed_texts):
             if not processed_text:
-                return category_dept
-            
-            text_vector = self.vectorizer.transform([processed_text])
-            prediction = self.department_model.predict(text_vector)[0]
+                results[i] = ("medium", 0.5)
+                continue
+            # Resubmitted reports normalize to the same text
+            cached = self.cache.get(content_digest(processed_text))
+            if cached is not None:
+                results[i] = tuple(cached)
+            else:
+                missing.setdefault(processed_text, []).append(i)
+        
+        if missing:
+            unique_texts = list(missing)
+            if self.remote is not None:
+                predicted = [tuple(r) for r in self.remote.call("text.severity_batch", unique_texts)]
+            else:
+                severity_map = {0: "low", 1: "medium", 2: "high", 3: "critical"}
+                text_matrix = self.vectorizer.transform(unique_texts)
+                # One model pass: the label is the most probable class
+                probabilities = self.severity_model.predict_proba(text_matrix)
+                predictions = self.severity_model.classes_[probabilities.argmax(axis=1)]
+                confidences = probabilities.max(axis=1)
+                predicted = [
+                    (severity_map.get(prediction, "medium"), float(confidence))
+                    for prediction, confidence in zip(predictions, confidences)
+                ]
             
+            for processed_text, result in zip(unique_texts, predicted):
+                self.cache.set(content_digest(processed_text), list(result))
+                for i in missing[processed_text]:
+                    results[i] = result
+        
+        return results
+    
+    def cache_stats(self) -> Dict:
+        """Hit/miss counters of the severity result cache"""
+        return self.cache.stats()
+    
+    def preprocessing_stats(self) -> Dict:
+        """Hit/miss counters of the lemma memo"""
+        return self.preprocessor.stats()
+    
+    def classify_department(self, text: str, category: str) -> str:
+        """
+        Department responsible for an issue: fixed by its category (the
+        text-only vote is available separately, see predict_text_department)
+        """
+        dept_map = {
+            "road_damage": "Road Maintenance",
+            "waste_overflow": "Sanitation",
+            "streetlight_failure": "Electrical"
+        }
+        return dept_map.get(category, "General")
+    
+    def predict_text_department(self, processed_text: str) -> str:
+        """Department predicted from the text alone"""
+        return self._text_department_batch([processed_text])[0]
+    
+    def _text_department_batch(self, processed_texts: List[str]) -> List[Optional[str]]:
+        """Text-only department vote for each text (None for empty text)"""
+        present = [i for i, text in enumerate(processed_texts) if text]
+        results: List[Optional[str]] = [None] * len(processed_texts)
+        if not present:
+            return results
+        
+        texts = [processed_texts[i] for i in present]
+        if self.remote is not None:
+            departments = self.remote.call("text.text_department_batch", texts)
+        else:
             department_map = {
                 0: "Road Maintenance",
                 1: "Sanitation",
                 2: "Electrical"
             }
-            text_dept = department_map.get(prediction, "General")
+            predictions = self.department_model.predict(self.vectorizer.transform(texts))
+            departments = [department_map.get(prediction, "General") for prediction in predictions]
+        
+        for i, department in zip(present, departments):
+            results[i] = department
+        return results
 
-            # 3. Hybrid Logic: 
-            # If text classification matches category, return it.
-            # If they conflict, prioritize the category-based routing (Visual Evidence)
-            # unless the text is extremely clear (this can be expanded later).
-            return category_dept
-            
-        except Exception as e:
-            print(f"Error in department classification: {e}")
-            dept_map = {
-                "road_damage": "Road Maintenance",
-                "waste_overflow": "Sanitation",
-                "streetlight_failure": "Electrical"
-            }
-            return dept_map.get(category, "General")
 
+class _TextBatch:
+    """Shared state of one classify_batch call; the text department vote is computed lazily"""
+    
+    def __init__(self, classifier: TextClassifier, processed_texts: List[str]):
+        self.classifier = classifier
+        self.processed_texts = processed_texts
+        self._text_departments = None
+    
+    def text_department(self, index: int) -> Optional[str]:
+        if self._text_departments is None:
+            # First access runs the department model once for the whole batch
+            self._text_departments = self.classifier._text_department_batch(self.processed_texts)
+        return self._text_departments[index]
+
+
+class TextClassification:
+    """Result of TextClassifier.classify_batch for one text"""
+    
+    def __init__(self, severity: str, severity_confidence: float, department: str, batch: _TextBatch, index: int):
+        self.severity = severity
+        self.severity_confidence = severity_confidence
+        self.department = department
+        self._batch = batch
+        self._index = index
+    
+    @property
+    def processed_text(self) -> str:
+        return self._batch.processed_texts[self._index]
+    
+    @property
+    def text_department(self) -> Optional[str]:
+        """Department voted by the text model alone (computed on first access)"""
+        return self._batch.text_department(self._index)
 
 # Singleton instance
 text_classifier = TextClassifier()
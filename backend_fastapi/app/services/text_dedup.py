@@ -0,0 +1,200 @@
+"""
+Text-similarity duplicate detection for reports without a photo
+
+Titles + descriptions of recent issues are shingled into character 4-grams
+and summarized by MinHash signatures. Signatures are split into LSH bands
+kept in per-category hash tables, so a new report only meets the issues
+sharing at least one band (likely Jaccard similarity above ~0.4) instead of
+every recent report; those few are verified with the exact Jaccard of their
+shingle sets.
+"""
+import os
+import re
+import zlib
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models.issue import Issue
+from .rolling_index import RollingIssueIndex, _utc_naive
+
+# Shingle Jaccard similarity above which two nearby reports are the same issue
+TEXT_DUPLICATE_THRESHOLD = float(os.getenv("TEXT_DUPLICATE_THRESHOLD", "0.8"))
+TEXT_MINHASH_PERMUTATIONS = int(os.getenv("TEXT_MINHASH_PERMUTATIONS", "128"))
+# bands x rows = permutations; more bands catch lower similarities (more candidates)
+TEXT_LSH_BANDS = int(os.getenv("TEXT_LSH_BANDS", "32"))
+
+SHINGLE_SIZE = 4
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# Notes appended by the hybrid classifier are not part of the citizen's report
+_SYSTEM_NOTE = "[SYSTEM NOTE]"
+
+
+def normalize_text(title: Optional[str], description: Optional[str]) -> str:
+    """Lowercase alphanumeric words of a report, system notes stripped"""
+    description = (description or "").split(_SYSTEM_NOTE, 1)[0]
+    return _NON_ALNUM.sub(" ", f"{title or ''} {description}".lower()).strip()
+
+
+def shingles(text: str) -> FrozenSet[int]:
+    """32-bit hashes of the character ``SHINGLE_SIZE``-grams of normalized text"""
+    if len(text) <= SHINGLE_SIZE:
+        return frozenset([zlib.crc32(text.encode())]) if text else frozenset()
+    return frozenset(
+        zlib.crc32(text[i:i + SHINGLE_SIZE].encode())
+        for i in range(len(text) - SHINGLE_SIZE + 1)
+    )
+
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    ``num_perm`` multiply-add-shift hashes ((a * x + b) mod 2^64) >> 32 over
+    32-bit shingles: a universal family computed with wrapping uint64 math
+    """
+
+    def __init__(self, num_perm: int = TEXT_MINHASH_PERMUTATIONS, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.randint(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_hashes: FrozenSet[int]) -> np.ndarray:
+        values = np.fromiter(shingle_hashes, dtype=np.uint64, count=len(shingle_hashes))
+        return ((values[:, None] * self.a + self.b) >> np.uint64(32)).min(axis=0)
+
+
+class IndexedText:
+    """The columns of an issue needed to find text duplicates"""
+
+    __slots__ = ("id", "category", "latitude", "longitude", "reported_at", "text", "shingles", "bands")
+
+    def __init__(self, row, text: str, shingle_hashes: FrozenSet[int], bands: Tuple[bytes, ...]):
+        self.id = row.id
+        self.category = getattr(row.category, "value", row.category)
+        self.latitude = row.latitude
+        self.longitude = row.longitude
+        self.reported_at = _utc_naive(row.reported_at)
+        self.text = text
+        self.shingles = shingle_hashes
+        self.bands = bands
+
+
+class TextLSHIndex(RollingIssueIndex):
+    """
+    MinHash LSH band tables per category over a rolling time window.
+
+    Like the spatial index this is only a candidate prefilter: callers
+    re-load the matched row from the database before merging into it.
+    """
+
+    name = "text LSH index"
+
+    def __init__(
+        self,
+        window_hours: float,
+        threshold: float = TEXT_DUPLICATE_THRESHOLD,
+        num_perm: int = TEXT_MINHASH_PERMUTATIONS,
+        bands: int = TEXT_LSH_BANDS
+    ):
+        if num_perm % bands:
+            raise ValueError(f"{num_perm} MinHash permutations cannot be split into {bands} bands")
+        super().__init__(window_hours)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._tables: Dict[str, List[Dict[bytes, Set[int]]]] = {}
+
+    def band_keys(self, shingle_hashes: FrozenSet[int]) -> Tuple[bytes, ...]:
+        if not shingle_hashes:
+            return ()
+        signature = self.hasher.signature(shingle_hashes)
+        return tuple(
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        )
+
+    def similar_texts(
+        self,
+        category: str,
+        title: str,
+        description: Optional[str],
+        since: datetime
+    ) -> List[Tuple[IndexedText, float]]:
+        """(issue, Jaccard similarity) of indexed issues of ``category`` above the threshold, most similar first"""
+        shingle_hashes = shingles(normalize_text(title, description))
+        bands = self.band_keys(shingle_hashes)
+        since = _utc_naive(since)
+        matches = []
+        with self._lock:
+            tables = self._tables.get(getattr(category, "value", category))
+            if not tables or not bands:
+                return matches
+            candidate_ids: Set[int] = set()
+            for table, key in zip(tables, bands):
+                candidate_ids.update(table.get(key, ()))
+            for issue_id in candidate_ids:
+                entry = self._entries[issue_id]
+                if entry.reported_at is not None and entry.reported_at < since:
+                    continue
+                similarity = jaccard(shingle_hashes, entry.shingles)
+                if similarity >= self.threshold:
+                    matches.append((entry, similarity))
+        return sorted(matches, key=lambda match: -match[1])
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "warm": self._warm,
+                "issues": len(self._entries),
+                "buckets": sum(len(table) for tables in self._tables.values() for table in tables),
+                "bands": self.bands,
+                "rows_per_band": self.rows,
+                "threshold": self.threshold,
+                "window_hours": self.window_hours,
+            }
+
+    def _query(self, db: Session):
+        return db.query(
+            Issue.id, Issue.category, Issue.latitude, Issue.longitude,
+            Issue.reported_at, Issue.title, Issue.description, Issue.is_duplicate
+        )
+
+    def _entry(self, row) -> IndexedText:
+        text = normalize_text(row.title, row.description)
+        existing = self._entries.get(row.id)
+        if existing is not None and existing.text == text:
+            # Re-read unchanged text: skip re-hashing
+            return IndexedText(row, text, existing.shingles, existing.bands)
+        shingle_hashes = shingles(text)
+        return IndexedText(row, text, shingle_hashes, self.band_keys(shingle_hashes))
+
+    def _insert(self, entry: IndexedText):
+        if not entry.bands:
+            return
+        tables = self._tables.get(entry.category)
+        if tables is None:
+            tables = self._tables[entry.category] = [{} for _ in range(self.bands)]
+        for table, key in zip(tables, entry.bands):
+            table.setdefault(key, set()).add(entry.id)
+
+    def _remove(self, entry: IndexedText):
+        tables = self._tables.get(entry.category)
+        if tables is None:
+            return
+        for table, key in zip(tables, entry.bands):
+            ids = table.get(key)
+            if ids is not None:
+                ids.discard(entry.id)
+                if not ids:
+                    del table[key]
+
+    def _clear(self):
+        self._tables.clear()
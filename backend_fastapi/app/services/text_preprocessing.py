@@ -0,0 +1,84 @@
+"""
+Fast text preprocessing for the text classifier
+
+Produces exactly the output of the original NLTK pipeline (lowercase, strip
+non-letters, ``word_tokenize``, drop stop words / short tokens, WordNet
+lemmatize) without running Punkt and the Treebank regex cascade per request,
+and memoizes lemmas so WordNet is consulted once per distinct token.
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List
+
+LEMMA_CACHE_SIZE = int(os.getenv("TEXT_LEMMA_CACHE_SIZE", "50000"))
+
+_NON_ALPHA = re.compile(r'[^a-zA-Z\s]')
+
+# Once everything but ASCII letters and whitespace is stripped, Punkt never
+# splits sentences and the only Treebank rules that can still fire are these
+# whole-word contraction splits (the others need punctuation or quotes)
+_CONTRACTIONS = {
+    "cannot": ("can", "not"),
+    "gimme": ("gim", "me"),
+    "gonna": ("gon", "na"),
+    "gotta": ("got", "ta"),
+    "lemme": ("lem", "me"),
+    "wanna": ("wan", "na"),
+}
+
+
+class TextPreprocessor:
+    """
+    Precompiled tokenizer + bounded token -> lemma memo.
+
+    ``lemmatize`` is the (expensive) single-token lemmatizer, e.g.
+    ``WordNetLemmatizer().lemmatize``.
+    """
+
+    def __init__(
+        self,
+        stop_words: Iterable[str],
+        lemmatize: Callable[[str], str],
+        cache_size: int = LEMMA_CACHE_SIZE
+    ):
+        self.stop_words = frozenset(stop_words)
+        self._lemmatize = lru_cache(maxsize=cache_size)(lemmatize)
+
+    def tokenize(self, text: str) -> List[str]:
+        """Same tokens as ``word_tokenize`` on lowercased, letters-only text"""
+        tokens = []
+        for token in _NON_ALPHA.sub('', text.lower()).split():
+            split = _CONTRACTIONS.get(token)
+            if split is None:
+                tokens.append(token)
+            else:
+                tokens.extend(split)
+        return tokens
+
+    def preprocess(self, text: str) -> str:
+        """Preprocess text: lowercase, remove special chars, lemmatize"""
+        if not text:
+            return ""
+        stop_words = self.stop_words
+        lemmatize = self._lemmatize
+        return ' '.join(
+            lemmatize(token)
+            for token in self.tokenize(text)
+            if token not in stop_words and len(token) > 2
+        )
+
+    def preprocess_batch(self, texts: List[str]) -> List[str]:
+        """Preprocess many texts; tokens shared between them are lemmatized once"""
+        return [self.preprocess(text) for text in texts]
+
+    def stats(self) -> Dict:
+        info = self._lemmatize.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "lemma_cache_entries": info.currsize,
+            "lemma_cache_max_entries": info.maxsize,
+            "lemma_cache_hits": info.hits,
+            "lemma_cache_misses": info.misses,
+            "lemma_cache_hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+        }
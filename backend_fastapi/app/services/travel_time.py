@@ -0,0 +1,207 @@
+"""
+Road-network travel times for crew dispatch
+
+Loads an OSM-derived road graph once per process: a directory with the node
+and edge tables exported by OSMnx (``ox.graph_to_gdfs``)::
+
+    nodes.csv    osmid, y (latitude), x (longitude)
+    edges.csv    u, v, length (m) and optionally travel_time (s) / speed_kph
+
+Edges are directed, as in OSMnx graphs (two-way streets appear once per
+direction), so one-way streets and bridges are respected. Coordinates are
+snapped to the nearest node with a KD-tree; one Dijkstra search per distinct
+source node (``scipy.sparse.csgraph``) gives the travel time to every node,
+and those rows are kept in an LRU cache keyed by the snapped node, so a
+crew that has not moved is never searched again.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ROAD_GRAPH_DIR = os.getenv("ROAD_GRAPH_DIR", "ml_training/road_graph")
+# Source nodes whose travel-time rows are cached (one float32 per graph node each)
+TRAVEL_TIME_CACHE_SIZE = int(os.getenv("TRAVEL_TIME_CACHE_SIZE", "256"))
+# Speed of edges without travel_time / speed_kph, and of the leg between a point and its snapped node
+ROAD_DEFAULT_SPEED_KMH = float(os.getenv("ROAD_DEFAULT_SPEED_KMH", "30"))
+# Points farther than this from any node are off the network (straight-line time instead)
+ROAD_SNAP_MAX_KM = float(os.getenv("ROAD_SNAP_MAX_KM", "1.0"))
+
+KM_PER_DEGREE = 111.32
+
+
+class RoadNetwork:
+    """Directed road graph with snapping and cached single-source travel times (minutes)"""
+
+    def __init__(
+        self,
+        path: str,
+        cache_size: int = TRAVEL_TIME_CACHE_SIZE,
+        default_speed_kmh: float = ROAD_DEFAULT_SPEED_KMH,
+        snap_max_km: float = ROAD_SNAP_MAX_KM
+    ):
+        import pandas as pd
+        from scipy.sparse import csr_matrix
+        from scipy.spatial import cKDTree
+
+        self.path = path
+        self.cache_size = cache_size
+        self.default_speed_kmh = default_speed_kmh
+        self.snap_max_km = snap_max_km
+
+        nodes = pd.read_csv(os.path.join(path, "nodes.csv"), usecols=["osmid", "y", "x"])
+        edges = pd.read_csv(os.path.join(path, "edges.csv"))
+        self.latitudes = nodes["y"].to_numpy(dtype=np.float64)
+        self.longitudes = nodes["x"].to_numpy(dtype=np.float64)
+        position = pd.Series(np.arange(len(nodes)), index=nodes["osmid"].to_numpy())
+
+        known = edges["u"].isin(position.index) & edges["v"].isin(position.index)
+        if not known.all():
+            logger.warning("Skipping %d edges with unknown nodes", int((~known).sum()))
+            edges = edges[known]
+        sources = position[edges["u"].to_numpy()].to_numpy()
+        targets = position[edges["v"].to_numpy()].to_numpy()
+        minutes = self._edge_minutes(edges)
+
+        # Parallel edges: keep the fastest (csr_matrix would sum them)
+        order = np.lexsort((minutes, targets, sources))
+        sources, targets, minutes = sources[order], targets[order], minutes[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+        # Zero-length edges would vanish from the sparse graph
+        weights = np.maximum(minutes[first], 1e-6)
+        self.graph = csr_matrix((weights, (sources[first], targets[first])), shape=(len(nodes),) * 2)
+
+        # Equirectangular projection around the network's centre for nearest-node search
+        self._cos_lat = float(np.cos(np.radians(np.mean(self.latitudes)))) if len(nodes) else 1.0
+        self._tree = cKDTree(self._project(self.latitudes, self.longitudes))
+
+        self._rows: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.cache_hits = 0
+
+    def _edge_minutes(self, edges) -> np.ndarray:
+        if "travel_time" in edges:
+            seconds = edges["travel_time"].to_numpy(dtype=np.float64)
+            if not np.isnan(seconds).any():
+                return seconds / 60
+        speeds = (
+            edges["speed_kph"].to_numpy(dtype=np.float64)
+            if "speed_kph" in edges else np.full(len(edges), np.nan)
+        )
+        speeds = np.where(np.isnan(speeds) | (speeds <= 0), self.default_speed_kmh, speeds)
+        return edges["length"].to_numpy(dtype=np.float64) / 1000 / speeds * 60
+
+    def _project(self, latitudes, longitudes) -> np.ndarray:
+        return np.column_stack([
+            np.asarray(longitudes, dtype=np.float64) * self._cos_lat * KM_PER_DEGREE,
+            np.asarray(latitudes, dtype=np.float64) * KM_PER_DEGREE
+        ])
+
+    def snap(self, latitudes: Sequence[float], longitudes: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """(nearest node, distance to it in km) of each point; node -1 when off the network"""
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        nodes = np.full(len(latitudes), -1, dtype=np.int64)
+        snap_km = np.full(len(latitudes), np.inf)
+        valid = np.isfinite(latitudes) & np.isfinite(longitudes)
+        if valid.any() and self.graph.shape[0]:
+            snap_km[valid], nodes[valid] = self._tree.query(self._project(latitudes[valid], longitudes[valid]))
+        nodes[snap_km > self.snap_max_km] = -1
+        return nodes, snap_km
+
+    def travel_minutes(
+        self,
+        source_lats: Sequence[float],
+        source_lons: Sequence[float],
+        target_lats: Sequence[float],
+        target_lons: Sequence[float]
+    ) -> np.ndarray:
+        """
+        Source x target driving minutes: leg to the snapped node + network
+        time + leg from the snapped node. Pairs with a point off the network
+        use the straight line at the default speed; unreachable pairs are inf.
+        """
+        from . import geo
+
+        source_nodes, source_km = self.snap(source_lats, source_lons)
+        target_nodes, target_km = self.snap(target_lats, target_lons)
+        rows = self._source_rows(np.unique(source_nodes[source_nodes >= 0]).tolist())
+
+        minutes = np.full((len(source_nodes), len(target_nodes)), np.inf)
+        on_network = target_nodes >= 0
+        for i, node in enumerate(source_nodes.tolist()):
+            if node >= 0:
+                minutes[i, on_network] = rows[node][target_nodes[on_network]]
+        # Legs between the points and their snapped nodes
+        minutes += (source_km[:, None] + target_km[None, :]) / self.default_speed_kmh * 60
+
+        off_network = (source_nodes < 0)[:, None] | ~on_network[None, :]
+        if off_network.any():
+            straight = geo.distance_matrix_km(source_lats, source_lons, target_lats, target_lons)
+            minutes[off_network] = (straight / self.default_speed_kmh * 60)[off_network]
+        return minutes
+
+    def _source_rows(self, nodes) -> Dict[int, np.ndarray]:
+        """Travel-time row of each source node: cached, or one batched Dijkstra for the misses"""
+        from scipy.sparse.csgraph import dijkstra
+
+        rows = {}
+        with self._lock:
+            for node in nodes:
+                row = self._rows.get(node)
+                if row is not None:
+                    self._rows.move_to_end(node)
+                    rows[node] = row
+            self.cache_hits += len(rows)
+        missing = [node for node in nodes if node not in rows]
+        if missing:
+            searched = dijkstra(self.graph, directed=True, indices=missing).astype(np.float32)
+            with self._lock:
+                self.searches += len(missing)
+                for node, row in zip(missing, searched):
+                    rows[node] = row
+                    self._rows[node] = row
+                    self._rows.move_to_end(node)
+                while len(self._rows) > self.cache_size:
+                    self._rows.popitem(last=False)
+        return rows
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "path": self.path,
+                "nodes": self.graph.shape[0],
+                "edges": self.graph.nnz,
+                "cached_sources": len(self._rows),
+                "cache_size": self.cache_size,
+                "searches": self.searches,
+                "cache_hits": self.cache_hits,
+            }
+
+
+_network: Optional[RoadNetwork] = None
+_network_loaded = False
+_network_lock = threading.Lock()
+
+
+def get_road_network() -> Optional[RoadNetwork]:
+    """The configured road graph (loaded once per process), or None when there is none"""
+    global _network, _network_loaded
+    if not _network_loaded:
+        with _network_lock:
+            if not _network_loaded:
+                if os.path.isfile(os.path.join(ROAD_GRAPH_DIR, "edges.csv")):
+                    try:
+                        _network = RoadNetwork(ROAD_GRAPH_DIR)
+                        logger.info("Road graph loaded", extra=_network.stats())
+                    except Exception as e:
+                        logger.error("Error loading road graph from %s: %s. Using straight-line distances.", ROAD_GRAPH_DIR, e)
+                _network_loaded = True
+    return _network
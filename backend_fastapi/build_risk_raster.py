@@ -0,0 +1,67 @@
+"""
+Build the memory-mapped location risk raster used by priority scoring
+
+Each layer is a north-up grid covering the same bounds: a GeoTIFF (read with
+rasterio, bounds taken from the file) or a .npy array (bounds given on the
+command line). Typical sources are a population density grid and a road
+importance grid rasterized from OSM road classes.
+
+Usage:
+    python build_risk_raster.py --density population.tif --road-importance roads.tif
+    python build_risk_raster.py --density density.npy --bounds 12.8 13.3 80.0 80.4
+"""
+import argparse
+import os
+
+import numpy as np
+
+from app.services.risk_raster import RISK_RASTER_DIR, write_risk_raster
+
+
+def read_layer(path: str):
+    """(grid, (min_lat, max_lat, min_lon, max_lon) or None) of a GeoTIFF or .npy layer"""
+    if path.endswith(".npy"):
+        return np.load(path), None
+
+    import rasterio
+
+    with rasterio.open(path) as source:
+        if source.crs is not None and source.crs.to_epsg() != 4326:
+            raise SystemExit(f"{path} must be in EPSG:4326 (lat/lon), reproject it first (e.g. gdalwarp -t_srs EPSG:4326)")
+        grid = source.read(1, masked=True).astype(np.float32).filled(np.nan)
+        bounds = source.bounds
+        return grid, (bounds.bottom, bounds.top, bounds.left, bounds.right)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the location risk raster")
+    parser.add_argument("--density", help="Population density grid (.tif or .npy)")
+    parser.add_argument("--road-importance", help="Road importance grid (.tif or .npy)")
+    parser.add_argument("--bounds", type=float, nargs=4, metavar=("MIN_LAT", "MAX_LAT", "MIN_LON", "MAX_LON"),
+                        help="Bounds of .npy layers")
+    parser.add_argument("--density-scale", type=float, help="Density counted as full risk (default: the maximum)")
+    parser.add_argument("--road-scale", type=float, help="Road importance counted as full risk (default: the maximum)")
+    parser.add_argument("--output", default=RISK_RASTER_DIR, help="Output directory")
+    args = parser.parse_args()
+
+    sources = {"density": args.density, "road_importance": args.road_importance}
+    layers, bounds = {}, args.bounds
+    for name, path in sources.items():
+        if not path:
+            continue
+        grid, layer_bounds = read_layer(path)
+        if layer_bounds is not None:
+            if bounds is not None and not np.allclose(bounds, layer_bounds, atol=1e-6):
+                raise SystemExit(f"{path} covers {layer_bounds}, other layers cover {tuple(bounds)}")
+            bounds = layer_bounds
+        layers[name] = grid
+    if not layers:
+        parser.error("give at least one of --density / --road-importance")
+    if bounds is None:
+        parser.error("--bounds is required for .npy layers")
+
+    manifest = write_risk_raster(
+        args.output, layers, *bounds,
+        scales={"density": args.density_scale, "road_importance": args.road_scale}
+    )
+    print(f"Wrote {', '.join(manifest['layers'])} {manifest['shape']} to {os.path.abspath(args.output)}")
@@ -0,0 +1,73 @@
+"""
+Bring an existing database schema up to date with the models.
+
+``Base.metadata.create_all`` only creates missing tables; this adds the columns
+introduced since a table was created and backfills the ones derived from
+existing data. Safe to run repeatedly.
+
+Usage:
+    python migrate_db.py
+"""
+from sqlalchemy import inspect, text
+
+from app.database import engine
+from app.services.hash_index import hash_to_words
+
+BACKFILL_BATCH_SIZE = 1000
+
+# (table, column, SQL type) in the order they were introduced
+COLUMNS = [
+    ("issues", "image_dhash", "VARCHAR"),
+    ("issues", "image_phash_0", "BIGINT"),
+    ("issues", "image_phash_1", "BIGINT"),
+    ("issues", "image_phash_2", "BIGINT"),
+    ("issues", "image_phash_3", "BIGINT"),
+]
+
+
+def add_missing_columns():
+    existing = {}
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table, column, sql_type in COLUMNS:
+            if table not in existing:
+                existing[table] = {c["name"] for c in inspector.get_columns(table)}
+            if column in existing[table]:
+                continue
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}"))
+            existing[table].add(column)
+            print(f"Added {table}.{column}")
+
+
+def backfill_phash_words():
+    """Split each stored hex image_hash into the image_phash_0..3 words"""
+    last_id, filled = 0, 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(text(
+                "SELECT id, image_hash FROM issues "
+                "WHERE id > :last_id AND image_hash IS NOT NULL AND image_phash_0 IS NULL "
+                "ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": BACKFILL_BATCH_SIZE}).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            params = []
+            for row in rows:
+                words = hash_to_words(row.image_hash)
+                if words is not None:  # Hashes of another hash_size stay hex-only
+                    params.append({"id": row.id, "p0": words[0], "p1": words[1], "p2": words[2], "p3": words[3]})
+            if params:
+                connection.execute(text(
+                    "UPDATE issues SET image_phash_0 = :p0, image_phash_1 = :p1, "
+                    "image_phash_2 = :p2, image_phash_3 = :p3 WHERE id = :id"
+                ), params)
+                filled += len(params)
+    if filled:
+        print(f"Backfilled image_phash words of {filled} issues")
+
+
+if __name__ == "__main__":
+    add_missing_columns()
+    backfill_phash_words()
+    print("Schema is up to date. Run reprocess_uploads.py to fill image_dhash for stored uploads.")
@@ -0,0 +1,181 @@
+"""
+Re-score stored uploads after retraining the image model or changing the hash size.
+
+Streams every issue with an uploaded photo through a multi-process decode +
+hash stage and batched CNN inference, re-runs severity classification on the
+issue text, and writes image_hash, image_dhash, ml_category_confidence,
+severity and ml_severity_confidence back with bulk UPDATEs. Progress is checkpointed after
+every committed chunk so an interrupted run can be resumed.
+
+Usage:
+    python reprocess_uploads.py --batch-size 64 --workers 8
+    python reprocess_uploads.py --resume
+"""
+import os
+import json
+import time
+import argparse
+import multiprocessing
+from datetime import datetime
+
+import numpy as np
+
+from app.services.image_ingest import ingest_image
+
+DEFAULT_CHECKPOINT = "reprocess_checkpoint.json"
+PHASH_WORD_COLUMNS = ("image_phash_0", "image_phash_1", "image_phash_2", "image_phash_3")
+
+
+def decode_upload(job):
+    """Worker: decode once, compute the perceptual / difference hashes and the classifier input"""
+    import imagehash
+
+    issue_id, path, hash_size, dhash_size = job
+    try:
+        with open(path, "rb") as f:
+            ingested = ingest_image(f.read())
+        hash_view = ingested.hash_view(hash_size * 4)
+        image_hashes = (
+            str(imagehash.phash(hash_view, hash_size=hash_size)),
+            str(imagehash.dhash(hash_view, hash_size=dhash_size))
+        )
+        return issue_id, image_hashes, ingested.classifier_input()[0]
+    except Exception as e:
+        return issue_id, None, str(e)
+
+
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"last_id": 0, "processed": 0, "failed": 0}
+
+
+def save_checkpoint(path, state):
+    state["updated_at"] = datetime.utcnow().isoformat()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def iter_chunks(db, start_id, chunk_size, limit=None):
+    """Keyset-paginate issues with images by primary key (only the needed columns)"""
+    from app.models.issue import Issue
+
+    last_id = start_id
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        rows = db.query(
+            Issue.id, Issue.image_path, Issue.title, Issue.description, Issue.category
+        ).filter(
+            Issue.id > last_id,
+            Issue.image_path.isnot(None)
+        ).order_by(Issue.id).limit(size).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored uploads with the current models")
+    parser.add_argument("--batch-size", type=int, default=64, help="Images per forward pass / UPDATE chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Decode processes")
+    parser.add_argument("--checkpoint", type=str, default=DEFAULT_CHECKPOINT, help="Checkpoint file")
+    parser.add_argument("--resume", action="store_true", help="Continue after the last checkpointed issue")
+    parser.add_argument("--limit", type=int, help="Process at most N issues")
+    parser.add_argument("--skip-text", action="store_true", help="Do not recompute severity")
+    parser.add_argument("--dry-run", action="store_true", help="Compute but do not write to the database")
+    args = parser.parse_args()
+
+    # Spawned decode workers must not inherit TensorFlow: create the pool first
+    pool = multiprocessing.get_context("spawn").Pool(args.workers)
+
+    from sqlalchemy import update
+    from app.database import SessionLocal
+    from app.models.issue import Issue, IssueSeverity
+    from app.services.duplicate_checker import duplicate_checker
+    from app.services.hash_index import hash_to_words
+    from app.services.image_classifier import image_classifier
+    from app.services.text_classifier import text_classifier
+
+    state = load_checkpoint(args.checkpoint) if args.resume else {"last_id": 0, "processed": 0, "failed": 0}
+    print(f"Starting after issue id {state['last_id']} "
+          f"(model {image_classifier.model_version}, hash_size {duplicate_checker.hash_size})")
+
+    db = SessionLocal()
+    run_start = time.perf_counter()
+    run_images = 0
+    try:
+        for rows in iter_chunks(db, state["last_id"], args.batch_size, args.limit):
+            chunk_start = time.perf_counter()
+            jobs = [
+                (row.id, row.image_path, duplicate_checker.hash_size, duplicate_checker.dhash_size)
+                for row in rows
+            ]
+
+            decoded = {}
+            for issue_id, image_hashes, payload in pool.imap_unordered(decode_upload, jobs):
+                if image_hashes is None:
+                    print(f"  Issue {issue_id}: could not decode upload ({payload})")
+                    state["failed"] += 1
+                    continue
+                decoded[issue_id] = (image_hashes, payload)
+
+            updates = {row.id: {"id": row.id} for row in rows}
+
+            # One forward pass for the whole chunk
+            if decoded:
+                ids = list(decoded)
+                predictions = image_classifier.predict_batch(np.stack([decoded[i][1] for i in ids]))
+                for issue_id, probs in zip(ids, predictions):
+                    image_hash, image_dhash = decoded[issue_id][0]
+                    updates[issue_id].update(
+                        image_hash=image_hash,
+                        image_dhash=image_dhash,
+                        **dict(zip(PHASH_WORD_COLUMNS, hash_to_words(image_hash, duplicate_checker.hash_size ** 2)))
+                    )
+                    updates[issue_id]["ml_category_confidence"] = float(np.max(probs))
+
+            if not args.skip_text:
+                # One vectorized severity pass per chunk
+                results = text_classifier.classify_batch(
+                    [f"{row.title} {row.description or ''}" for row in rows],
+                    [row.category.value for row in rows]
+                )
+                for row, result in zip(rows, results):
+                    updates[row.id]["severity"] = IssueSeverity(result.severity)
+                    updates[row.id]["ml_severity_confidence"] = float(result.severity_confidence)
+
+            mappings = [m for m in updates.values() if len(m) > 1]
+            if mappings and not args.dry_run:
+                db.execute(update(Issue), mappings)  # bulk UPDATE by primary key
+                db.commit()
+
+            state["last_id"] = rows[-1].id
+            state["processed"] += len(rows)
+            if not args.dry_run:
+                save_checkpoint(args.checkpoint, state)
+
+            run_images += len(decoded)
+            elapsed = time.perf_counter() - chunk_start
+            total = time.perf_counter() - run_start
+            print(f"  ..issue {state['last_id']}: {len(decoded)} images in {elapsed:.2f}s "
+                  f"({len(decoded) / elapsed:.1f} img/s, run avg {run_images / total:.1f} img/s)")
+    finally:
+        db.close()
+        pool.close()
+        pool.join()
+
+    total = time.perf_counter() - run_start
+    print(f"Done: {state['processed']} issues, {state['failed']} failed, "
+          f"{run_images} images in {total:.1f}s ({run_images / total if total else 0:.1f} img/s)")
+
+
+if __name__ == "__main__":
+    main()
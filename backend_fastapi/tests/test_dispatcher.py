@@ -0,0 +1,104 @@
+"""
+Incremental dispatcher against concurrent writers (two sessions on one SQLite file)
+"""
+import os
+import tempfile
+
+# app.database builds its engine at import time (the PostgreSQL driver may not be installed)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'uirs-tests.db')}")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app import models  # noqa: F401 - registers every table on Base.metadata
+from app.models.crew import Assignment, Crew, CrewStatus
+from app.models.issue import Issue, IssueCategory, IssueStatus
+from app.models.user import User
+from app.services.dispatcher import IncrementalDispatcher, StaleState
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'dispatch.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    setup = Session()
+    setup.add(User(id=1, email="citizen@example.com", username="citizen", hashed_password="x"))
+    setup.add(Crew(
+        id=1, name="Crew 1", department="General", current_latitude=13.0, current_longitude=80.0,
+        status=CrewStatus.AVAILABLE, max_capacity=3, current_load=0
+    ))
+    setup.add(Issue(
+        id=1, user_id=1, latitude=13.001, longitude=80.001, category=IssueCategory.ROAD_DAMAGE,
+        title="Pothole", status=IssueStatus.VERIFIED, priority_score=80.0
+    ))
+    setup.commit()
+    setup.close()
+
+    worker, other = Session(), Session()
+    yield worker, other
+    worker.close()
+    other.close()
+    engine.dispose()
+
+
+def test_apply_sees_load_committed_by_another_session(sessions):
+    worker, other = sessions
+    dispatcher = IncrementalDispatcher(enabled=True, resolve_seconds=0)
+    # Held by the request, as the route's own objects are: stays in the session's identity map
+    cached_crew = worker.get(Crew, 1)
+
+    dispatcher._load_state(worker)
+    loads = {crew_id: slots.load for crew_id, slots in dispatcher._crews.items()}
+    changes = dispatcher._plan_insert(worker, worker.get(Issue, 1))
+    assert changes == [(1, None, 1)]
+
+    # Another worker dispatches to the same crew between planning and writing
+    crew = other.get(Crew, 1)
+    crew.current_load = 1
+    other.commit()
+
+    with pytest.raises(StaleState):
+        dispatcher._apply(worker, changes, loads)
+    assert cached_crew.current_load == 1
+
+
+def test_repair_replans_after_concurrent_write(sessions):
+    worker, other = sessions
+    dispatcher = IncrementalDispatcher(enabled=True, resolve_seconds=0)
+    cached_crew = worker.get(Crew, 1)
+    dispatcher._load_state(worker)
+
+    crew = other.get(Crew, 1)
+    crew.current_load = 1
+    other.commit()
+
+    assert dispatcher.issue_changed(worker, worker.get(Issue, 1)) == [(1, None, 1)]
+    assert dispatcher.counters["conflicts"] == 1
+    assert cached_crew.current_load == 2
+    assert worker.query(Assignment).filter(Assignment.issue_id == 1).count() == 1
+
+
+@pytest.mark.parametrize("reload_state", [False, True])
+def test_issue_sent_back_to_backlog_is_reassigned_once(sessions, reload_state):
+    worker, _ = sessions
+    dispatcher = IncrementalDispatcher(enabled=True, resolve_seconds=0)
+    issue = worker.get(Issue, 1)
+    assert dispatcher.issue_changed(worker, issue) == [(1, None, 1)]
+
+    # Reset by hand (PUT /issues/{id}/status?status=verified)
+    issue.status = IssueStatus.VERIFIED
+    worker.commit()
+    if reload_state:
+        dispatcher.invalidate()
+
+    assert dispatcher.issue_changed(worker, issue) == [(1, 1, 1)]
+    active = worker.query(Assignment).filter(
+        Assignment.issue_id == 1, Assignment.is_completed == False
+    ).all()
+    assert len(active) == 1
+    assert issue.status == IssueStatus.ASSIGNED
+    assert issue.assigned_at is not None
+    assert worker.get(Crew, 1).current_load == 1
@@ -0,0 +1,58 @@
+"""
+TextPreprocessor against the original NLTK preprocess_text (golden output)
+"""
+import os
+import random
+import sys
+
+import pytest
+
+nltk = pytest.importorskip("nltk")
+pytest.importorskip("pandas")
+
+TEXT_MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "ml_training", "text_model")
+sys.path.insert(0, TEXT_MODEL_DIR)
+
+from benchmark_preprocessing import EDGE_CASES, reference_preprocess  # noqa: E402
+from generate_synthetic_data import generate_dataset  # noqa: E402
+
+from app.services.text_preprocessing import TextPreprocessor  # noqa: E402
+
+
+def _nltk_data_available(*resources: str) -> bool:
+    try:
+        for resource in resources:
+            nltk.data.find(resource)
+    except LookupError:
+        return False
+    return True
+
+
+# word_tokenize loads punkt_tab on newer NLTK releases
+NLTK_DATA = (
+    (_nltk_data_available("tokenizers/punkt") or _nltk_data_available("tokenizers/punkt_tab"))
+    and _nltk_data_available("corpora/stopwords", "corpora/wordnet")
+)
+
+
+pytestmark = pytest.mark.skipif(not NLTK_DATA, reason="NLTK punkt/stopwords/wordnet not downloaded")
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    random.seed(0)
+    return generate_dataset(2000)["text"].astype(str).tolist() + EDGE_CASES
+
+
+def test_tokens_match_original_preprocess_text(corpus):
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+
+    lemmatizer = WordNetLemmatizer()
+    stop_words = set(stopwords.words("english"))
+    preprocessor = TextPreprocessor(stop_words, lemmatizer.lemmatize)
+
+    expected = [reference_preprocess(text, lemmatizer, stop_words) for text in corpus]
+    assert preprocessor.preprocess_batch(corpus) == expected
+    # Second pass is served from the lemma cache
+    assert [preprocessor.preprocess(text) for text in corpus] == expected
@@ -0,0 +1,156 @@
+"""
+Side-by-side benchmark of the image classifier inference backends.
+
+Runs each backend (Keras and TFLite) in its own subprocess so the reported peak
+RSS is not polluted by the other, then prints accuracy, accuracy delta versus
+Keras, single-image / batched latency and peak memory.
+
+Usage:
+    python ml_training/image_model/benchmark_backends.py --data_dir ml_training/image_model/data/
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import numpy as np
+from PIL import Image
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "backend_fastapi"))
+
+# Same folder names as train.py / DATASET_GUIDE.md (sorted = model class order)
+CLASSES = ["road_damage", "streetlight_failure", "waste_overflow"]
+IMG_SIZE = (224, 224)
+
+
+def load_image(path):
+    """Same preprocessing as ImageClassifier.preprocess_image"""
+    image = Image.open(path).convert('RGB').resize(IMG_SIZE)
+    return np.asarray(image, dtype=np.float32) / 255.0
+
+
+def load_dataset(data_dir, limit):
+    images, labels = [], []
+    for label, name in enumerate(CLASSES):
+        class_dir = os.path.join(data_dir, name)
+        if not os.path.isdir(class_dir):
+            continue
+        files = sorted(os.listdir(class_dir))[:limit]
+        for filename in files:
+            try:
+                images.append(load_image(os.path.join(class_dir, filename)))
+                labels.append(label)
+            except Exception:
+                continue
+    return np.stack(images), np.array(labels)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_worker(backend_name, args):
+    """Benchmark one backend in this process and print a JSON result line"""
+    from app.services.image_backends import KerasBackend, TFLiteBackend
+
+    if backend_name == "keras":
+        backend = KerasBackend(args.keras_model)
+    else:
+        backend = TFLiteBackend(args.tflite_model, num_threads=args.threads or None)
+
+    start = time.perf_counter()
+    backend.load()
+    load_seconds = time.perf_counter() - start
+    rss_after_load = peak_rss_mb()
+
+    images, labels = load_dataset(args.data_dir, args.limit)
+
+    # Warm-up
+    backend.predict(images[:1])
+
+    single = []
+    for i in range(min(args.iterations, len(images))):
+        start = time.perf_counter()
+        backend.predict(images[i:i + 1])
+        single.append((time.perf_counter() - start) * 1000)
+
+    batched = []
+    predictions = []
+    for i in range(0, len(images), args.batch_size):
+        start = time.perf_counter()
+        output = backend.predict(images[i:i + args.batch_size])
+        batched.append((time.perf_counter() - start) * 1000 / len(output))
+        predictions.append(np.argmax(output, axis=1))
+    predictions = np.concatenate(predictions)
+
+    print(json.dumps({
+        "backend": backend_name,
+        "samples": int(len(labels)),
+        "accuracy": float(np.mean(predictions == labels)),
+        "predictions": predictions.tolist(),
+        "load_seconds": load_seconds,
+        "single_p50_ms": float(np.percentile(single, 50)),
+        "single_p95_ms": float(np.percentile(single, 95)),
+        "batched_per_image_ms": float(np.mean(batched)),
+        "rss_after_load_mb": rss_after_load,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Keras vs TFLite image backends")
+    parser.add_argument("--data_dir", type=str, required=True, help="Labelled dataset directory")
+    parser.add_argument("--keras_model", type=str, default=os.path.join(HERE, "mobilenetv2_issue_classifier.keras"))
+    parser.add_argument("--tflite_model", type=str, default=os.path.join(HERE, "mobilenetv2_issue_classifier.tflite"))
+    parser.add_argument("--limit", type=int, default=200, help="Max images per class")
+    parser.add_argument("--iterations", type=int, default=50, help="Single-image latency samples")
+    parser.add_argument("--batch_size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=0, help="TFLite interpreter threads (0 = default)")
+    parser.add_argument("--worker", choices=["keras", "tflite"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args)
+        return
+
+    results = {}
+    for backend_name in ("keras", "tflite"):
+        cmd = [sys.executable, __file__, "--worker", backend_name] + sys.argv[1:]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            print(f"{backend_name} benchmark failed:\n{proc.stderr[-2000:]}")
+            continue
+        results[backend_name] = json.loads(lines[-1])
+
+    if not results:
+        return
+
+    print(f"\n{'Backend':<8} | {'Acc':>6} | {'dAcc':>6} | {'p50 ms':>7} | {'p95 ms':>7} | {'batch ms/img':>12} | {'Load s':>6} | {'Peak RSS MB':>11}")
+    print("-" * 88)
+    baseline = results.get("keras")
+    for name, r in results.items():
+        delta = r["accuracy"] - baseline["accuracy"] if baseline else 0.0
+        print(
+            f"{name:<8} | {r['accuracy']:>6.3f} | {delta:>+6.3f} | {r['single_p50_ms']:>7.1f} | "
+            f"{r['single_p95_ms']:>7.1f} | {r['batched_per_image_ms']:>12.2f} | "
+            f"{r['load_seconds']:>6.1f} | {r['peak_rss_mb']:>11.0f}"
+        )
+
+    if "keras" in results and "tflite" in results:
+        agreement = np.mean(
+            np.array(results["keras"]["predictions"]) == np.array(results["tflite"]["predictions"])
+        )
+        keras_r, tflite_r = results["keras"], results["tflite"]
+        print(f"\nTop-1 agreement with Keras: {agreement:.1%}")
+        print(f"Latency reduction (p50):    {1 - tflite_r['single_p50_ms'] / keras_r['single_p50_ms']:.1%}")
+        print(f"Peak RSS reduction:         {1 - tflite_r['peak_rss_mb'] / keras_r['peak_rss_mb']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
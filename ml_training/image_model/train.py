@@ -10,6 +10,8 @@ import numpy as np
 IMG_SIZE = (224, 224)
 BATCH_SIZE = 32
 MODEL_NAME = "mobilenetv2_issue_classifier.keras"
+TFLITE_MODEL_NAME = "mobilenetv2_issue_classifier.tflite"
+REPRESENTATIVE_SAMPLES = 100
 
 def create_model(num_classes=3):
     """
@@ -133,20 +135,80 @@ def train_real(data_dir, target_path, epochs=10):
     model.save(target_path)
     print(f"Model saved to {target_path}")
 
+def representative_dataset(data_dir=None, num_samples=REPRESENTATIVE_SAMPLES):
+    """
+    Yields calibration images for int8 quantization.
+    Uses real images (same 1/255 rescale as the backend) when a dataset is available.
+    """
+    if data_dir:
+        datagen = ImageDataGenerator(rescale=1./255)
+        generator = datagen.flow_from_directory(
+            data_dir,
+            target_size=IMG_SIZE,
+            batch_size=1,
+            class_mode=None,
+            shuffle=True
+        )
+        for _ in range(min(num_samples, generator.samples)):
+            yield [next(generator).astype(np.float32)]
+    else:
+        print("Warning: No --data_dir given. Calibrating int8 ranges on random images.")
+        for _ in range(num_samples):
+            yield [np.random.rand(1, *IMG_SIZE, 3).astype(np.float32)]
+
+def export_tflite(model_path, target_path, quantization="float16", data_dir=None):
+    """
+    Converts a saved Keras model to a quantized TFLite model for the backend's
+    IMAGE_MODEL_BACKEND=tflite mode.
+
+    float16: weights stored as float16 (about half the size, near-identical accuracy).
+    int8:    weights and activations quantized to int8 using a representative dataset.
+             Input and output stay float32 so the backend preprocessing is unchanged.
+    """
+    print(f"Converting {model_path} to {quantization} TFLite...")
+    model = tf.keras.models.load_model(model_path)
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        converter.representative_dataset = lambda: representative_dataset(data_dir)
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS_INT8,
+            tf.lite.OpsSet.TFLITE_BUILTINS
+        ]
+    else:
+        raise ValueError(f"Unknown quantization mode: {quantization}")
+
+    tflite_model = converter.convert()
+
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    with open(target_path, 'wb') as f:
+        f.write(tflite_model)
+    print(f"TFLite model saved to {target_path} ({len(tflite_model) / 1e6:.1f} MB)")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Train Urban AI Image Classifier")
     parser.add_argument("--data_dir", type=str, help="Path to dataset directory")
     parser.add_argument("--output", type=str, default=MODEL_NAME, help="Path to save model")
     parser.add_argument("--epochs", type=int, default=10, help="Number of epochs")
     parser.add_argument("--dummy", action="store_true", help="Generate dummy model for testing")
+    parser.add_argument("--export_tflite", choices=["float16", "int8"], help="Also export a quantized TFLite model")
+    parser.add_argument("--tflite_output", type=str, default=TFLITE_MODEL_NAME, help="Path to save TFLite model")
     
     args = parser.parse_args()
     
     output_path = os.path.join(os.path.dirname(__file__), args.output)
+    tflite_path = os.path.join(os.path.dirname(__file__), args.tflite_output)
     
     if args.dummy:
         train_dummy(output_path)
     elif args.data_dir:
         train_real(args.data_dir, output_path, args.epochs)
-    else:
+    elif not args.export_tflite:
         print("Please provide --data_dir or use --dummy")
+    
+    # Convert the freshly trained (or an existing) model
+    if args.export_tflite:
+        export_tflite(output_path, tflite_path, args.export_tflite, args.data_dir)
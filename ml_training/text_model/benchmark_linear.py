@@ -0,0 +1,105 @@
+"""
+Benchmark of the linear fast path against the SVC pipeline.
+
+Trains both model families on the same split (as train.py does), then prints
+held-out accuracy, prediction agreement and single-text / batched latency of
+SVC ``predict`` + ``predict_proba`` versus the backend's NumPy LinearTextModel.
+
+Usage:
+    python ml_training/text_model/benchmark_linear.py --csv ml_training/text_model/data.csv
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.svm import SVC
+from sklearn.model_selection import train_test_split
+
+from train import LINEAR_C, train_linear_model
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "backend_fastapi"))
+
+
+def time_calls(fn, inputs, iterations):
+    """Latencies in ms of fn(x) over the inputs, cycling until ``iterations`` calls"""
+    timings = []
+    for i in range(iterations):
+        x = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        fn(x)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.array(timings)
+
+
+def benchmark(name, model, X_test, y_test, iterations, batch_size):
+    def classify(X):
+        # What TextClassifier._severity_batch does per call
+        return model.predict(X), model.predict_proba(X).max(axis=1)
+
+    predictions, confidences = classify(X_test)
+    rows = [X_test[i] for i in range(X_test.shape[0])]
+    single = time_calls(classify, rows, iterations)
+    batches = [X_test[i:i + batch_size] for i in range(0, X_test.shape[0], batch_size)]
+    batched = time_calls(classify, batches, max(1, iterations // batch_size))
+
+    return {
+        "name": name,
+        "predictions": predictions,
+        "accuracy": float(np.mean(predictions == y_test)),
+        "mean_confidence": float(np.mean(confidences)),
+        "p50_ms": float(np.percentile(single, 50)),
+        "p95_ms": float(np.percentile(single, 95)),
+        "batch_ms": float(np.median(batched)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SVC and linear text model inference")
+    parser.add_argument("--csv", type=str, default=os.path.join(HERE, "data.csv"), help="Dataset CSV")
+    parser.add_argument("--linear_c", type=float, default=LINEAR_C, help="Regularization of the linear models")
+    parser.add_argument("--iterations", type=int, default=500, help="Timed single-text calls per model")
+    parser.add_argument("--batch_size", type=int, default=32, help="Texts per batched call")
+    parser.add_argument("--test_size", type=float, default=0.25, help="Held-out fraction")
+    args = parser.parse_args()
+
+    from app.services.linear_text_model import LinearTextModel
+
+    import pandas as pd
+    df = pd.read_csv(args.csv)
+    texts = df['text'].astype(str).tolist()
+
+    for target in ("severity", "department"):
+        labels = df[target].to_numpy()
+        train_texts, test_texts, y_train, y_test = train_test_split(
+            texts, labels, test_size=args.test_size, random_state=42, stratify=labels
+        )
+        vectorizer = TfidfVectorizer(max_features=1000, ngram_range=(1, 2), stop_words='english')
+        X_train = vectorizer.fit_transform(train_texts)
+        X_test = vectorizer.transform(test_texts)
+
+        svc = SVC(kernel='linear', probability=True)
+        svc.fit(X_train, y_train)
+        logistic = train_linear_model(X_train, y_train, args.linear_c)
+        linear = LinearTextModel.from_coef(logistic.coef_, logistic.intercept_, logistic.classes_)
+
+        results = [
+            benchmark("svc", svc, X_test, y_test, args.iterations, args.batch_size),
+            benchmark("linear", linear, X_test, y_test, args.iterations, args.batch_size),
+        ]
+        agreement = float(np.mean(results[0]["predictions"] == results[1]["predictions"]))
+
+        print(f"\n{target} ({len(test_texts)} held-out texts, agreement {agreement:.1%})")
+        print(f"{'model':<8} {'accuracy':>9} {'delta':>8} {'mean conf':>10} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {f'batch{args.batch_size} ms':>12}")
+        for result in results:
+            delta = result["accuracy"] - results[0]["accuracy"]
+            print(f"{result['name']:<8} {result['accuracy']:>9.3f} {delta:>+8.3f} "
+                  f"{result['mean_confidence']:>10.3f} {result['p50_ms']:>8.3f} "
+                  f"{result['p95_ms']:>8.3f} {result['batch_ms']:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Golden-output check and microbenchmark of the text preprocessing pipeline.
+
+Runs the original per-call NLTK implementation and the backend's
+TextPreprocessor over the synthetic corpus from generate_synthetic_data.py
+(plus data.csv and a few edge cases), fails if any output differs, then times
+both.
+
+Usage:
+    python ml_training/text_model/benchmark_preprocessing.py --samples 5000
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+import nltk
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+from nltk.stem import WordNetLemmatizer
+
+from generate_synthetic_data import generate_dataset
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "backend_fastapi"))
+
+# Inputs that exercise the tokenizer corner cases (punctuation, digits,
+# contractions, non-ASCII letters, odd whitespace)
+EDGE_CASES = [
+    "",
+    "   ",
+    "12345 !!!",
+    "Pothole!!! on Mission St. -- near No. 42, it's HUGE.",
+    "I cannot walk here; gonna fall. Gotta fix it, wanna help? Gimme a call, lemme know",
+    "can't won't don't isn't 'tis 'twas d'ye more'n",
+    "Garbage\tbin\noverflowing since Monday",
+    "Café near Rue Dumas — lights out (again) [3rd time] {urgent} <now>",
+    "\"Quoted\" ``text'' and 'single' quotes",
+    "WANNA CANNOT GONNA wannabe cannoted gonnado",
+]
+
+
+def reference_preprocess(text, lemmatizer, stop_words):
+    """The original TextClassifier.preprocess_text (golden reference)"""
+    if not text:
+        return ""
+    text = text.lower()
+    text = re.sub(r'[^a-zA-Z\s]', '', text)
+    tokens = word_tokenize(text)
+    tokens = [
+        lemmatizer.lemmatize(token)
+        for token in tokens
+        if token not in stop_words and len(token) > 2
+    ]
+    return ' '.join(tokens)
+
+
+def load_corpus(samples, seed):
+    random.seed(seed)
+    texts = generate_dataset(samples)['text'].astype(str).tolist()
+    csv_path = os.path.join(HERE, "data.csv")
+    if os.path.exists(csv_path):
+        import pandas as pd
+        texts += pd.read_csv(csv_path)['text'].astype(str).tolist()
+    return texts + EDGE_CASES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark text preprocessing")
+    parser.add_argument("--samples", type=int, default=5000, help="Synthetic texts to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic corpus")
+    args = parser.parse_args()
+
+    for resource, package in (('tokenizers/punkt', 'punkt'), ('corpora/stopwords', 'stopwords'),
+                              ('corpora/wordnet', 'wordnet')):
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package, quiet=True)
+
+    from app.services.text_preprocessing import TextPreprocessor
+
+    texts = load_corpus(args.samples, args.seed)
+    lemmatizer = WordNetLemmatizer()
+    stop_words = set(stopwords.words('english'))
+    lemmatizer.lemmatize("warmup")  # Load WordNet outside the timings
+
+    start = time.perf_counter()
+    expected = [reference_preprocess(text, lemmatizer, stop_words) for text in texts]
+    reference_seconds = time.perf_counter() - start
+
+    preprocessor = TextPreprocessor(stop_words, lemmatizer.lemmatize)
+    start = time.perf_counter()
+    actual = preprocessor.preprocess_batch(texts)
+    cold_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    preprocessor.preprocess_batch(texts)
+    warm_seconds = time.perf_counter() - start
+
+    mismatches = [(text, e, a) for text, e, a in zip(texts, expected, actual) if e != a]
+    print(f"Golden check: {len(texts) - len(mismatches)}/{len(texts)} identical")
+    for text, e, a in mismatches[:20]:
+        print(f"  MISMATCH {text!r}\n    expected {e!r}\n    actual   {a!r}")
+
+    per_text = 1e6 / len(texts)
+    print(f"\n{'pipeline':<24} {'total s':>9} {'us/text':>9} {'speedup':>8}")
+    for name, seconds in (("nltk (reference)", reference_seconds),
+                          ("TextPreprocessor cold", cold_seconds),
+                          ("TextPreprocessor warm", warm_seconds)):
+        print(f"{name:<24} {seconds:>9.3f} {seconds * per_text:>9.1f} "
+              f"{reference_seconds / seconds:>7.1f}x")
+    print(f"\nLemma cache: {preprocessor.stats()}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
 import os
+import json
 import pickle
+import shutil
+import hashlib
 import argparse
+from datetime import datetime
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.svm import SVC
+from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
@@ -11,6 +16,13 @@ from sklearn.metrics import classification_report
 # Default paths matching backend_fastapi/app/services/text_classifier.py
 MODEL_FILENAME = "text_classifier.pkl"
 VECTORIZER_FILENAME = "tfidf_vectorizer.pkl"
+# Memory-mapped artifact loaded by backend_fastapi/app/services/text_artifact.py
+ARTIFACT_DIRNAME = "text_model_artifact"
+ARTIFACT_FORMAT = "uirs-text-model"
+ARTIFACT_FORMAT_VERSION = 1
+
+# Inverse regularization of the exported logistic regression models
+LINEAR_C = 1.0
 
 def get_dummy_data():
     """Generates synthetic data for verification."""
@@ -34,7 +46,82 @@ def get_dummy_data():
     
     return texts, severity, dept
 
-def train_and_save(texts, severity_labels, dept_labels, output_dir):
+def train_linear_model(X, labels, C=LINEAR_C):
+    """
+    Multinomial logistic regression: a calibrated linear model whose
+    probabilities are a plain softmax over X @ coef.T + intercept.
+    """
+    model = LogisticRegression(C=C, max_iter=2000)
+    model.fit(X, labels)
+    return model
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def export_artifact(vectorizer, models, artifact_dir):
+    """
+    Write the vectorizer and linear models as flat .npy arrays plus a
+    manifest.json (version, analyzer settings, sha256 per file). The backend
+    memory-maps the arrays instead of unpickling.
+    """
+    if (vectorizer.analyzer != 'word' or vectorizer.preprocessor or vectorizer.tokenizer
+            or vectorizer.strip_accents):
+        raise ValueError("Only the default word analyzer can be exported")
+    
+    terms = sorted(vectorizer.vocabulary_)
+    arrays = {
+        'vocab_terms.npy': np.array(terms, dtype=str),
+        'vocab_index.npy': np.array([vectorizer.vocabulary_[term] for term in terms], dtype=np.int32),
+        'idf.npy': vectorizer.idf_.astype(np.float64),
+    }
+    for name, model in models.items():
+        arrays[f'{name}_weights.npy'] = np.ascontiguousarray(model.coef_.T, dtype=np.float64)
+        arrays[f'{name}_intercept.npy'] = model.intercept_.astype(np.float64)
+        arrays[f'{name}_classes.npy'] = np.asarray(model.classes_)
+    
+    # Build next to the target, then swap it in (running workers keep their mapped files)
+    tmp_dir = f"{artifact_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    files = {}
+    for filename, array in arrays.items():
+        path = os.path.join(tmp_dir, filename)
+        np.save(path, array, allow_pickle=False)
+        files[filename] = _sha256(path)
+    
+    content_hash = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()
+    stop_words = vectorizer.get_stop_words()
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'version': f"{datetime.utcnow():%Y%m%d%H%M%S}-{content_hash[:12]}",
+        'created_at': datetime.utcnow().isoformat(),
+        'analyzer': {
+            'lowercase': vectorizer.lowercase,
+            'token_pattern': vectorizer.token_pattern,
+            'stop_words': sorted(stop_words) if stop_words else None,
+            'ngram_range': list(vectorizer.ngram_range),
+            'sublinear_tf': vectorizer.sublinear_tf,
+            'norm': vectorizer.norm,
+        },
+        'models': {
+            name: {'type': 'logistic_regression', 'classes': [int(c) for c in model.classes_]}
+            for name, model in models.items()
+        },
+        'files': files,
+    }
+    with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    shutil.rmtree(artifact_dir, ignore_errors=True)
+    os.replace(tmp_dir, artifact_dir)
+    return manifest
+
+def train_and_save(texts, severity_labels, dept_labels, output_dir, linear_c=LINEAR_C):
     """
     Trains TF-IDF + SVM and saves vectorizer and model dict.
     """
@@ -66,11 +153,20 @@ def train_and_save(texts, severity_labels, dept_labels, output_dir):
     with open(models_path, 'wb') as f:
         pickle.dump(model_dict, f)
     print(f"Models saved to {models_path}")
+    
+    print("Training linear fast-path models...")
+    artifact_dir = os.path.join(output_dir, ARTIFACT_DIRNAME)
+    manifest = export_artifact(vectorizer, {
+        'severity': train_linear_model(X, severity_labels, linear_c),
+        'department': train_linear_model(X, dept_labels, linear_c)
+    }, artifact_dir)
+    print(f"Model artifact {manifest['version']} saved to {artifact_dir}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Train Urban AI Text Classifier")
     parser.add_argument("--csv", type=str, help="Path to dataset CSV (must have 'text', 'severity', 'department' columns)")
     parser.add_argument("--dummy", action="store_true", help="Generate dummy models for testing")
+    parser.add_argument("--linear_c", type=float, default=LINEAR_C, help="Regularization (C) of the exported linear models")
     
     args = parser.parse_args()
     
@@ -79,7 +175,7 @@ if __name__ == "__main__":
     if args.dummy:
         print("Training with dummy data...")
         texts, severity, dept = get_dummy_data()
-        train_and_save(texts, severity, dept, output_dir)
+        train_and_save(texts, severity, dept, output_dir, args.linear_c)
     elif args.csv:
         import pandas as pd
         df = pd.read_csv(args.csv)
@@ -87,6 +183,6 @@ if __name__ == "__main__":
         texts = df['text'].astype(str).tolist()
         severity = df['severity'].tolist()
         dept = df['department'].tolist()
-        train_and_save(texts, severity, dept, output_dir)
+        train_and_save(texts, severity, dept, output_dir, args.linear_c)
     else:
         print("Please provide --csv or use --dummy")